@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import DocumentField, DocumentTemplate
+from .models import DocumentField, DocumentTemplate, GeneratedDocument
 
 
 class DocumentFieldInline(admin.TabularInline):
@@ -12,5 +12,12 @@ class DocumentAdmin(admin.ModelAdmin):
     inlines = [DocumentFieldInline]
 
 
+class GeneratedDocumentAdmin(admin.ModelAdmin):
+    list_display = ("file_name", "owner", "status", "created_at", "expires_at")
+    list_filter = ("status", "document_type")
+    readonly_fields = ("token", "parameters", "parameters_hash", "error", "completed_at")
+
+
 admin.site.register(DocumentTemplate, DocumentAdmin)
 admin.site.register(DocumentField, admin.ModelAdmin)
+admin.site.register(GeneratedDocument, GeneratedDocumentAdmin)
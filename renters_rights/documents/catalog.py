@@ -0,0 +1,31 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils import translation
+
+from documents.models import DocumentTemplate, get_document_catalog_cache_key
+from lib.cache import get_or_compute
+
+# A document template as listed on the document list and get started pages.
+CatalogDocument = namedtuple("CatalogDocument", ["id", "name", "description", "include_on_get_started"])
+
+
+def get_document_catalog(language=None):
+    """Gets the document templates users can create documents from, with their names and descriptions translated. The
+    catalog is cached until a document template or field is saved or deleted.
+
+    Args:
+      language: the language to translate to. Defaults to the active language.
+
+    Returns: a list of CatalogDocuments.
+    """
+    language = translation.get_supported_language_variant(language or translation.get_language() or settings.LANGUAGE_CODE)
+
+    def build_catalog():
+        with translation.override(language):
+            return [
+                CatalogDocument(d.id, d.name, d.description, d.include_on_get_started)
+                for d in DocumentTemplate.objects.order_by("id")
+            ]
+
+    return get_or_compute(get_document_catalog_cache_key(language), build_catalog, int(settings.CACHE_TIMEOUT))
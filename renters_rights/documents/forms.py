@@ -1,5 +1,5 @@
 from django import forms
-from django.forms import ModelChoiceField
+from django.forms import ModelChoiceField, ModelMultipleChoiceField
 from django.utils.translation import gettext_lazy as _
 from localflavor.us.forms import USStateField, USStateSelect, USZipCodeField
 from phonenumber_field.formfields import PhoneNumberField
@@ -76,6 +76,29 @@ class BaseDocumentForm(forms.Form):
             self.cleaned_data["sender_zip_code"] = self.cleaned_data["unit"].unit_zip_code
 
 
+def get_form_field(document_field, label=None):
+    """Creates a form field for a field defined on a document template.
+
+    Args:
+      document_field: the DocumentField to create a form field for.
+      label: the label for the form field (defaults to the document field's name).
+
+    Returns: a form field.
+    """
+    label = label or document_field.name
+
+    if document_field.field_type == DocumentField.INTEGER:
+        form_field = forms.IntegerField(label=label, required=document_field.required)
+    elif document_field.field_type == DocumentField.DATE:
+        form_field = forms.DateField(label=label, required=document_field.required)
+    else:
+        form_field = forms.CharField(label=label, required=document_field.required)
+
+    if document_field.required:
+        form_field.widget.attrs["class"] = "required"
+    return form_field
+
+
 class DocumentForm(BaseDocumentForm):
     def __init__(self, user, *args, **kwargs):
         # expects a survey object to be passed in initially
@@ -84,24 +107,65 @@ class DocumentForm(BaseDocumentForm):
         super().__init__(user, *args, **kwargs)
 
         for f in document_template.document_fields.all():
-            field_name = f.name.lower()
+            self.fields[f.name.lower()] = get_form_field(f)
+
+
+class BatchDocumentForm(BaseDocumentForm):
+    """Collects the information needed to create letters from several document templates, for one or more units.
+    Fields from each template are prefixed with the template's id so templates can share field names.
+    """
+
+    def __init__(self, user, *args, **kwargs):
+        self.document_templates = kwargs.pop("document_templates")
+        super().__init__(user, *args, **kwargs)
+
+        self.fields["unit"] = ModelMultipleChoiceField(queryset=Unit.objects.for_user(user))
+
+        for document_template in self.document_templates:
+            for f in document_template.document_fields.all():
+                self.fields[self.get_field_name(document_template, f)] = get_form_field(
+                    f, label=f"{document_template.name}: {f.name}"
+                )
+
+    @staticmethod
+    def get_field_name(document_template, document_field):
+        return f"{document_template.id}_{document_field.name.lower()}"
+
+    def clean(self):
+        if self.cleaned_data.get("use_unit_address"):
+            # Each letter uses the address of the unit it's for, see get_letters.
+            return self.cleaned_data
+        return super().clean()
+
+    def get_letters(self):
+        """Gets the document template and template context for each letter: one letter per template, per unit.
+
+        Returns: a list of (DocumentTemplate, context dictionary) tuples.
+        """
+        letters = []
+        shared_data = {k: v for (k, v) in self.cleaned_data.items() if k in self.base_fields or k.startswith("sender_")}
+
+        for unit in self.cleaned_data["unit"]:
+            unit_data = {**shared_data, "unit": unit}
+            if self.cleaned_data.get("use_unit_address"):
+                unit_data["sender_address_1"] = unit.unit_address_1
+                unit_data["sender_address_2"] = unit.unit_address_2
+                unit_data["sender_city"] = unit.unit_city
+                unit_data["sender_state"] = unit.unit_state
+                unit_data["sender_zip_code"] = unit.unit_zip_code
 
-            if f.field_type == DocumentField.TEXT:
-                self.fields[field_name] = forms.CharField(label=f.name, required=f.required)
-            elif f.field_type == DocumentField.INTEGER:
-                self.fields[field_name] = forms.IntegerField(label=f.name, required=f.required)
-            elif f.field_type == DocumentField.DATE:
-                self.fields[field_name] = forms.DateField(label=f.name, required=f.required)
+            for document_template in self.document_templates:
+                document_data = {
+                    f.name.lower(): self.cleaned_data.get(self.get_field_name(document_template, f))
+                    for f in document_template.document_fields.all()
+                }
+                letters.append((document_template, {**unit_data, **document_data}))
 
-            if f.required:
-                self.fields[field_name].required = True
-                self.fields[field_name].widget.attrs["class"] = "required"
-            else:
-                self.fields[field_name].required = False
+        return letters
 
 
 class PhotosDocumentForm(BaseDocumentForm):
-    pass
+    compact = forms.BooleanField(label=_("Make a smaller file (lower resolution photos, easier to email)"), required=False)
 
 
 class SmallClaimsDocumentForm(BaseDocumentForm):
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.rendering import render_photo_report
+from units.models import Unit
+
+
+class Command(BaseCommand):
+    help = "Renders a unit's photo report in normal and compact mode and reports the output size and render time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("unit", help="Slug of the unit to render the report for.")
+        parser.add_argument("--repeat", type=int, default=3, help="Number of times to render each report.")
+        parser.add_argument("--site-url", default="http://localhost", help="Site URL shown in the report.")
+
+    def handle(self, *args, **options):
+        try:
+            unit = Unit.objects.get(slug=options["unit"])
+        except Unit.DoesNotExist:
+            raise CommandError(f"Unit {options['unit']} does not exist")
+
+        self.stdout.write(f"{unit.pictures().count()} pictures, thumbnail sizes {settings.UNIT_IMAGE_SIZES}")
+        for compact in (False, True):
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.monotonic()
+                pdf = render_photo_report(unit.owner, {"unit": unit, "compact": compact}, options["site_url"])
+                timings.append(time.monotonic() - start)
+
+            self.stdout.write(
+                f"{'compact' if compact else 'normal'}: {len(pdf) / 1024:.1f} KiB, "
+                f"best {min(timings):.2f}s, mean {sum(timings) / len(timings):.2f}s"
+            )
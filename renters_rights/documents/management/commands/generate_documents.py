@@ -0,0 +1,71 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from documents.models import GeneratedDocument
+from documents.rendering import render_generated_document
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Renders queued documents, fails abandoned ones and deletes expired ones. Runs until stopped unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process queued documents, then exit.")
+        parser.add_argument("--sleep", type=float, default=2, help="Seconds to wait between checks for new documents.")
+
+    def handle(self, *args, **options):
+        # One pool is kept for as long as the command runs, rather than starting processes for every report.
+        executor = ProcessPoolExecutor(settings.PHOTO_REPORT_WORKERS) if settings.PHOTO_REPORT_WORKERS > 1 else None
+        try:
+            while True:
+                self.fail_abandoned_documents()
+                self.delete_expired_documents()
+
+                while self.process_next_document(executor):
+                    pass
+
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
+        finally:
+            if executor:
+                executor.shutdown()
+
+    @staticmethod
+    def fail_abandoned_documents():
+        failed = GeneratedDocument.fail_abandoned()
+        if failed:
+            logger.warning(f"Failed {failed} documents abandoned by a stopped worker")
+
+    @staticmethod
+    def delete_expired_documents():
+        # Delete one at a time so the post_delete handler removes each file from storage.
+        for document in GeneratedDocument.get_expired():
+            document.delete()
+
+    @staticmethod
+    def process_next_document(executor=None):
+        """Renders the next queued document.
+
+        Args:
+          executor: an executor to render parts of the document in parallel, or None to render it in this process.
+
+        Returns: True if a document was processed, False if the queue is empty.
+        """
+        document = GeneratedDocument.claim_next()
+        if not document:
+            return False
+
+        start = time.monotonic()
+        try:
+            document.complete(render_generated_document(document, executor))
+            logger.info(f"Generated document {document.token} in {time.monotonic() - start:.2f}s")
+        except Exception as e:
+            logger.exception(f"Failed to generate document {document.token}")
+            document.fail(str(e))
+        return True
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.14 on 2026-10-19 12:14
+
+import uuid
+
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import documents.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [migrations.swappable_dependency(settings.AUTH_USER_MODEL), ("documents", "0008_auto_20200116_0107")]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeneratedDocument",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("token", models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ("document_type", models.CharField(choices=[("photo-report", "Photo Report")], max_length=20)),
+                ("parameters", django.contrib.postgres.fields.jsonb.JSONField(default=dict, editable=False)),
+                ("parameters_hash", models.CharField(db_index=True, editable=False, max_length=64)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("complete", "Complete"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("file", models.FileField(blank=True, upload_to=documents.models.generate_document_path)),
+                ("file_name", models.CharField(max_length=100)),
+                ("error", models.TextField(blank=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                ("owner", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={"abstract": False},
+        )
+    ]
@@ -0,0 +1,14 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("documents", "0009_generateddocument")]
+
+    operations = [
+        migrations.AddField(
+            model_name="generateddocument", name="claimed_at", field=models.DateTimeField(blank=True, editable=False, null=True)
+        )
+    ]
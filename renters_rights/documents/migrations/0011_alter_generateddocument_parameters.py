@@ -0,0 +1,14 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("documents", "0010_generateddocument_claimed_at")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="generateddocument", name="parameters", field=models.JSONField(default=dict, editable=False)
+        )
+    ]
@@ -1,7 +1,27 @@
+import datetime
+import hashlib
+import json
 import re
+import uuid
 
-from django.db import models
-from django.db.models import CASCADE
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import CASCADE, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+
+from lib.cache import bump_anonymous_page_cache_version
+from lib.models import UserOwnedModel
+
+
+def get_document_catalog_cache_key(language):
+    return f"document-catalog-{language}"
 
 
 class DocumentTemplate(models.Model):
@@ -42,3 +62,208 @@ class DocumentField(models.Model):
 
     def __str__(self):
         return self.name
+
+
+def generate_document_path(instance, filename):
+    """Generates a storage path for a generated document.
+
+    Args:
+      instance: generated document instance.
+      filename: name of the file.
+
+    Returns: a path for storing generated documents.
+    """
+    return f"documents/{instance.owner.slug}/{instance.token}/{filename}"
+
+
+class GeneratedDocument(UserOwnedModel):
+    """A document that is rendered outside of the request/response cycle by the generate_documents command."""
+
+    PHOTO_REPORT = "photo-report"
+    DOCUMENT_TYPES = ((PHOTO_REPORT, "Photo Report"),)
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETE = "complete"
+    FAILED = "failed"
+    STATUSES = ((PENDING, "Pending"), (RUNNING, "Running"), (COMPLETE, "Complete"), (FAILED, "Failed"))
+
+    DOWNLOAD_SALT = "documents.generated-document-download"
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
+    parameters = models.JSONField(default=dict, editable=False)
+    parameters_hash = models.CharField(max_length=64, db_index=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    file = models.FileField(upload_to=generate_document_path, blank=True)
+    file_name = models.CharField(max_length=100)
+    error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(blank=True, null=True, editable=False)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.COMPLETE, self.FAILED)
+
+    def get_absolute_url(self):
+        return reverse("documents:generated-document", args=[self.token])
+
+    def get_download_url(self):
+        """Gets a signed link that can be used to download the document.
+        Links expire after GENERATED_DOCUMENT_DOWNLOAD_LINK_TTL_SECONDS, even if the document itself has not.
+
+        Returns: a URL that can be used to download the document.
+        """
+        return reverse("documents:generated-document-download", args=[signing.dumps(str(self.token), salt=self.DOWNLOAD_SALT)])
+
+    @classmethod
+    def get_token_from_signed_token(cls, signed_token):
+        """Verifies a token from a signed download link.
+
+        Args:
+          signed_token: the signed token from a download link.
+
+        Returns: the document token if the signature is valid and unexpired, otherwise None.
+        """
+        try:
+            return signing.loads(
+                signed_token, salt=cls.DOWNLOAD_SALT, max_age=settings.GENERATED_DOCUMENT_DOWNLOAD_LINK_TTL_SECONDS
+            )
+        except signing.BadSignature:
+            return None
+
+    @classmethod
+    def get_claim_cutoff(cls):
+        """Documents claimed before this time were claimed by a worker that stopped before finishing them."""
+        return timezone.now() - datetime.timedelta(seconds=settings.GENERATED_DOCUMENT_CLAIM_SECONDS)
+
+    @classmethod
+    def get_abandoned_filter(cls):
+        """Matches running documents claimed before the claim cutoff, or before claims were recorded."""
+        return Q(status=cls.RUNNING) & (Q(claimed_at__lte=cls.get_claim_cutoff()) | Q(claimed_at__isnull=True))
+
+    @staticmethod
+    def hash_parameters(document_type, parameters):
+        serialized = json.dumps({"document_type": document_type, "parameters": parameters}, sort_keys=True)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_or_create_for_user(cls, user, document_type, parameters, file_name):
+        """Gets a pending, running or unexpired completed document matching the parameters, or queues a new one.
+        Reusing documents means repeat downloads of the same report don't need to be rendered again. Documents whose
+        worker stopped while rendering them are not reused.
+
+        Args:
+          user: the user requesting the document.
+          document_type: one of DOCUMENT_TYPES.
+          parameters: JSON-serializable parameters used to render the document.
+          file_name: the name of the file the user will download.
+
+        Returns: a tuple of (GeneratedDocument, created).
+        """
+        parameters_hash = cls.hash_parameters(document_type, parameters)
+        existing = (
+            cls.objects.for_user(user, parameters_hash=parameters_hash)
+            .exclude(status=cls.FAILED)
+            .exclude(expires_at__lte=timezone.now())
+            .exclude(cls.get_abandoned_filter())
+            .order_by("-created_at")
+            .first()
+        )
+        if existing:
+            return existing, False
+
+        return (
+            cls.objects.create(
+                owner=user,
+                document_type=document_type,
+                parameters=parameters,
+                parameters_hash=parameters_hash,
+                file_name=file_name,
+            ),
+            True,
+        )
+
+    @classmethod
+    def claim_next(cls):
+        """Marks the oldest pending document as running and returns it. Safe to call from several workers at once.
+
+        Returns: the claimed document, or None if there is nothing to do.
+        """
+        with transaction.atomic():
+            document = cls.objects.select_for_update(skip_locked=True).filter(status=cls.PENDING).order_by("created_at").first()
+            if document:
+                document.status = cls.RUNNING
+                document.claimed_at = timezone.now()
+                document.save(update_fields=["status", "claimed_at", "modified_at"])
+            return document
+
+    @classmethod
+    def fail_abandoned(cls):
+        """Fails running documents whose claim is older than GENERATED_DOCUMENT_CLAIM_SECONDS, because the worker
+        rendering them stopped, e.g. when it was restarted or ran out of memory. They aren't requeued, since rendering
+        them again could stop the next worker the same way.
+
+        Returns: the number of documents failed.
+        """
+        now = timezone.now()
+        return cls.objects.filter(cls.get_abandoned_filter()).update(
+            status=cls.FAILED,
+            error="The document worker stopped before the document was finished.",
+            expires_at=now + datetime.timedelta(minutes=settings.GENERATED_DOCUMENT_TTL_MINUTES),
+            modified_at=now,
+        )
+
+    @classmethod
+    def get_expired(cls):
+        """Gets expired documents, and documents that have been waiting to finish for longer than they would have been
+        kept, e.g. because no worker was running.
+
+        Returns: a queryset of documents that can be deleted.
+        """
+        now = timezone.now()
+        unfinished_since = now - datetime.timedelta(minutes=settings.GENERATED_DOCUMENT_TTL_MINUTES)
+        return cls.objects.filter(
+            Q(expires_at__lte=now) | Q(expires_at__isnull=True, created_at__lte=unfinished_since)
+        ).exclude(status=cls.RUNNING, claimed_at__gt=cls.get_claim_cutoff())
+
+    def complete(self, content):
+        self.file.save(self.file_name, ContentFile(content), save=False)
+        self.status = self.COMPLETE
+        self.completed_at = timezone.now()
+        self.expires_at = self.completed_at + datetime.timedelta(minutes=settings.GENERATED_DOCUMENT_TTL_MINUTES)
+        self.save()
+
+    def fail(self, error):
+        self.status = self.FAILED
+        self.error = error
+        # Failed documents are kept as long as completed ones, so the user can see what happened.
+        self.expires_at = timezone.now() + datetime.timedelta(minutes=settings.GENERATED_DOCUMENT_TTL_MINUTES)
+        self.save()
+
+
+@receiver(post_delete, sender=GeneratedDocument)
+def delete_generated_document_file(sender, instance, using, **kwargs):
+    """Post-delete signal handler to delete the rendered file."""
+    if instance.file:
+        default_storage.delete(instance.file.name)
+
+
+@receiver(post_save, sender=DocumentTemplate)
+@receiver(post_delete, sender=DocumentTemplate)
+@receiver(post_save, sender=DocumentField)
+@receiver(post_delete, sender=DocumentField)
+def invalidate_document_catalog(sender, instance, **kwargs):
+    """Signal handler to clear the cached document catalog, in every language, when a document template changes. The
+    catalog is cleared once the change is committed, so a concurrent request can't cache the old catalog again.
+    """
+    transaction.on_commit(clear_document_catalog)
+
+
+def clear_document_catalog():
+    cache.delete_many([get_document_catalog_cache_key(language) for language, name in settings.LANGUAGES])
+    bump_anonymous_page_cache_version()
@@ -0,0 +1,193 @@
+import io
+import logging
+import mimetypes
+import os
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import models
+from django.template import Context, Template
+from django.template.loader import render_to_string
+
+from documents import text_pdf
+from documents.models import GeneratedDocument
+from lib.lazy import pdfrw, weasyprint
+from units.models import Unit
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=16)
+def read_static_file(name):
+    """Reads a static file from the application server's disk. Results are cached since the same few logos are
+    embedded in every document.
+
+    Args:
+      name: the name of the static file, relative to STATIC_URL.
+
+    Returns: the contents of the file, or None if it can't be found locally.
+    """
+    path = finders.find(name)
+    if not path:
+        # Collected files may have hashed names that only exist in STATIC_ROOT.
+        try:
+            path = staticfiles_storage.path(name)
+        except NotImplementedError:
+            return None
+
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def fetch_url(url):
+    """WeasyPrint URL fetcher that reads static files from disk instead of making an HTTP request for them. Other URLs
+    are fetched as usual.
+
+    Args:
+      url: the URL of a resource in the document being rendered.
+
+    Returns: a dictionary as described by weasyprint.default_url_fetcher.
+    """
+    path = urlparse(url).path
+    if path.startswith(settings.STATIC_URL):
+        content = read_static_file(path[len(settings.STATIC_URL) :])
+        if content is not None:
+            return {"string": content, "mime_type": mimetypes.guess_type(path)[0], "redirected_url": url}
+
+    return weasyprint.default_url_fetcher(url)
+
+
+def html_to_pdf(html):
+    """Renders an HTML document to a PDF.
+
+    Args:
+      html: the HTML document to render.
+
+    Returns: the PDF as bytes.
+    """
+    pdf = io.BytesIO()
+    weasyprint.HTML(string=html, url_fetcher=fetch_url).write_pdf(pdf)
+    return pdf.getvalue()
+
+
+def render_letters(user, letters):
+    """Renders one or more letters into a single PDF, with each letter starting on a new page.
+    Rendering letters together means WeasyPrint's startup, stylesheet and font costs are only paid once.
+    Letters that are plain text are laid out directly by text_pdf instead, which is much faster than WeasyPrint.
+
+    Args:
+      user: the user the letters are being generated for.
+      letters: a list of (DocumentTemplate, context dictionary) tuples, usually from a document form.
+
+    Returns: the PDF as bytes.
+    """
+    letter_contexts = []
+    for document_template, data in letters:
+        body = Template(document_template.body).render(Context(data))
+        letter_contexts.append({**data, **{"body": body, "user": user}})
+
+    if settings.PLAIN_TEXT_LETTER_RENDERING:
+        try:
+            return text_pdf.render_letters(
+                letter_contexts,
+                footer_left=read_static_file("img/logo-green.png"),
+                footer_right=read_static_file("img/cfk-logo.png"),
+            )
+        except text_pdf.UnsupportedContentError as e:
+            logger.debug(f"Rendering letters with WeasyPrint: {e}")
+
+    return html_to_pdf(render_to_string("basic_letter.html", {"letters": letter_contexts}))
+
+
+def render_photo_report(user, cleaned_data, site_url, executor=None):
+    """Renders a photo report PDF for a unit.
+
+    Args:
+      user: the user the report is being generated for.
+      cleaned_data: cleaned data from a PhotosDocumentForm.
+      site_url: the absolute URL of the site, shown in the report.
+      executor: an executor to render the chunks of a large report in parallel, e.g. the generate_documents command's
+        process pool. Chunks are rendered one at a time in this process if it's None.
+
+    Returns: the PDF as bytes.
+    """
+    context = {**cleaned_data, **{"user": user, "site_name": settings.SITE_NAME, "site_url": site_url}}
+
+    # WeasyPrint keeps every decoded image in memory until the whole document is written, so pictures are rendered in
+    # chunks of separate documents to keep memory use bounded by the chunk size rather than the number of pictures.
+    pictures = list(cleaned_data["unit"].pictures())
+    chunk_size = settings.PHOTO_REPORT_CHUNK_SIZE
+    chunks = [pictures[i : i + chunk_size] for i in range(0, len(pictures), chunk_size)] or [[]]
+    documents = [
+        render_to_string("photo_report.html", {**context, **{"pictures": chunk, "include_cover": i == 0}})
+        for i, chunk in enumerate(chunks)
+    ]
+
+    if len(documents) == 1:
+        return html_to_pdf(documents[0])
+
+    if executor:
+        return concatenate_pdfs(executor.map(html_to_pdf, documents))
+
+    return concatenate_pdfs(html_to_pdf(document) for document in documents)
+
+
+def concatenate_pdfs(pdfs):
+    """Combines PDFs into a single PDF.
+
+    Args:
+      pdfs: an iterable of PDFs, as bytes.
+
+    Returns: the combined PDF as bytes.
+    """
+    writer = pdfrw.PdfWriter()
+    for pdf in pdfs:
+        writer.addpages(pdfrw.PdfReader(io.BytesIO(pdf)).pages)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def serialize_form_data(cleaned_data):
+    """Converts cleaned form data into JSON-serializable parameters for a GeneratedDocument.
+    Model instances are stored by primary key and other non-primitive values (e.g. phone numbers) as strings.
+
+    Args:
+      cleaned_data: cleaned data from a document form.
+
+    Returns: a dictionary that can be stored in GeneratedDocument.parameters.
+    """
+    parameters = {}
+    for key, value in cleaned_data.items():
+        if isinstance(value, models.Model):
+            value = value.pk
+        elif value is not None and not isinstance(value, (bool, int, float, str)):
+            value = str(value)
+        parameters[key] = value
+    return parameters
+
+
+def render_generated_document(document, executor=None):
+    """Renders the PDF for a queued GeneratedDocument.
+
+    Args:
+      document: the GeneratedDocument to render.
+      executor: an executor to render parts of the document in parallel, or None to render it in this process.
+
+    Returns: the PDF as bytes.
+    """
+    parameters = dict(document.parameters)
+    if document.document_type == GeneratedDocument.PHOTO_REPORT:
+        site_url = parameters.pop("site_url")
+        parameters.pop("unit_modified_at", None)
+        parameters["unit"] = Unit.objects.for_user(document.owner).get(pk=parameters["unit"])
+        return render_photo_report(document.owner, parameters, site_url, executor)
+
+    raise ValueError(f"Unknown document type {document.document_type}")
@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from hamcrest import assert_that, contains, equal_to, has_length
+
+from documents.catalog import CatalogDocument, get_document_catalog
+from documents.models import DocumentField, DocumentTemplate
+
+
+class DocumentCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dt = DocumentTemplate.objects.create(
+            name_en="Repair Request",
+            name_es="Solicitud de Reparación",
+            description_en="Ask for repairs.",
+            slug="repair",
+            body="body",
+            include_on_get_started=True,
+        )
+
+    def test_catalog_is_translated(self):
+        assert_that(
+            get_document_catalog("en"), contains(CatalogDocument(self.dt.id, "Repair Request", "Ask for repairs.", True))
+        )
+        assert_that(get_document_catalog("es")[0].name, equal_to("Solicitud de Reparación"))
+
+    def test_catalog_is_cached(self):
+        get_document_catalog("en")
+
+        with self.assertNumQueries(0):
+            assert_that(get_document_catalog("en"), has_length(1))
+            assert_that(get_document_catalog("en-us"), has_length(1))
+
+    def test_catalog_is_invalidated_when_template_saved(self):
+        get_document_catalog("es")
+
+        self.dt.name_es = "Reparaciones"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dt.save()
+        assert_that(get_document_catalog("es")[0].name, equal_to("Reparaciones"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentTemplate.objects.create(name="Notice", slug="notice", body="body")
+        assert_that(get_document_catalog("es"), has_length(2))
+
+    def test_catalog_is_invalidated_when_field_saved_or_template_deleted(self):
+        get_document_catalog("en")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentField.objects.create(name="date", required=True, document=self.dt)
+        with self.assertNumQueries(1):
+            get_document_catalog("en")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dt.delete()
+        assert_that(get_document_catalog("en"), has_length(0))
+
+    def test_catalog_is_not_invalidated_until_commit(self):
+        get_document_catalog("es")
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.dt.name_es = "Reparaciones"
+            self.dt.save()
+            assert_that(get_document_catalog("es")[0].name, equal_to("Solicitud de Reparación"))
+
+        for callback in callbacks:
+            callback()
+        assert_that(get_document_catalog("es")[0].name, equal_to("Reparaciones"))
+
+    def test_document_list_does_not_query_documents(self):
+        self.client.get(reverse("documents:document-list"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("documents:document-list"))
+        self.assertContains(response, "Repair Request")
+        assert_that([q["sql"] for q in queries if "documents_" in q["sql"]], has_length(0))
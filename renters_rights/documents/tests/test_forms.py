@@ -1,7 +1,7 @@
 from django.test import TestCase
-from hamcrest import assert_that, contains_string, equal_to, has_key
+from hamcrest import assert_that, contains_string, equal_to, has_key, has_length
 
-from documents.forms import DocumentForm, PhotosDocumentForm, SmallClaimsDocumentForm
+from documents.forms import BatchDocumentForm, DocumentForm, PhotosDocumentForm, SmallClaimsDocumentForm
 from documents.models import DocumentField, DocumentTemplate
 from noauth.models import User
 from units.models import Unit
@@ -206,3 +206,66 @@ class PhotosDocumentFormTests(TestCase):
             user=PhotosDocumentFormTests.u,
         )
         self.assertTrue(form.is_valid())
+        assert_that(form.cleaned_data["compact"], equal_to(False))
+
+    def test_compact_field_is_additional_field(self):
+        form = PhotosDocumentForm(data={}, user=PhotosDocumentFormTests.u)
+        assert_that([f.name for f in form.additional_fields], equal_to(["compact"]))
+
+
+class BatchDocumentFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = User.objects.create(is_active=True, username="eleanor@shellstrop.com")
+        cls.unit = Unit.objects.create(unit_address_1="Unit address1", unit_city="Louisville", owner=cls.u)
+        cls.unit2 = Unit.objects.create(unit_address_1="Unit 2 address1", unit_city="Lexington", owner=cls.u)
+
+        cls.dt1 = DocumentTemplate.objects.create(name="DT1", slug="dt-1", body="""This is {{field}}.""")
+        cls.df1 = DocumentField.objects.create(name="field", required=True, field_type=DocumentField.TEXT, document=cls.dt1)
+        cls.dt2 = DocumentTemplate.objects.create(name="DT2", slug="dt-2", body="""That is {{field}}.""")
+        cls.df2 = DocumentField.objects.create(name="field", required=False, field_type=DocumentField.INTEGER, document=cls.dt2)
+
+    def get_form(self, data):
+        return BatchDocumentForm(
+            data=data,
+            user=BatchDocumentFormTests.u,
+            document_templates=[BatchDocumentFormTests.dt1, BatchDocumentFormTests.dt2],
+        )
+
+    def test_form_prefixes_document_fields_with_template_id(self):
+        form = self.get_form({})
+        assert_that(form.fields, has_key(f"{BatchDocumentFormTests.dt1.id}_field"))
+        assert_that(form.fields, has_key(f"{BatchDocumentFormTests.dt2.id}_field"))
+
+    def test_form_validates_all_document_fields(self):
+        form = self.get_form({f"{BatchDocumentFormTests.dt2.id}_field": "NaN"})
+        self.assertFalse(form.is_valid())
+        assert_that(form.errors, has_key("unit"))
+        assert_that(form.errors, has_key(f"{BatchDocumentFormTests.dt1.id}_field"))
+        assert_that(form.errors, has_key(f"{BatchDocumentFormTests.dt2.id}_field"))
+
+    def test_get_letters_returns_one_letter_per_template_per_unit(self):
+        form = self.get_form(
+            {
+                "sender_first_name": "Eleanor",
+                "sender_last_name": "Shellstrop",
+                "use_unit_address": True,
+                "unit": [BatchDocumentFormTests.unit.id, BatchDocumentFormTests.unit2.id],
+                f"{BatchDocumentFormTests.dt1.id}_field": "F1Value",
+                f"{BatchDocumentFormTests.dt2.id}_field": 2,
+            }
+        )
+        self.assertTrue(form.is_valid())
+
+        letters = form.get_letters()
+        assert_that(letters, has_length(4))
+        document_template, context = letters[0]
+        assert_that(document_template, equal_to(BatchDocumentFormTests.dt1))
+        assert_that(context["field"], equal_to("F1Value"))
+        assert_that(context["unit"], equal_to(BatchDocumentFormTests.unit))
+        assert_that(context["sender_address_1"], equal_to(BatchDocumentFormTests.unit.unit_address_1))
+
+        document_template, context = letters[3]
+        assert_that(document_template, equal_to(BatchDocumentFormTests.dt2))
+        assert_that(context["field"], equal_to(2))
+        assert_that(context["sender_city"], equal_to(BatchDocumentFormTests.unit2.unit_city))
@@ -1,7 +1,15 @@
+import datetime
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
 from django.test import TestCase
-from hamcrest import assert_that, contains_inanyorder, equal_to, none
+from django.utils import timezone
+from hamcrest import assert_that, contains_inanyorder, equal_to, is_not, none
 
-from documents.models import DocumentField, DocumentTemplate
+from documents.models import DocumentField, DocumentTemplate, GeneratedDocument
+from documents.tests import UnitBaseTestCase
 
 
 class DocumentModelTests(TestCase):
@@ -25,3 +33,120 @@ class DocumentModelTests(TestCase):
 
     def test_document_field_str_returns_name(self):
         assert_that(str(self.df1), equal_to(self.df1.name))
+
+
+class GeneratedDocumentModelTests(UnitBaseTestCase):
+    parameters = {"unit": 1, "use_unit_address": True}
+
+    def create_document(self):
+        return GeneratedDocument.get_or_create_for_user(
+            GeneratedDocumentModelTests.u, GeneratedDocument.PHOTO_REPORT, self.parameters, "PhotoReport.pdf"
+        )
+
+    def test_get_or_create_reuses_pending_document(self):
+        document, created = self.create_document()
+        assert_that(created, equal_to(True))
+
+        same_document, created = self.create_document()
+        assert_that(created, equal_to(False))
+        assert_that(same_document, equal_to(document))
+
+    def test_get_or_create_does_not_reuse_failed_document(self):
+        document, _ = self.create_document()
+        document.fail("error")
+
+        new_document, created = self.create_document()
+        assert_that(created, equal_to(True))
+        assert_that(new_document, is_not(equal_to(document)))
+
+    def test_get_or_create_does_not_reuse_expired_document(self):
+        document, _ = self.create_document()
+        document.complete(b"%PDF-1.4")
+        GeneratedDocument.objects.filter(id=document.id).update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        new_document, created = self.create_document()
+        assert_that(created, equal_to(True))
+
+    def test_get_or_create_does_not_reuse_documents_with_different_parameters(self):
+        document, _ = self.create_document()
+        new_document, created = GeneratedDocument.get_or_create_for_user(
+            GeneratedDocumentModelTests.u, GeneratedDocument.PHOTO_REPORT, {"unit": 2}, "PhotoReport.pdf"
+        )
+        assert_that(created, equal_to(True))
+
+    def test_claim_next_marks_document_running(self):
+        document, _ = self.create_document()
+        claimed = GeneratedDocument.claim_next()
+        assert_that(claimed, equal_to(document))
+        assert_that(claimed.status, equal_to(GeneratedDocument.RUNNING))
+        assert_that(claimed.claimed_at, is_not(none()))
+        assert_that(GeneratedDocument.claim_next(), none())
+
+    def abandon(self, document):
+        GeneratedDocument.objects.filter(id=document.id).update(
+            claimed_at=timezone.now() - datetime.timedelta(seconds=settings.GENERATED_DOCUMENT_CLAIM_SECONDS + 1)
+        )
+
+    def test_get_or_create_does_not_reuse_abandoned_document(self):
+        document, _ = self.create_document()
+        GeneratedDocument.claim_next()
+        self.abandon(document)
+
+        new_document, created = self.create_document()
+        assert_that(created, equal_to(True))
+        assert_that(new_document, is_not(equal_to(document)))
+
+    def test_fail_abandoned_fails_only_documents_with_stale_claims(self):
+        abandoned, _ = self.create_document()
+        running, _ = GeneratedDocument.get_or_create_for_user(
+            GeneratedDocumentModelTests.u, GeneratedDocument.PHOTO_REPORT, {"unit": 2}, "PhotoReport.pdf"
+        )
+        GeneratedDocument.claim_next()
+        GeneratedDocument.claim_next()
+        self.abandon(abandoned)
+
+        assert_that(GeneratedDocument.fail_abandoned(), equal_to(1))
+
+        abandoned.refresh_from_db()
+        running.refresh_from_db()
+        assert_that(abandoned.status, equal_to(GeneratedDocument.FAILED))
+        assert_that(abandoned.expires_at, is_not(none()))
+        assert_that(running.status, equal_to(GeneratedDocument.RUNNING))
+
+    def test_complete_stores_file_and_sets_expiry(self):
+        document, _ = self.create_document()
+        document.complete(b"%PDF-1.4")
+        assert_that(document.status, equal_to(GeneratedDocument.COMPLETE))
+        assert_that(document.expires_at, is_not(none()))
+        assert_that(default_storage.exists(document.file.name), equal_to(True))
+
+    def test_get_token_from_signed_token(self):
+        document, _ = self.create_document()
+        signed_token = document.get_download_url().rstrip("/").split("/")[-1]
+        assert_that(GeneratedDocument.get_token_from_signed_token(signed_token), equal_to(str(document.token)))
+        assert_that(GeneratedDocument.get_token_from_signed_token(signed_token + "x"), none())
+
+    def test_generate_documents_command_deletes_expired_documents(self):
+        document, _ = self.create_document()
+        document.complete(b"%PDF-1.4")
+        GeneratedDocument.objects.filter(id=document.id).update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        call_command("generate_documents", "--once")
+
+        assert_that(GeneratedDocument.objects.filter(id=document.id).count(), equal_to(0))
+        assert_that(default_storage.exists(document.file.name), equal_to(False))
+
+    @patch("documents.management.commands.generate_documents.Command.process_next_document", return_value=False)
+    def test_generate_documents_command_deletes_old_unfinished_documents(self, process_next_document):
+        old, _ = self.create_document()
+        GeneratedDocument.objects.filter(id=old.id).update(
+            created_at=timezone.now() - datetime.timedelta(minutes=settings.GENERATED_DOCUMENT_TTL_MINUTES + 1)
+        )
+        new, _ = GeneratedDocument.get_or_create_for_user(
+            GeneratedDocumentModelTests.u, GeneratedDocument.PHOTO_REPORT, {"unit": 2}, "PhotoReport.pdf"
+        )
+
+        call_command("generate_documents", "--once")
+
+        assert_that(GeneratedDocument.objects.filter(id=old.id).count(), equal_to(0))
+        assert_that(GeneratedDocument.objects.filter(id=new.id).count(), equal_to(1))
@@ -0,0 +1,137 @@
+from io import BytesIO
+from unittest.mock import Mock, patch
+
+import PyPDF2
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, contains_string, equal_to, is_not, starts_with
+
+from documents import text_pdf
+from documents.models import DocumentTemplate
+from documents.rendering import concatenate_pdfs, fetch_url, read_static_file, render_letters, render_photo_report
+from documents.tests import UnitBaseTestCase
+from noauth.models import User
+from units.models import MOVE_IN_PICTURE, Unit, UnitImage
+
+
+@override_settings(STATIC_URL="/s/")
+class FetchUrlTests(TestCase):
+    def test_static_files_read_from_disk(self):
+        with patch("weasyprint.default_url_fetcher") as default_url_fetcher:
+            result = fetch_url("http://localhost/s/img/logo-green.png")
+
+        default_url_fetcher.assert_not_called()
+        assert_that(result["mime_type"], equal_to("image/png"))
+        assert_that(result["string"], starts_with(b"\x89PNG"))
+
+    def test_missing_static_files_fetched_as_usual(self):
+        with patch("weasyprint.default_url_fetcher", return_value={"string": b""}) as default_url_fetcher:
+            fetch_url("http://localhost/s/img/does-not-exist.png")
+
+        default_url_fetcher.assert_called_once_with("http://localhost/s/img/does-not-exist.png")
+
+    def test_other_urls_fetched_as_usual(self):
+        with patch("weasyprint.default_url_fetcher", return_value={"string": b""}) as default_url_fetcher:
+            fetch_url("http://s3/uploads/image-500.jpg")
+
+        default_url_fetcher.assert_called_once_with("http://s3/uploads/image-500.jpg")
+
+    def test_static_files_cached(self):
+        read_static_file.cache_clear()
+        read_static_file("img/logo-green.png")
+        read_static_file("img/logo-green.png")
+        assert_that(read_static_file.cache_info().hits, equal_to(1))
+
+
+class RenderLettersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = User.objects.create(is_active=True, username="eleanor@shellstrop.com")
+        cls.unit = Unit.objects.create(unit_address_1="Unit address1", owner=cls.u)
+
+    @patch("documents.rendering.html_to_pdf")
+    @patch("documents.text_pdf.render_letters", return_value=b"text")
+    def test_plain_text_letters_rendered_without_weasyprint(self, text_render_letters, html_to_pdf):
+        dt = DocumentTemplate(name="DT", slug="dt", body="This is {{ value }}.")
+        pdf = render_letters(RenderLettersTests.u, [(dt, {"unit": RenderLettersTests.unit, "value": "<plain>"})])
+
+        assert_that(pdf, equal_to(b"text"))
+        html_to_pdf.assert_not_called()
+
+    @patch("documents.rendering.html_to_pdf", return_value=b"html")
+    def test_letters_with_markup_rendered_with_weasyprint(self, html_to_pdf):
+        dt = DocumentTemplate(name="DT", slug="dt", body="This is <strong>{{ value }}</strong>.")
+        pdf = render_letters(RenderLettersTests.u, [(dt, {"unit": RenderLettersTests.unit, "value": "important"})])
+
+        assert_that(pdf, equal_to(b"html"))
+        html_to_pdf.assert_called_once()
+
+    @override_settings(PLAIN_TEXT_LETTER_RENDERING=False)
+    @patch("documents.rendering.html_to_pdf", return_value=b"html")
+    def test_plain_text_rendering_can_be_disabled(self, html_to_pdf):
+        dt = DocumentTemplate(name="DT", slug="dt", body="This is {{ value }}.")
+        pdf = render_letters(RenderLettersTests.u, [(dt, {"unit": RenderLettersTests.unit, "value": "plain"})])
+
+        assert_that(pdf, equal_to(b"html"))
+
+
+@override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+@override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+@override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
+class RenderPhotoReportTests(UnitBaseTestCase):
+    def setUp(self):
+        for _ in range(3):
+            UnitImage.objects.create(
+                image=self.get_image_file(size=(20, 20)),
+                image_type=MOVE_IN_PICTURE,
+                unit=RenderPhotoReportTests.unit,
+                owner=RenderPhotoReportTests.u,
+            )
+
+    @override_settings(PHOTO_REPORT_CHUNK_SIZE=2)
+    @patch("documents.rendering.concatenate_pdfs", side_effect=list)
+    @patch("documents.rendering.html_to_pdf", side_effect=lambda html: html)
+    def test_pictures_rendered_in_chunks(self, html_to_pdf, concatenate_pdfs):
+        documents = render_photo_report(RenderPhotoReportTests.u, {"unit": RenderPhotoReportTests.unit}, "http://testserver")
+
+        assert_that(len(documents), equal_to(2))
+        assert_that(documents[0].count("Image uploaded at"), equal_to(2))
+        assert_that(documents[1].count("Image uploaded at"), equal_to(1))
+        assert_that(documents[0], contains_string("Rental Unit Photo Report"))
+        assert_that(documents[1], is_not(contains_string("Rental Unit Photo Report")))
+
+    @override_settings(PHOTO_REPORT_CHUNK_SIZE=2)
+    @patch("documents.rendering.concatenate_pdfs", side_effect=list)
+    @patch("documents.rendering.html_to_pdf", side_effect=lambda html: html)
+    def test_chunks_rendered_with_executor(self, html_to_pdf, concatenate_pdfs):
+        executor = Mock(map=Mock(side_effect=map))
+        documents = render_photo_report(
+            RenderPhotoReportTests.u, {"unit": RenderPhotoReportTests.unit}, "http://testserver", executor
+        )
+
+        assert_that(len(documents), equal_to(2))
+        executor.map.assert_called_once()
+
+    @override_settings(PHOTO_REPORT_CHUNK_SIZE=3)
+    @patch("documents.rendering.concatenate_pdfs")
+    @patch("documents.rendering.html_to_pdf", return_value=b"pdf")
+    def test_single_chunk_not_concatenated(self, html_to_pdf, concatenate_pdfs):
+        pdf = render_photo_report(RenderPhotoReportTests.u, {"unit": RenderPhotoReportTests.unit}, "http://testserver")
+
+        assert_that(pdf, equal_to(b"pdf"))
+        concatenate_pdfs.assert_not_called()
+
+
+class ConcatenatePdfsTests(UnitBaseTestCase):
+    def test_concatenate_pdfs(self):
+        letter = {"user": ConcatenatePdfsTests.u, "unit": ConcatenatePdfsTests.unit, "sender_address_1": "a"}
+        pdf = concatenate_pdfs(
+            [
+                text_pdf.render_letters([{**letter, **{"body": "First."}}]),
+                text_pdf.render_letters([{**letter, **{"body": "Second."}}, {**letter, **{"body": "Third."}}]),
+            ]
+        )
+
+        pdf_reader = PyPDF2.PdfFileReader(BytesIO(pdf), strict=False)
+        assert_that(pdf_reader.getNumPages(), equal_to(3))
+        assert_that(pdf_reader.getPage(0).extractText(), contains_string("First."))
+        assert_that(pdf_reader.getPage(2).extractText(), contains_string("Third."))
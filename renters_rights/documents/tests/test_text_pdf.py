@@ -0,0 +1,88 @@
+from io import BytesIO
+
+import PyPDF2
+from django.test import TestCase
+from hamcrest import assert_that, contains_string, equal_to
+
+from documents import text_pdf
+from noauth.models import User
+from units.models import Unit
+
+
+class TextPdfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = User.objects.create(is_active=True, username="eleanor@shellstrop.com", first_name="Eleanor", last_name="S")
+        cls.unit = Unit.objects.create(
+            unit_address_1="Unit address1",
+            unit_city="Louisville",
+            unit_state="KY",
+            unit_zip_code="40202",
+            landlord_address_1="Landlord address1",
+            landlord_zip_code="40206",
+            owner=cls.u,
+        )
+
+    def get_letter(self, body):
+        return {
+            "user": TextPdfTests.u,
+            "unit": TextPdfTests.unit,
+            "body": body,
+            "sender_first_name": "FirstName",
+            "sender_last_name": "LastName",
+            "sender_address_1": "Sender address1",
+        }
+
+    def test_wrap_collapses_whitespace(self):
+        assert_that(text_pdf.wrap("  a   b  "), equal_to(["a b"]))
+
+    def test_wrap_breaks_long_lines(self):
+        lines = text_pdf.wrap("word " * 100)
+        assert_that(len(lines) > 1, equal_to(True))
+        for line in lines:
+            assert_that(text_pdf.get_text_width(line) <= text_pdf.CONTENT_WIDTH, equal_to(True))
+
+    def test_wrap_breaks_long_words(self):
+        lines = text_pdf.wrap("w" * 200)
+        assert_that("".join(lines), equal_to("w" * 200))
+        assert_that(len(lines) > 1, equal_to(True))
+
+    def test_escape(self):
+        assert_that(text_pdf.escape("(a) \\ é"), equal_to("\\(a\\) \\\\ \xe9"))
+
+    def test_escape_unsupported_characters(self):
+        with self.assertRaises(text_pdf.UnsupportedContentError):
+            text_pdf.escape("日本")
+
+    def test_body_lines_unescaped(self):
+        assert_that(text_pdf.get_body_lines("a &amp; b\nc &lt;d&gt;"), equal_to(["a & b", "c <d>"]))
+
+    def test_body_with_markup_unsupported(self):
+        with self.assertRaises(text_pdf.UnsupportedContentError):
+            text_pdf.get_body_lines("This is <strong>important</strong>.")
+
+    def test_render_letters(self):
+        pdf = text_pdf.render_letters([self.get_letter("This is the first letter."), self.get_letter("This is the second.")])
+
+        pdf_reader = PyPDF2.PdfFileReader(BytesIO(pdf), strict=False)
+        assert_that(pdf_reader.getNumPages(), equal_to(2))
+        page_content = pdf_reader.getPage(0).extractText()
+        assert_that(page_content, contains_string("FirstName LastName"))
+        assert_that(page_content, contains_string("Landlord address1"))
+        assert_that(page_content, contains_string("Unit address1"))
+        assert_that(page_content, contains_string("Louisville, KY 40202"))
+        assert_that(page_content, contains_string("40206"))
+        assert_that(page_content, contains_string("This is the first letter."))
+        assert_that(pdf_reader.getPage(1).extractText(), contains_string("This is the second."))
+
+    def test_render_letter_with_header_longer_than_a_page_unsupported(self):
+        letter = {**self.get_letter("Body"), "sender_address_1": " ".join(["Sender address1"] * 200)}
+        with self.assertRaises(text_pdf.UnsupportedContentError):
+            text_pdf.render_letters([letter])
+
+    def test_render_long_letter_continues_on_next_page(self):
+        pdf = text_pdf.render_letters([self.get_letter("\n".join(f"Line {i}" for i in range(100)))])
+
+        pdf_reader = PyPDF2.PdfFileReader(BytesIO(pdf), strict=False)
+        assert_that(pdf_reader.getNumPages(), equal_to(3))
+        assert_that(pdf_reader.getPage(2).extractText(), contains_string("Line 99"))
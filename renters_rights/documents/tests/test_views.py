@@ -1,11 +1,13 @@
 from io import BytesIO
 
 import PyPDF2
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from hamcrest import assert_that, contains_string, equal_to
+from hamcrest import assert_that, contains_string, equal_to, has_key
 
-from documents.models import DocumentField, DocumentTemplate
+from documents.models import DocumentField, DocumentTemplate, GeneratedDocument
 from documents.tests import UnitBaseTestCase
 from noauth.models import User
 from units.models import MOVE_IN_PICTURE, Unit, UnitImage
@@ -14,6 +16,9 @@ from units.models import MOVE_IN_PICTURE, Unit, UnitImage
 class DocumentListViewTests(TestCase):
     view_url = reverse("documents:document-list")
 
+    def setUp(self):
+        cache.clear()
+
     def test_all_documents_are_shown(self):
         dt1 = DocumentTemplate.objects.create(name="DT1", slug="dt-1", body="""This is {{field_1}} and {{field_2}}.""")
         dt2 = DocumentTemplate.objects.create(name="DT2", slug="dt-2", body="""This is {{field_1}} and {{field_2}}.""")
@@ -72,6 +77,51 @@ class DocumentFormViewTests(UnitBaseTestCase):
         assert_that(page_content, contains_string("This is F1V and 100."))
 
 
+class BatchDocumentFormViewTests(UnitBaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.dt1 = DocumentTemplate.objects.create(name="DT1", slug="dt-1", body="""This is {{field_1}}.""")
+        cls.df1 = DocumentField.objects.create(name="field_1", required=True, field_type=DocumentField.TEXT, document=cls.dt1)
+        cls.dt2 = DocumentTemplate.objects.create(name="DT2", slug="dt-2", body="""That is {{field_1}}.""")
+        cls.df2 = DocumentField.objects.create(name="field_1", required=True, field_type=DocumentField.TEXT, document=cls.dt2)
+
+    def get_view_url(self):
+        return f"{reverse('documents:batch-document-form')}?id={self.dt1.id}&id={self.dt2.id}"
+
+    def test_batch_form_without_templates_returns_404(self):
+        c = Client()
+        c.force_login(BatchDocumentFormViewTests.u)
+        response = c.get(reverse("documents:batch-document-form"))
+        assert_that(response.status_code, equal_to(404))
+
+    def test_batch_form_rendered_with_fields_from_all_templates(self):
+        c = Client()
+        c.force_login(BatchDocumentFormViewTests.u)
+        response = c.get(self.get_view_url())
+        self.assertContains(response, "DT1: field_1")
+        self.assertContains(response, "DT2: field_1")
+
+    def test_pdf(self):
+        c = Client()
+        c.force_login(BatchDocumentFormViewTests.u)
+        response = c.post(
+            self.get_view_url(),
+            {
+                "sender_first_name": "FirstName",
+                "sender_last_name": "LastName",
+                "unit": [BatchDocumentFormViewTests.unit.id],
+                "use_unit_address": True,
+                f"{self.dt1.id}_field_1": "F1V",
+                f"{self.dt2.id}_field_1": "F2V",
+            },
+        )
+        pdf_reader = PyPDF2.PdfFileReader(BytesIO(response.content), strict=False)
+        assert_that(pdf_reader.getNumPages(), equal_to(2))
+        assert_that(pdf_reader.getPage(0).extractText(), contains_string("This is F1V."))
+        assert_that(pdf_reader.getPage(1).extractText(), contains_string("That is F2V."))
+
+
 class PhotosDocumentFormViewTests(UnitBaseTestCase):
     @classmethod
     def setUpTestData(cls):
@@ -109,6 +159,80 @@ class PhotosDocumentFormViewTests(UnitBaseTestCase):
         assert_that(page_content, contains_string("Image uploaded at"))
 
 
+@override_settings(ASYNC_DOCUMENT_GENERATION=True)
+class AsyncPhotosDocumentFormViewTests(UnitBaseTestCase):
+    form_data = {"sender_first_name": "FirstName", "sender_last_name": "LastName", "use_unit_address": True}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.u_img1 = UnitImage.objects.create(
+            image=cls.get_image_file(size=(200, 200)), image_type=MOVE_IN_PICTURE, unit=cls.unit, owner=cls.u
+        )
+
+    def setUp(self):
+        self.c = Client()
+        self.c.force_login(AsyncPhotosDocumentFormViewTests.u)
+
+    def post_form(self):
+        return self.c.post(
+            reverse("documents:photos-document-form"), {**self.form_data, "unit": AsyncPhotosDocumentFormViewTests.unit.id}
+        )
+
+    def test_form_queues_document_and_redirects_to_status_page(self):
+        response = self.post_form()
+        document = GeneratedDocument.objects.get(owner=AsyncPhotosDocumentFormViewTests.u)
+        self.assertRedirects(response, document.get_absolute_url())
+        assert_that(document.status, equal_to(GeneratedDocument.PENDING))
+        assert_that(document.document_type, equal_to(GeneratedDocument.PHOTO_REPORT))
+
+    def test_repeat_submissions_reuse_document(self):
+        self.post_form()
+        self.post_form()
+        assert_that(GeneratedDocument.objects.filter(owner=AsyncPhotosDocumentFormViewTests.u).count(), equal_to(1))
+
+    def test_submission_after_deleting_a_picture_does_not_reuse_document(self):
+        self.post_form()
+        UnitImage.objects.get(id=AsyncPhotosDocumentFormViewTests.u_img1.id).delete()
+        self.post_form()
+        assert_that(GeneratedDocument.objects.filter(owner=AsyncPhotosDocumentFormViewTests.u).count(), equal_to(2))
+
+    def test_status_of_pending_document_has_no_download_url(self):
+        self.post_form()
+        document = GeneratedDocument.objects.get(owner=AsyncPhotosDocumentFormViewTests.u)
+        response = self.c.get(reverse("documents:generated-document-status", args=[document.token]))
+        self.assertJSONEqual(str(response.content, encoding="utf8"), {"status": GeneratedDocument.PENDING})
+
+    def test_status_of_another_users_document_returns_404(self):
+        self.post_form()
+        document = GeneratedDocument.objects.get(owner=AsyncPhotosDocumentFormViewTests.u)
+
+        c = Client()
+        c.force_login(User.objects.create(is_active=True, username="rando@example.com"))
+        response = c.get(reverse("documents:generated-document-status", args=[document.token]))
+        assert_that(response.status_code, equal_to(404))
+
+    def test_download_with_invalid_signature_returns_404(self):
+        response = self.c.get(reverse("documents:generated-document-download", args=["not-a-signed-token"]))
+        assert_that(response.status_code, equal_to(404))
+
+    def test_generate_documents_command_renders_document(self):
+        self.post_form()
+        call_command("generate_documents", "--once")
+
+        document = GeneratedDocument.objects.get(owner=AsyncPhotosDocumentFormViewTests.u)
+        assert_that(document.status, equal_to(GeneratedDocument.COMPLETE))
+
+        response = self.c.get(reverse("documents:generated-document-status", args=[document.token]))
+        assert_that(response.json(), has_key("download_url"))
+
+        response = self.c.get(response.json()["download_url"])
+        pdf_reader = PyPDF2.PdfFileReader(BytesIO(b"".join(response.streaming_content)), strict=False)
+        page_content = pdf_reader.getPage(0).extractText()
+        assert_that(page_content, contains_string("FirstName"))
+        assert_that(page_content, contains_string("Image uploaded at"))
+
+
 class SmallClaimsDocumentFormViewTests(UnitBaseTestCase):
     @classmethod
     def setUpTestData(cls):
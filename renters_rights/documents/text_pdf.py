@@ -0,0 +1,312 @@
+import html
+import re
+import zlib
+from functools import lru_cache
+from io import BytesIO
+
+from django.utils import dateformat, timezone
+from PIL import Image
+
+from lib.lazy import pdfrw
+
+# Page layout matches the @page rules in basic_letter.html.
+POINTS_PER_CM = 72 / 2.54
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN_TOP = 2.5 * POINTS_PER_CM
+MARGIN_RIGHT = 1.5 * POINTS_PER_CM
+MARGIN_BOTTOM = 3.5 * POINTS_PER_CM
+MARGIN_LEFT = 1.5 * POINTS_PER_CM
+CONTENT_WIDTH = PAGE_WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+FOOTER_IMAGE_HEIGHT = 1.5 * POINTS_PER_CM
+FOOTER_IMAGE_TOP = MARGIN_BOTTOM - 0.3 * POINTS_PER_CM
+
+FONT_SIZE = 12
+LINE_HEIGHT = 14
+ENCODING = "cp1252"
+
+# Advance widths of the printable ASCII characters in Helvetica, in thousandths of the font size, from the font's AFM.
+# fmt: off
+HELVETICA_WIDTHS = dict(
+    zip(
+        " !\"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~",
+        [
+            278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556, 556, 556,
+            556, 556, 556, 556, 278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667,
+            556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556, 333, 556,
+            556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500, 278, 556, 500, 722,
+            500, 500, 500, 334, 260, 334, 584,
+        ],
+    )
+)
+# fmt: on
+DEFAULT_WIDTH = 556
+
+# Anything that looks like an HTML tag needs WeasyPrint to lay it out.
+MARKUP_PATTERN = re.compile(r"<[a-zA-Z!/?]")
+
+
+class UnsupportedContentError(ValueError):
+    """Raised when a letter contains content that the plain text renderer can't lay out."""
+
+
+def get_text_width(text):
+    return sum(HELVETICA_WIDTHS.get(c, DEFAULT_WIDTH) for c in text) * FONT_SIZE / 1000
+
+
+def wrap(text, width=CONTENT_WIDTH):
+    """Wraps a line of text to fit within a width, collapsing whitespace the same way HTML does.
+
+    Args:
+      text: the line of text to wrap.
+      width: the maximum width of each line, in points.
+
+    Returns: a list of lines.
+    """
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if get_text_width(candidate) <= width:
+            line = candidate
+            continue
+
+        if line:
+            lines.append(line)
+        # Words that are wider than a whole line are broken wherever they run out of room.
+        while get_text_width(word) > width:
+            split = len(word) - 1
+            while split > 1 and get_text_width(word[:split]) > width:
+                split -= 1
+            lines.append(word[:split])
+            word = word[split:]
+        line = word
+
+    lines.append(line)
+    return lines
+
+
+def escape(text):
+    """Encodes text as the contents of a PDF string using the font's WinAnsi encoding.
+
+    Args:
+      text: the text to encode.
+
+    Returns: the escaped text as a string of WinAnsi code points, ready to be written to a content stream.
+    """
+    try:
+        encoded = text.encode(ENCODING).decode("latin-1")
+    except UnicodeEncodeError:
+        raise UnsupportedContentError(f"Text can't be encoded as {ENCODING}")
+
+    return encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def get_body_lines(body):
+    """Converts a rendered document template body to lines of plain text.
+
+    Args:
+      body: the rendered body of the letter.
+
+    Returns: a list of lines.
+
+    Raises:
+      UnsupportedContentError: if the body contains markup.
+    """
+    if MARKUP_PATTERN.search(body):
+        raise UnsupportedContentError("Body contains markup")
+
+    # The body is autoescaped when it's rendered, so entities need to be turned back into the characters they represent.
+    return html.unescape(body).splitlines() or [""]
+
+
+def get_letter_blocks(letter):
+    """Gets the lines of a letter's sender, recipient and text blocks, in the same order basic_letter.html shows them.
+
+    Args:
+      letter: a letter context, as passed to basic_letter.html.
+
+    Returns: a tuple of (sender lines, recipient lines, text lines).
+    """
+    user = letter["user"]
+    unit = letter["unit"]
+
+    if letter.get("sender_first_name") and letter.get("sender_last_name"):
+        sender = [f"{letter['sender_first_name']} {letter['sender_last_name']}"]
+    else:
+        sender = [f"{user.first_name} {user.last_name}"]
+    sender.append(str(letter.get("sender_address_1") or ""))
+    if letter.get("sender_address_2"):
+        sender.append(str(letter["sender_address_2"]))
+    if letter.get("sender_city") and letter.get("sender_state") and letter.get("sender_zip_code"):
+        sender.append(f"{letter['sender_city']}, {letter['sender_state']} {letter['sender_zip_code']}")
+    if letter.get("sender_phone"):
+        sender.append(str(letter["sender_phone"]))
+    if letter.get("sender_email"):
+        sender.append(str(letter["sender_email"]))
+
+    recipient = [unit.landlord_address_1 or ""]
+    if unit.landlord_address_2:
+        recipient.append(unit.landlord_address_2)
+    recipient.append(f"{unit.landlord_city or ''}, {unit.landlord_state or ''} {unit.landlord_zip_code or ''}")
+    recipient += ["", "", "", dateformat.format(timezone.now(), "jS F Y"), "", ""]
+
+    text = ["To Whom It May Concern,", "", "", "This letter regards the rental unit located at:", unit.unit_address_1]
+    if unit.unit_address_2:
+        text.append(unit.unit_address_2)
+    if unit.unit_city and unit.unit_state and unit.unit_zip_code:
+        text.append(f"{unit.unit_city}, {unit.unit_state} {unit.unit_zip_code}")
+    text += ["", ""]
+    text += get_body_lines(letter["body"])
+    text += ["", "Sincerely,", "", "", "", "", "", f"{user.first_name} {user.last_name}"]
+
+    return sender, recipient, text
+
+
+@lru_cache(maxsize=4)
+def get_image_data(image):
+    """Decodes an image into compressed samples that can be used in a PDF image XObject. The results are cached since
+    the same logos are drawn on every page.
+
+    Args:
+      image: the image file's contents.
+
+    Returns: a tuple of (width, height, compressed RGB samples, compressed alpha samples).
+    """
+    im = Image.open(BytesIO(image)).convert("RGBA")
+    return (im.width, im.height, zlib.compress(im.convert("RGB").tobytes()), zlib.compress(im.getchannel("A").tobytes()))
+
+
+def get_image_xobject(image):
+    width, height, rgb, alpha = get_image_data(image)
+    image_dict = {
+        "Type": pdfrw.PdfName.XObject,
+        "Subtype": pdfrw.PdfName.Image,
+        "Width": width,
+        "Height": height,
+        "BitsPerComponent": 8,
+        "Filter": pdfrw.PdfName.FlateDecode,
+    }
+    mask = pdfrw.PdfDict(ColorSpace=pdfrw.PdfName.DeviceGray, **image_dict)
+    mask.stream = alpha.decode("latin-1")
+    xobject = pdfrw.PdfDict(ColorSpace=pdfrw.PdfName.DeviceRGB, SMask=mask, **image_dict)
+    xobject.stream = rgb.decode("latin-1")
+    return xobject
+
+
+class LetterWriter:
+    """Lays out plain text letters directly as PDF text operators, using the standard Helvetica font so no fonts need
+    to be loaded or embedded.
+    """
+
+    def __init__(self, footer_left=None, footer_right=None):
+        self.pages = []
+        self.operations = []
+        self.y = 0
+        self.font = pdfrw.PdfDict(
+            Type=pdfrw.PdfName.Font,
+            Subtype=pdfrw.PdfName.Type1,
+            BaseFont=pdfrw.PdfName.Helvetica,
+            Encoding=pdfrw.PdfName.WinAnsiEncoding,
+        )
+        self.footer_images = {}
+        self.footer = []
+
+        if footer_left:
+            self.add_footer_image("ImL", footer_left, lambda width: MARGIN_LEFT)
+        if footer_right:
+            self.add_footer_image("ImR", footer_right, lambda width: PAGE_WIDTH - MARGIN_RIGHT - width)
+
+    def add_footer_image(self, name, image, get_x):
+        xobject = get_image_xobject(image)
+        width = FOOTER_IMAGE_HEIGHT * int(xobject.Width) / int(xobject.Height)
+        y = FOOTER_IMAGE_TOP - FOOTER_IMAGE_HEIGHT
+        self.footer_images[name] = xobject
+        self.footer.append(f"q {width:.2f} 0 0 {FOOTER_IMAGE_HEIGHT:.2f} {get_x(width):.2f} {y:.2f} cm /{name} Do Q")
+
+    def new_page(self):
+        self.finish_page()
+        self.operations = list(self.footer)
+        self.y = PAGE_HEIGHT - MARGIN_TOP
+
+    def finish_page(self):
+        if not self.operations:
+            return
+
+        contents = pdfrw.PdfDict()
+        contents.stream = "\n".join(self.operations)
+        self.pages.append(
+            pdfrw.PdfDict(
+                Type=pdfrw.PdfName.Page,
+                MediaBox=pdfrw.PdfArray([0, 0, PAGE_WIDTH, PAGE_HEIGHT]),
+                Resources=pdfrw.PdfDict(Font=pdfrw.PdfDict(F1=self.font), XObject=pdfrw.PdfDict(**self.footer_images)),
+                Contents=contents,
+            )
+        )
+        self.operations = []
+
+    def write_lines(self, lines, x):
+        """Writes lines of text starting at the current position, moving to new pages as needed.
+
+        Args:
+          lines: lines of text, each of which fits within the content width.
+          x: the horizontal position of the lines.
+        """
+        for line in lines:
+            if self.y - LINE_HEIGHT < MARGIN_BOTTOM:
+                self.new_page()
+            self.y -= LINE_HEIGHT
+            if line:
+                # Place the baseline so the text is vertically centered in its line, as it is in HTML.
+                baseline = self.y + (LINE_HEIGHT - FONT_SIZE) / 2 + 0.22 * FONT_SIZE
+                self.operations.append(f"BT /F1 {FONT_SIZE} Tf {x:.2f} {baseline:.2f} Td ({escape(line)}) Tj ET")
+
+    def add_letter(self, letter):
+        sender, recipient, text = get_letter_blocks(letter)
+        sender = [wrapped for line in sender for wrapped in wrap(line, CONTENT_WIDTH / 2)]
+        recipient = [wrapped for line in recipient for wrapped in wrap(line, CONTENT_WIDTH / 2)]
+        text = [wrapped for line in text for wrapped in wrap(line)]
+
+        self.new_page()
+        top = self.y
+        # The sender and recipient blocks are drawn side by side, so both have to fit on the first page.
+        if LINE_HEIGHT * max(len(sender), len(recipient)) > top - MARGIN_BOTTOM:
+            raise UnsupportedContentError("Sender and recipient blocks don't fit on one page")
+        self.write_lines(sender, MARGIN_LEFT)
+
+        # The recipient block is floated right, so it's as wide as its widest line and ends at the right margin.
+        self.y = top
+        self.write_lines(recipient, PAGE_WIDTH - MARGIN_RIGHT - max(get_text_width(line) for line in recipient))
+
+        self.y = top - LINE_HEIGHT * max(len(sender), len(recipient))
+        self.write_lines(text, MARGIN_LEFT)
+
+    def write(self):
+        self.finish_page()
+        writer = pdfrw.PdfWriter(compress=True)
+        for page in self.pages:
+            writer.addpage(page)
+
+        pdf = BytesIO()
+        writer.write(pdf)
+        return pdf.getvalue()
+
+
+def render_letters(letters, footer_left=None, footer_right=None):
+    """Renders plain text letters into a single PDF without going through HTML layout, with each letter starting on a
+    new page.
+
+    Args:
+      letters: a list of letter contexts, as passed to basic_letter.html.
+      footer_left: the contents of an image to draw at the bottom left of each page.
+      footer_right: the contents of an image to draw at the bottom right of each page.
+
+    Returns: the PDF as bytes.
+
+    Raises:
+      UnsupportedContentError: if a letter contains markup or characters that can't be rendered.
+    """
+    writer = LetterWriter(footer_left, footer_right)
+    for letter in letters:
+        writer.add_letter(letter)
+    return writer.write()
@@ -1,12 +1,25 @@
 from django.conf.urls import url
 from django.urls import path
 
-from .views import DocumentFormView, DocumentListView, PhotosDocumentFormView, SmallClaimsDocumentFormView
+from .views import (
+    BatchDocumentFormView,
+    DocumentFormView,
+    DocumentListView,
+    GeneratedDocumentDownloadView,
+    GeneratedDocumentStatusView,
+    GeneratedDocumentView,
+    PhotosDocumentFormView,
+    SmallClaimsDocumentFormView,
+)
 
 app_name = "documents"
 urlpatterns = [
     url(r"^$", DocumentListView.as_view(), name="document-list"),
     path("<int:id>/", DocumentFormView.as_view(), name="document-form"),
+    path("batch/", BatchDocumentFormView.as_view(), name="batch-document-form"),
     path("photos/", PhotosDocumentFormView.as_view(), name="photos-document-form"),
     path("small-claims/", SmallClaimsDocumentFormView.as_view(), name="small-claims-document-form"),
+    path("generated/<uuid:token>/", GeneratedDocumentView.as_view(), name="generated-document"),
+    path("generated/<uuid:token>/status/", GeneratedDocumentStatusView.as_view(), name="generated-document-status"),
+    path("download/<str:signed_token>/", GeneratedDocumentDownloadView.as_view(), name="generated-document-download"),
 ]
@@ -1,20 +1,22 @@
-import io
 import os
 import tempfile
 
-import pdfrw
 from django.conf import settings
 from django.contrib import messages
-from django.http import HttpResponse
-from django.template import Context, Template
-from django.template.loader import render_to_string
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import FormView, ListView
-from weasyprint import HTML
 
-from documents.forms import DocumentForm, PhotosDocumentForm, SmallClaimsDocumentForm
-from documents.models import DocumentTemplate
+from documents.catalog import get_document_catalog
+from documents.forms import BatchDocumentForm, DocumentForm, PhotosDocumentForm, SmallClaimsDocumentForm
+from documents.models import DocumentTemplate, GeneratedDocument
+from documents.rendering import render_letters, render_photo_report, serialize_form_data
+from lib.cache import cache_anonymous_page
+from lib.lazy import pdfrw
 from lib.views import ProtectedView, get_next_page_from_request
 
 ANNOT_KEY = "/Annots"
@@ -25,6 +27,7 @@ SUBTYPE_KEY = "/Subtype"
 WIDGET_SUBTYPE_KEY = "/Widget"
 
 
+@method_decorator(cache_anonymous_page, name="dispatch")
 class DocumentListView(ListView):
     model = DocumentTemplate
     context_object_name = "document_list"
@@ -35,7 +38,7 @@ class DocumentListView(ListView):
         return context
 
     def get_queryset(self):
-        return DocumentTemplate.objects.all()
+        return get_document_catalog()
 
 
 class DocumentFormView(FormView, ProtectedView):
@@ -56,16 +59,48 @@ class DocumentFormView(FormView, ProtectedView):
 
     def form_valid(self, form):
         document_template = DocumentTemplate.objects.get(id=self.kwargs["id"])
+        pdf = render_letters(self.request.user, [(document_template, form.cleaned_data)])
 
-        body = Template(document_template.body).render(Context(form.cleaned_data))
-        context = {**form.cleaned_data, **{"body": body, "user": self.request.user}}
-        pdf_html = render_to_string("basic_letter.html", context)
+        response = HttpResponse(pdf, content_type="application/pdf")
+        response["Content-Disposition"] = f"attachment; filename={document_template.file_name}.pdf"
+        messages.add_message(self.request, messages.SUCCESS, _("File downloaded."))
+        return response
 
-        pdf = io.BytesIO()
-        HTML(string=pdf_html).write_pdf(pdf)
 
-        response = HttpResponse(pdf.getvalue(), content_type="application/pdf")
-        response["Content-Disposition"] = f"attachment; filename={document_template.file_name}.pdf"
+class BatchDocumentFormView(FormView, ProtectedView):
+    """Creates letters from several document templates, for one or more units, in a single PDF.
+    Document templates are selected using id query string parameters, e.g. ?id=1&id=2.
+    """
+
+    template_name = "documents/document_form.html"
+    form_class = BatchDocumentForm
+
+    def get_document_templates(self):
+        if not hasattr(self, "_document_templates"):
+            ids = [i for i in self.request.GET.getlist("id") if i.isdigit()]
+            document_templates = DocumentTemplate.objects.filter(id__in=ids).prefetch_related("document_fields")
+            self._document_templates = sorted(document_templates, key=lambda d: ids.index(str(d.id)))
+            if not self._document_templates:
+                raise Http404
+        return self._document_templates
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["form_name"] = ", ".join(d.name for d in self.get_document_templates())
+        context["next_page"] = get_next_page_from_request(self.request, reverse_lazy("documents:document-list"))
+        return context
+
+    def get_form_kwargs(self):
+        form_kwargs = super().get_form_kwargs()
+        form_kwargs["document_templates"] = self.get_document_templates()
+        form_kwargs["user"] = self.request.user
+        return form_kwargs
+
+    def form_valid(self, form):
+        pdf = render_letters(self.request.user, form.get_letters())
+
+        response = HttpResponse(pdf, content_type="application/pdf")
+        response["Content-Disposition"] = "attachment; filename=Letters.pdf"
         messages.add_message(self.request, messages.SUCCESS, _("File downloaded."))
         return response
 
@@ -78,6 +113,7 @@ class PhotosDocumentFormView(FormView, ProtectedView):
         context = super().get_context_data(**kwargs)
         context["form_name"] = _("Date-verified Photo Report")
         context["next_page"] = get_next_page_from_request(self.request, reverse_lazy("documents:document-list"))
+        context["async_generation"] = settings.ASYNC_DOCUMENT_GENERATION
         return context
 
     def get_form_kwargs(self):
@@ -86,20 +122,63 @@ class PhotosDocumentFormView(FormView, ProtectedView):
         return form_kwargs
 
     def form_valid(self, form):
-        context = {
-            **form.cleaned_data,
-            **{"user": self.request.user, "site_name": settings.SITE_NAME, "site_url": self.request.build_absolute_uri("/")},
-        }
-        pdf_html = render_to_string("photo_report.html", context)
+        if settings.ASYNC_DOCUMENT_GENERATION:
+            return self.queue_document(form)
 
-        pdf = io.BytesIO()
-        HTML(string=pdf_html).write_pdf(pdf)
+        pdf = render_photo_report(self.request.user, form.cleaned_data, self.request.build_absolute_uri("/"))
 
-        response = HttpResponse(pdf.getvalue(), content_type="application/pdf")
+        response = HttpResponse(pdf, content_type="application/pdf")
         response["Content-Disposition"] = "attachment; filename=PhotoReport.pdf"
         messages.add_message(self.request, messages.SUCCESS, _("File downloaded."))
         return response
 
+    def queue_document(self, form):
+        parameters = serialize_form_data(form.cleaned_data)
+        # The report includes the unit's pictures, so a report generated before pictures were added or deleted can't be
+        # reused. Saving an image updates the unit's modified_at, but deleting one only changes its image count.
+        unit = form.cleaned_data["unit"]
+        parameters["unit_modified_at"] = unit.modified_at.isoformat()
+        parameters["unit_image_count"] = unit.image_count
+        parameters["site_url"] = self.request.build_absolute_uri("/")
+
+        document, created = GeneratedDocument.get_or_create_for_user(
+            self.request.user, GeneratedDocument.PHOTO_REPORT, parameters, "PhotoReport.pdf"
+        )
+        return redirect(document)
+
+
+class GeneratedDocumentView(ProtectedView):
+    """Shows the status of a generated document. The page polls GeneratedDocumentStatusView until the document is ready."""
+
+    def get(self, request, token):
+        document = GeneratedDocument.objects.get_for_user(request.user, token=token)
+        return render(
+            request,
+            "documents/generated_document.html",
+            {"document": document, "next_page": get_next_page_from_request(request, reverse_lazy("documents:document-list"))},
+        )
+
+
+class GeneratedDocumentStatusView(ProtectedView):
+    def get(self, request, token):
+        document = GeneratedDocument.objects.get_for_user(request.user, token=token)
+        data = {"status": document.status}
+        if document.status == GeneratedDocument.COMPLETE:
+            data["download_url"] = document.get_download_url()
+        return JsonResponse(data)
+
+
+class GeneratedDocumentDownloadView(ProtectedView):
+    def get(self, request, signed_token):
+        token = GeneratedDocument.get_token_from_signed_token(signed_token)
+        if not token:
+            raise Http404
+
+        document = GeneratedDocument.objects.get_for_user(
+            request.user, token=token, status=GeneratedDocument.COMPLETE, expires_at__gt=timezone.now()
+        )
+        return FileResponse(document.file.open("rb"), as_attachment=True, filename=document.file_name)
+
 
 class SmallClaimsDocumentFormView(FormView, ProtectedView):
     template_name = "documents/document_form.html"
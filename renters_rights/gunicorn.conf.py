@@ -0,0 +1,54 @@
+"""Gunicorn settings for the web process. See docs/deploy.rst."""
+import gc
+import os
+import sys
+
+# Heroku sets WEB_CONCURRENCY based on the dyno size.
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+
+# Threads share their worker's memory, so gthread serves more concurrent requests per MiB than extra workers. This
+# defaults to MAX_THREAD_POOL_WORKERS, which also sizes the thread pool used to process uploaded images.
+threads = int(os.getenv("GUNICORN_THREADS") or os.getenv("MAX_THREAD_POOL_WORKERS") or 1)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+# Load the app once in the master so workers share its memory instead of each importing it.
+preload_app = True
+
+# Recycle workers to bound memory growth. The jitter keeps them from all restarting at the same time.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+accesslog = "-"
+
+
+def reset_connections():
+    """Closes connections opened while loading the app, so workers never share a socket."""
+    from django.core.cache import caches
+    from django.core.files.storage import default_storage
+    from django.db import connections
+    from django.utils.functional import empty
+
+    for connection in connections.all():
+        connection.close()
+
+    for cache in caches.all():
+        cache.close()
+
+    # Storage backends and boto3 sessions hold on to HTTP connections, so they're recreated when they're next used.
+    default_storage._wrapped = empty
+    if "boto3" in sys.modules:
+        sys.modules["boto3"].DEFAULT_SESSION = None
+
+
+def pre_fork(server, worker):
+    # Closing connections in the master means a worker closing its copy can't end a session another worker inherited.
+    reset_connections()
+
+    # Move everything the master has loaded out of the garbage collector's reach. Otherwise collections in the
+    # workers would write to the objects' headers and copy the pages they're on, undoing the sharing from preload_app.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    reset_connections()
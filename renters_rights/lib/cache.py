@@ -0,0 +1,238 @@
+import hashlib
+import math
+import random
+import time
+import uuid
+from collections import namedtuple
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.translation import get_language
+
+
+def get_user_cache_version_key(user_id):
+    return f"user-cache-version-{user_id}"
+
+
+def bump_user_cache_version(user_id):
+    """Invalidates everything cached with a user's cache version, e.g. their cached pages.
+
+    Args:
+      user_id: the ID of the user whose cached data has changed.
+    """
+    # A random version can't be reused if the version is evicted from the cache, unlike a counter.
+    cache.set(get_user_cache_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def get_user_snapshot_key(user_id):
+    return f"user-snapshot-{user_id}"
+
+
+def invalidate_user_snapshot(user_id):
+    """Removes the cached copy of a user's fields that requests are authenticated with, see
+    noauth.backends.CachedModelBackend. Call this after updating a user without saving the model instance.
+
+    The snapshot is removed once the current transaction commits, if there is one. Removing it earlier would let a
+    concurrent request cache the user's old fields again before the change is visible to it.
+
+    Args:
+      user_id: the ID of the user who has changed.
+    """
+    transaction.on_commit(lambda: cache.delete(get_user_snapshot_key(user_id)))
+
+
+# A value cached by get_or_compute, with how long it took to compute and the time from which it's stale.
+CachedValue = namedtuple("CachedValue", ["value", "compute_seconds", "stale_at"])
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None):
+    """Gets a value from the cache, computing and caching it when it's missing or stale, in a way that stops every
+    request from recomputing a popular key at the same time when it expires.
+
+    A value is refreshed early with a probability that rises as it gets closer to going stale, and faster for values
+    that take longer to compute, so usually one request refreshes it before it goes stale. Once a value is stale, the
+    request that takes a lock recomputes it while other requests keep getting the stale value. Requests that find no
+    value wait up to STAMPEDE_LOCK_TIMEOUT for the request with the lock, rather than computing it too.
+
+    Args:
+      key: the cache key.
+      compute: a function that computes the value.
+      timeout: the most seconds the value is cached for.
+      stale_timeout: seconds at the end of the timeout for which the value is stale. Defaults to STAMPEDE_STALE_SECONDS.
+
+    Returns: the value.
+    """
+    stale_timeout = settings.STAMPEDE_STALE_SECONDS if stale_timeout is None else stale_timeout
+    cached = cache.get(key)
+    if not isinstance(cached, CachedValue):
+        cached = None
+    elif time.time() - cached.compute_seconds * settings.STAMPEDE_BETA * math.log(1 - random.random()) < cached.stale_at:
+        return cached.value
+
+    lock_key = f"lock-{key}"
+    locked = cache.add(lock_key, True, settings.STAMPEDE_LOCK_TIMEOUT)
+    if not locked:
+        if cached:
+            return cached.value
+
+        deadline = time.monotonic() + settings.STAMPEDE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            cached = cache.get(key)
+            if isinstance(cached, CachedValue):
+                return cached.value
+
+    try:
+        start = time.monotonic()
+        value = compute()
+        compute_seconds = time.monotonic() - start
+        cache.set(key, CachedValue(value, compute_seconds, time.time() + max(timeout - stale_timeout, 0)), timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def get_user_page_cache_key(request):
+    """Gets the key a page is cached under for the requesting user.
+
+    Pages are only cached for logged in users with a CSRF cookie, since the page's CSRF token is only valid with that
+    cookie, and never while there are messages waiting to be shown.
+
+    Args:
+      request: the request for the page.
+
+    Returns: the cache key, or None if the page shouldn't be cached.
+    """
+    if request.method not in ("GET", "HEAD") or not request.user.is_authenticated:
+        return None
+
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    if not csrf_cookie or len(messages.get_messages(request)):
+        return None
+
+    page_hash = hashlib.md5(f"{request.get_full_path()}:{csrf_cookie}".encode()).hexdigest()
+    return f"user-page-{request.user.id}-{get_language()}-{page_hash}"
+
+
+class UserPageCacheMixin:
+    """Caches a view's whole response per user for USER_PAGE_CACHE_SECONDS, or until bump_user_cache_version is called
+    for that user. The timeout keeps pages from outliving the signed image URLs in them, see AWS_QUERYSTRING_EXPIRE.
+
+    Each cached response is stored with the user's cache version, so a repeat view only costs one cache lookup.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        cache_key = get_user_page_cache_key(request)
+        if not cache_key:
+            return super().dispatch(request, *args, **kwargs)
+
+        version_key = get_user_cache_version_key(request.user.id)
+        cached = cache.get_many([cache_key, version_key])
+        version = cached.get(version_key)
+        if version is not None and cache_key in cached:
+            cached_version, response = cached[cache_key]
+            if cached_version == version:
+                return response
+
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(version_key, version, None):
+                version = cache.get(version_key)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+
+            def cache_response(r):
+                cache.set(cache_key, (version, r), settings.USER_PAGE_CACHE_SECONDS)
+
+            if hasattr(response, "render") and callable(response.render):
+                response.add_post_render_callback(cache_response)
+            else:
+                cache_response(response)
+
+        return response
+
+
+# Cache key of the version of the cached anonymous pages, which changes whenever content they show changes. It must not
+# start with one of LOCAL_CACHE_KEY_PREFIXES, so every process sees a new version as soon as it's set.
+ANONYMOUS_PAGE_CACHE_VERSION_KEY = "anonymous-cache-version"
+
+
+def bump_anonymous_page_cache_version():
+    """Invalidates every page cached by cache_anonymous_page, e.g. after a document template or flatpage changes."""
+    cache.set(ANONYMOUS_PAGE_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_anonymous_page_cache_key(request):
+    """Gets the key a page is cached under for visitors who aren't logged in.
+
+    Pages are only cached for requests without a session or messages cookie, since those can change what a page shows.
+    Without a session cookie, the visitor can't be logged in.
+
+    Args:
+      request: the request for the page.
+
+    Returns: the cache key, or None if the page shouldn't be cached.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    if settings.SESSION_COOKIE_NAME in request.COOKIES or CookieStorage.cookie_name in request.COOKIES:
+        return None
+
+    page_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"anonymous-page-{get_language()}-{page_hash}"
+
+
+def cache_anonymous_page(view):
+    """Decorator for views that caches their whole response for visitors who aren't logged in, for
+    ANONYMOUS_PAGE_CACHE_SECONDS or until bump_anonymous_page_cache_version is called.
+
+    Responses say they can be cached by a proxy for as long, varying on the Accept-Language and Cookie headers, so a
+    proxy only shares them between visitors without cookies. Browsers are told to check back each time, so they don't
+    show a cached logged out page after logging in.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cache_key = get_anonymous_page_cache_key(request)
+        if not cache_key:
+            return view(request, *args, **kwargs)
+
+        cached = cache.get_many([cache_key, ANONYMOUS_PAGE_CACHE_VERSION_KEY])
+        version = cached.get(ANONYMOUS_PAGE_CACHE_VERSION_KEY)
+        if version is not None and cache_key in cached:
+            cached_version, response = cached[cache_key]
+            if cached_version == version:
+                return response
+
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(ANONYMOUS_PAGE_CACHE_VERSION_KEY, version, None):
+                version = cache.get(ANONYMOUS_PAGE_CACHE_VERSION_KEY)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+
+            def cache_response(r):
+                # A page that sets a cookie, e.g. by using a CSRF token, is specific to this visitor.
+                if r.cookies or request.META.get("CSRF_COOKIE_USED"):
+                    return
+                patch_cache_control(r, public=True, max_age=0, s_maxage=settings.ANONYMOUS_PAGE_CACHE_SECONDS)
+                patch_vary_headers(r, ("Accept-Language", "Cookie"))
+                cache.set(cache_key, (version, r), settings.ANONYMOUS_PAGE_CACHE_SECONDS)
+
+            if hasattr(response, "render") and callable(response.render):
+                response.add_post_render_callback(cache_response)
+            else:
+                cache_response(response)
+
+        return response
+
+    return wrapper
@@ -0,0 +1,220 @@
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Local copies are shared by every thread in the process, like LocMemCache's.
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LocalStore:
+    """A size-bounded LRU of pickled values with expiry times."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = None
+        self.checked_at = 0
+
+    def get(self, key):
+        """Gets a value.
+
+        Returns: a (hit, value) tuple.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return False, None
+            self.entries.move_to_end(key)
+        return True, pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def get_local_store(name, max_entries):
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = LocalStore(max_entries)
+        return _stores[name]
+
+
+class TwoTierCache(BaseCache):
+    """A cache backend that keeps short-lived copies of hot keys in process memory in front of another cache, so
+    reading them doesn't need a network round trip.
+
+    Only keys starting with one of LOCAL_KEY_PREFIXES are copied into memory, for up to LOCAL_TIMEOUT seconds. Everything
+    else goes straight to the remote cache, so keys that must be consistent between processes, like sessions and
+    throttle counters, are unaffected. Local copies suit keys whose value doesn't change once set, like thumbnail URLs,
+    or whose key changes when the value does, like template fragments keyed by modified_at.
+
+    Deleting or incrementing a local key, or clearing the cache, changes a version key in the remote cache. Each process
+    checks the version key at most every VERSION_CHECK_SECONDS and drops its local copies when it has changed. A value
+    replaced with set() in one process may still be served by others until their copy expires.
+
+    Options:
+      REMOTE: the alias of the cache to put in front of.
+      LOCAL_KEY_PREFIXES: prefixes of the keys to keep local copies of.
+      LOCAL_MAX_ENTRIES: the most local copies to keep, after which the least recently used are dropped.
+      LOCAL_TIMEOUT: the most seconds to keep a local copy for.
+      VERSION_CHECK_SECONDS: how often to check the version key.
+    """
+
+    version_key = "two-tier-cache-version"
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.remote_alias = options.get("REMOTE", "remote")
+        self.local_key_prefixes = tuple(options.get("LOCAL_KEY_PREFIXES", ()))
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 10)
+        self.version_check_seconds = options.get("VERSION_CHECK_SECONDS", 1)
+        self._store = get_local_store(location or self.remote_alias, options.get("LOCAL_MAX_ENTRIES", 1000))
+
+    @property
+    def remote(self):
+        return caches[self.remote_alias]
+
+    def is_local(self, key):
+        return key.startswith(self.local_key_prefixes)
+
+    def _local_key(self, key, version):
+        return self.remote.make_key(key, version=version)
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _store_local(self, key, value, timeout, version):
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout > 0:
+            self._store.set(self._local_key(key, version), value, local_timeout)
+
+    def _check_version(self):
+        """Drops the local copies if another process has changed the version key since it was last checked."""
+        store = self._store
+        now = time.monotonic()
+        if now - store.checked_at < self.version_check_seconds:
+            return
+        generation = self.remote.get(self.version_key)
+        with store.lock:
+            store.checked_at = now
+            if generation != store.generation:
+                store.entries.clear()
+                store.generation = generation
+
+    def invalidate_local_copies(self):
+        """Drops the local copies in every process, within VERSION_CHECK_SECONDS."""
+        generation = uuid.uuid4().hex
+        self.remote.set(self.version_key, generation, None)
+        with self._store.lock:
+            self._store.entries.clear()
+            self._store.generation = generation
+            self._store.checked_at = time.monotonic()
+
+    def get(self, key, default=None, version=None):
+        if not self.is_local(key):
+            return self.remote.get(key, default, version=version)
+
+        self._check_version()
+        hit, value = self._store.get(self._local_key(key, version))
+        if hit:
+            return value
+
+        missing = object()
+        value = self.remote.get(key, missing, version=version)
+        if value is missing:
+            return default
+        self._store_local(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote_keys = []
+        for key in keys:
+            if self.is_local(key):
+                self._check_version()
+                hit, value = self._store.get(self._local_key(key, version))
+                if hit:
+                    found[key] = value
+                    continue
+            remote_keys.append(key)
+
+        if remote_keys:
+            for key, value in self.remote.get_many(remote_keys, version=version).items():
+                if self.is_local(key):
+                    self._store_local(key, value, DEFAULT_TIMEOUT, version)
+                found[key] = value
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.remote.add(key, value, timeout, version=version)
+        if added and self.is_local(key):
+            self._store_local(key, value, timeout, version)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.remote.set(key, value, timeout, version=version)
+        if self.is_local(key):
+            self._store_local(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.remote.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if self.is_local(key) and key not in failed:
+                self._store_local(key, value, timeout, version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.remote.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self.remote.delete(key, version=version)
+        if self.is_local(key):
+            self.invalidate_local_copies()
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        self.remote.delete_many(keys, version=version)
+        if any(self.is_local(key) for key in keys):
+            self.invalidate_local_copies()
+
+    def incr(self, key, delta=1, version=None):
+        value = self.remote.incr(key, delta, version=version)
+        if self.is_local(key):
+            self.invalidate_local_copies()
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.remote.clear()
+        self.invalidate_local_copies()
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
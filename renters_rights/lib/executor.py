@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusy(Exception):
+    """Raised when a task is submitted to a SharedExecutor whose queue is full."""
+
+
+class SharedExecutor:
+    """A bounded thread pool shared by every request in a process, so requests don't each pay for starting threads and
+    the number of threads, and so database connections, has a fixed limit.
+
+    Tasks wait in a queue when every thread is busy. Once max_workers + max_queue_size tasks are waiting or running,
+    submit raises ExecutorBusy instead of queueing more work than the process can get through.
+    """
+
+    def __init__(self, max_workers, max_queue_size, stats_interval_seconds=60):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.stats_interval_seconds = stats_interval_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shared-executor")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait_seconds = 0.0
+        self._total_run_seconds = 0.0
+        self._last_report = time.monotonic()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) to run in one of the pool's threads.
+
+        Returns: a Future for the result.
+
+        Raises:
+          ExecutorBusy: the queue is full.
+        """
+        self._acquire(1)
+        return self._submit(fn, args, kwargs)
+
+    def reserve(self, count):
+        """Reserves room in the queue for several tasks at once, so that a batch of tasks either all run or none do.
+
+        Args:
+          count: the number of tasks to reserve room for.
+
+        Returns: a Reservation to submit the tasks with. Room that isn't used is given back when it's closed.
+
+        Raises:
+          ExecutorBusy: there isn't room for every task.
+        """
+        self._acquire(count)
+        return Reservation(self, count)
+
+    def _acquire(self, count):
+        acquired = 0
+        while acquired < count and self._slots.acquire(blocking=False):
+            acquired += 1
+
+        if acquired < count:
+            self._release(acquired)
+            with self._lock:
+                self._rejected += count
+            logger.warning(f"Shared executor is full: {self.stats()}")
+            raise ExecutorBusy()
+
+    def _release(self, count):
+        for _ in range(count):
+            self._slots.release()
+
+    def _submit(self, fn, args, kwargs):
+        with self._lock:
+            self._queued += 1
+        try:
+            return self._executor.submit(self._run, time.monotonic(), fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def _run(self, submitted_at, fn, args, kwargs):
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Connections are per thread, and these threads outlive requests, so nothing else would close them.
+            connections.close_all()
+
+            finished_at = time.monotonic()
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._total_wait_seconds += started_at - submitted_at
+                self._total_run_seconds += finished_at - started_at
+                report = finished_at - self._last_report >= self.stats_interval_seconds
+                if report:
+                    self._last_report = finished_at
+            self._slots.release()
+
+            logger.debug(f"Shared executor ran {fn.__name__} in {finished_at - started_at:.3f}s")
+            if report:
+                logger.info(f"Shared executor: {self.stats()}")
+
+    def stats(self):
+        """Gets the pool's current load and how long tasks have taken.
+
+        Returns: a dict of the number of queued and active tasks, the number of tasks completed and rejected, and the
+        average seconds a task waited in the queue and ran for.
+        """
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "average_wait_seconds": round(self._total_wait_seconds / completed, 3),
+                "average_run_seconds": round(self._total_run_seconds / completed, 3),
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class Reservation:
+    """Room reserved in a SharedExecutor's queue by SharedExecutor.reserve. Use it as a context manager so room that
+    isn't used is given back.
+    """
+
+    def __init__(self, executor, count):
+        self._executor = executor
+        self._remaining = count
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) in reserved room.
+
+        Returns: a Future for the result.
+
+        Raises:
+          ValueError: every reserved task has already been submitted.
+        """
+        with self._lock:
+            if self._remaining <= 0:
+                raise ValueError("No reserved room left")
+            self._remaining -= 1
+        return self._executor._submit(fn, args, kwargs)
+
+    def close(self):
+        """Gives back the room that wasn't used."""
+        with self._lock:
+            remaining, self._remaining = self._remaining, 0
+        self._executor._release(remaining)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Gets the process's SharedExecutor, creating it on first use so that Gunicorn workers don't inherit one from the
+    master.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = SharedExecutor(
+                max_workers=settings.MAX_THREAD_POOL_WORKERS or min(32, (os.cpu_count() or 1) + 4),
+                max_queue_size=settings.EXECUTOR_MAX_QUEUE_SIZE,
+                stats_interval_seconds=settings.EXECUTOR_STATS_INTERVAL_SECONDS,
+            )
+        return _executor
@@ -0,0 +1,31 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Stands in for a module that is slow to import, importing it the first time one of its attributes is used.
+    Attributes are looked up on the real module each time, so patching the real module in tests still works.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        return f"<lazy module {self.__name__!r}>"
+
+
+# PDF rendering pulls in cairo and pango, and boto3 and aiobotocore pull in botocore's service models. Most requests
+# need neither.
+aiobotocore_session = LazyModule("aiobotocore.session")
+boto3 = LazyModule("boto3")
+pdfrw = LazyModule("pdfrw")
+weasyprint = LazyModule("weasyprint")
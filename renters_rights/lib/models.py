@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import DatabaseError, models
 
 from lib.managers import UserOwnedModelManager
 
@@ -8,9 +8,39 @@ class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
 
+    # Fields that are only changed with F() updates. They're left out when an existing instance is saved, so a stale
+    # value in memory can't overwrite a concurrent update.
+    counter_fields = ()
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.pop("update_fields", None)
+        if (
+            update_fields is None
+            and self.counter_fields
+            and self.pk is not None
+            and not self._state.adding
+            and not args
+            and not kwargs.get("force_insert")
+        ):
+            # Deferred fields are left out too, as Django would, rather than being loaded just to be saved again.
+            deferred = self.get_deferred_fields()
+            fields = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.counter_fields and f.attname not in deferred
+            ]
+            try:
+                return super().save(update_fields=fields, **kwargs)
+            except DatabaseError as e:
+                # Django raises a plain DatabaseError when no row was updated, e.g. because it was deleted after the
+                # instance was loaded. Saving every field below inserts it, as it would have without update_fields.
+                if type(e) is not DatabaseError:
+                    raise
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class UserOwnedModel(BaseModel):
     owner = models.ForeignKey("noauth.User", on_delete=models.CASCADE)
@@ -0,0 +1,69 @@
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from freezegun import freeze_time
+from hamcrest import assert_that, equal_to
+
+from lib.cache import ANONYMOUS_PAGE_CACHE_VERSION_KEY, CachedValue, get_or_compute, get_user_cache_version_key
+
+
+@override_settings(STAMPEDE_STALE_SECONDS=60, STAMPEDE_BETA=1.0, STAMPEDE_LOCK_TIMEOUT=5)
+@freeze_time("09-17-2018 6:30PM")
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = Mock(return_value="new")
+
+    def test_computes_missing_value_once(self):
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("new"))
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("new"))
+        self.compute.assert_called_once_with()
+
+    @patch("random.random", return_value=0.0)
+    def test_fresh_value_is_not_recomputed(self, m_random):
+        cache.set("key", CachedValue("old", 10, 1537209001))
+
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("old"))
+        self.compute.assert_not_called()
+
+    @patch("random.random", return_value=0.99)
+    def test_value_close_to_going_stale_is_recomputed_early(self, m_random):
+        cache.set("key", CachedValue("old", 10, 1537209001))
+
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("new"))
+        assert_that(cache.get("key").stale_at, equal_to(1537209000 + 540))
+
+    def test_stale_value_is_recomputed(self):
+        cache.set("key", CachedValue("old", 0, 1537209000))
+
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("new"))
+        assert_that(cache.get("lock-key"), equal_to(None))
+
+    def test_stale_value_is_served_while_another_request_recomputes_it(self):
+        cache.set("key", CachedValue("old", 0, 1537209000))
+        cache.add("lock-key", True)
+
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("old"))
+        self.compute.assert_not_called()
+
+    @patch("time.sleep")
+    def test_missing_value_waits_for_request_with_lock(self, m_sleep):
+        cache.add("lock-key", True)
+        m_sleep.side_effect = lambda seconds: cache.set("key", CachedValue("other", 0, 1537209600))
+
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("other"))
+        self.compute.assert_not_called()
+
+    def test_values_cached_without_get_or_compute_are_replaced(self):
+        cache.set("key", "old")
+
+        assert_that(get_or_compute("key", self.compute, 600), equal_to("new"))
+
+
+class CacheVersionKeyTests(SimpleTestCase):
+    def test_version_keys_are_not_kept_in_process_memory(self):
+        # Version keys are replaced with set(), so a local copy could hide a new version from other processes.
+        for key in (ANONYMOUS_PAGE_CACHE_VERSION_KEY, get_user_cache_version_key(1)):
+            assert_that(key.startswith(tuple(settings.LOCAL_CACHE_KEY_PREFIXES)), equal_to(False))
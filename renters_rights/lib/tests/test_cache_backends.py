@@ -0,0 +1,90 @@
+import datetime
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from freezegun import freeze_time
+from hamcrest import assert_that, equal_to, none
+
+from lib import cache_backends
+from lib.cache_backends import TwoTierCache
+
+CACHES = {
+    "default": {
+        "BACKEND": "lib.cache_backends.TwoTierCache",
+        "OPTIONS": {
+            "REMOTE": "remote",
+            "LOCAL_KEY_PREFIXES": ["image-"],
+            "LOCAL_MAX_ENTRIES": 2,
+            "LOCAL_TIMEOUT": 10,
+            "VERSION_CHECK_SECONDS": 1,
+        },
+    },
+    "remote": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "two-tier-remote"},
+}
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache_backends._stores.clear()
+        self.cache = TwoTierCache(None, CACHES["default"])
+        self.remote = caches["remote"]
+        self.remote.clear()
+
+    def test_local_keys_are_served_from_memory(self):
+        self.cache.set("image-1", "url")
+        self.cache.set("other-1", "value")
+        self.remote.clear()
+
+        assert_that(self.cache.get("image-1"), equal_to("url"))
+        assert_that(self.cache.get_many(["image-1"]), equal_to({"image-1": "url"}))
+        assert_that(self.cache.get("other-1"), none())
+
+    def test_remote_hits_are_copied_into_memory(self):
+        self.remote.set("image-1", "url")
+
+        assert_that(self.cache.get("image-1"), equal_to("url"))
+        self.remote.delete("image-1")
+        assert_that(self.cache.get("image-1"), equal_to("url"))
+
+    def test_local_copies_expire(self):
+        with freeze_time("09-17-2018 6:30PM") as frozen_datetime:
+            self.cache.set("image-1", "url")
+            self.remote.delete("image-1")
+
+            frozen_datetime.tick(delta=datetime.timedelta(seconds=11))
+            assert_that(self.cache.get("image-1"), none())
+
+    def test_least_recently_used_copies_are_dropped(self):
+        self.cache.set("image-1", "url 1")
+        self.cache.set("image-2", "url 2")
+        self.cache.get("image-1")
+        self.cache.set("image-3", "url 3")
+        self.remote.clear()
+
+        assert_that(self.cache.get_many(["image-1", "image-2", "image-3"]), equal_to({"image-1": "url 1", "image-3": "url 3"}))
+
+    def test_delete_drops_local_copy(self):
+        self.cache.set("image-1", "url")
+        self.cache.delete("image-1")
+
+        assert_that(self.cache.get("image-1"), none())
+
+    def test_version_key_change_invalidates_local_copies(self):
+        with freeze_time("09-17-2018 6:30PM") as frozen_datetime:
+            self.cache.set("image-1", "url")
+            self.cache.get("image-1")
+
+            # Another process deletes the key, which changes the version key.
+            self.remote.delete("image-1")
+            self.remote.set(TwoTierCache.version_key, "other", None)
+
+            assert_that(self.cache.get("image-1"), equal_to("url"))
+            frozen_datetime.tick(delta=datetime.timedelta(seconds=1))
+            assert_that(self.cache.get("image-1"), none())
+
+    def test_add_and_incr(self):
+        assert_that(self.cache.add("image-1", 1), equal_to(True))
+        assert_that(self.cache.add("image-1", 2), equal_to(False))
+        assert_that(self.cache.incr("image-1"), equal_to(2))
+        assert_that(self.cache.get("image-1"), equal_to(2))
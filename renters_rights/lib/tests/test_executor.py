@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+from hamcrest import assert_that, equal_to
+
+from lib.executor import ExecutorBusy, SharedExecutor
+
+
+class SharedExecutorTests(SimpleTestCase):
+    def setUp(self):
+        self.executor = SharedExecutor(max_workers=1, max_queue_size=1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_submit(self):
+        assert_that(self.executor.submit(sum, [1, 2]).result(), equal_to(3))
+        assert_that(self.executor.stats()["completed"], equal_to(1))
+
+    def test_reserve_all_or_nothing(self):
+        with self.executor.reserve(1):
+            with self.assertRaises(ExecutorBusy):
+                self.executor.reserve(2)
+            assert_that(self.executor.stats()["rejected"], equal_to(2))
+
+            # The failed reservation didn't hold on to the room that was left.
+            with self.executor.reserve(1) as reservation:
+                assert_that(reservation.submit(sum, [1, 2]).result(), equal_to(3))
+
+    def test_unused_room_is_given_back(self):
+        with self.executor.reserve(2) as reservation:
+            with self.assertRaises(ExecutorBusy):
+                self.executor.submit(sum, [1, 2])
+            reservation.submit(sum, [1, 2]).result()
+
+        with self.executor.reserve(2) as reservation:
+            futures = [reservation.submit(sum, [1, 2]), reservation.submit(sum, [3, 4])]
+            with self.assertRaises(ValueError):
+                reservation.submit(sum, [5, 6])
+        assert_that([f.result() for f in futures], equal_to([3, 7]))
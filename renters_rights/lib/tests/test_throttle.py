@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from hamcrest import assert_that, is_not, none
+
+from lib.throttle import take_token
+
+
+@override_settings(THROTTLE_RATES={"test:ip": (2, 60)})
+class TakeTokenTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def take_token_at(self, now):
+        with patch("lib.throttle.time.time", return_value=now):
+            return take_token("test:ip", "1.1.1.1")
+
+    def test_empty_bucket(self):
+        assert_that(self.take_token_at(6000), is_not(none()))
+        assert_that(self.take_token_at(6001), is_not(none()))
+        assert_that(self.take_token_at(6002), none())
+
+    def test_burst_across_window_boundary_limited(self):
+        self.take_token_at(6059)
+        self.take_token_at(6059)
+
+        # Nearly all of the previous window is within the last minute, so only one more request is allowed.
+        assert_that(self.take_token_at(6061), is_not(none()))
+        assert_that(self.take_token_at(6061), none())
+
+        # By the end of the window, the previous one no longer counts.
+        assert_that(self.take_token_at(6119), is_not(none()))
+
+    def test_token_not_taken_from_empty_bucket(self):
+        self.take_token_at(6000)
+        self.take_token_at(6000)
+        for _i in range(5):
+            self.take_token_at(6000)
+
+        # Only the two tokens taken in the previous window count against this one.
+        assert_that(self.take_token_at(6090), is_not(none()))
@@ -0,0 +1,121 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+
+def get_client_ip(request):
+    """Gets the IP address of the client that made a request.
+
+    Args:
+      request: the request.
+
+    Returns: the client's IP address. When THROTTLE_USE_X_FORWARDED_FOR is set, this is the address added to
+    X-Forwarded-For by the proxy in front of the app, which clients can't spoof.
+    """
+    forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+    if settings.THROTTLE_USE_X_FORWARDED_FOR and forwarded_for:
+        return forwarded_for.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def get_bucket_keys(scope, ident, period, now):
+    window = int(now // period)
+    ident_hash = hashlib.md5(str(ident).encode()).hexdigest()
+    return f"throttle-{scope}-{window}-{ident_hash}", f"throttle-{scope}-{window - 1}-{ident_hash}"
+
+
+def take_token(scope, ident):
+    """Takes a token from a bucket that allows THROTTLE_RATES[scope] requests per period.
+
+    This isn't a token bucket that refills continuously, since that needs an atomic read-modify-write the cache doesn't
+    have. Requests are counted in fixed windows of one period with the cache's atomic incr, and the count in the
+    previous window is weighted by how much of it is still within one period of now. That sliding window keeps a burst
+    at the end of one window and the start of the next from getting twice the rate through.
+
+    Args:
+      scope: the THROTTLE_RATES entry to use, e.g. "log-in:ip".
+      ident: what is being throttled, e.g. an IP address.
+
+    Returns: the cache key the token was taken from, to give it back with return_token, or None if the bucket is empty.
+    No token is taken from an empty bucket.
+    """
+    tokens, period = settings.THROTTLE_RATES[scope]
+    now = time.time()
+    key, previous_key = get_bucket_keys(scope, ident, period, now)
+
+    # incr is atomic, so concurrent requests can't take the same token. Windows are kept for two periods, since the
+    # next window still counts part of this one.
+    cache.add(key, 0, 2 * period)
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        # The key was evicted between add and incr.
+        cache.set(key, 1, 2 * period)
+        used = 1
+
+    previous_weight = 1 - (now % period) / period
+    if used + int(cache.get(previous_key, 0) * previous_weight) <= tokens:
+        return key
+    return_token(key)
+    return None
+
+
+def return_token(key):
+    try:
+        cache.decr(key)
+    except ValueError:
+        pass
+
+
+def is_throttled(request, scope, **idents):
+    """Checks whether a request should be rejected, taking a token from the client IP's bucket for the scope and from
+    a bucket for each of the other identifiers given. If any bucket is empty, the tokens taken from the others are
+    given back, so rejected requests don't use up anyone's limit.
+
+    Args:
+      request: the request.
+      scope: the scope, e.g. "log-in". THROTTLE_RATES must have a "<scope>:ip" entry and one for each identifier.
+      idents: other things to throttle on, e.g. email="a@example.com" for the "<scope>:email" entry.
+
+    Returns: True if any bucket was empty.
+    """
+    if not settings.THROTTLE_ENABLED:
+        return False
+
+    idents = {"ip": get_client_ip(request), **idents}
+    taken = []
+    for name, ident in idents.items():
+        if not ident:
+            continue
+        key = take_token(f"{scope}:{name}", ident)
+        if not key:
+            for taken_key in taken:
+                return_token(taken_key)
+            return True
+        taken.append(key)
+    return False
+
+
+def throttle(scope):
+    """Decorator for function views that rejects requests with a 429 response when the client IP or user's bucket for
+    the scope is empty.
+
+    Args:
+      scope: the scope. THROTTLE_RATES must have "<scope>:ip" and "<scope>:user" entries.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            user_id = request.user.id if request.user.is_authenticated else None
+            if is_throttled(request, scope, user=user_id):
+                return HttpResponse("Too many requests.", status=429)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from .models import AuthCode, User
+from .models import AuthCode, QueuedEmail, User
 
 
 @admin.register(AuthCode)
@@ -10,6 +10,13 @@ class AuthCodeAdmin(admin.ModelAdmin):
     readonly_fields = ("code", "next_page", "timestamp", "user")
 
 
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "status", "attempts", "next_attempt_at")
+    list_filter = ("status",)
+    readonly_fields = ("message", "attempts", "error")
+
+
 @admin.register(User)
 class NoAuthUserAdmin(UserAdmin):
     fieldsets = (
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from lib.cache import get_user_snapshot_key
+
+# Fields kept in the cached user snapshot. These cover what views and templates use on request.user, plus the password
+# hash, which the session is verified against. Any other field is loaded from the database when it's used.
+SNAPSHOT_FIELDS = (
+    "id",
+    "password",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "unit_count",
+)
+
+
+class CachedModelBackend(ModelBackend):
+    """Authenticates requests using a cached snapshot of the user's most used fields, so resolving request.user
+    doesn't query the database. Snapshots are removed when the user is saved, or with lib.cache.invalidate_user_snapshot.
+    """
+
+    def get_user(self, user_id):
+        user_model = get_user_model()
+        # from_db expects values in the same order as the model's fields.
+        field_names = [f.attname for f in user_model._meta.concrete_fields if f.attname in SNAPSHOT_FIELDS]
+
+        key = get_user_snapshot_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = user_model._default_manager.filter(pk=user_id).values_list(*field_names).first()
+            if values is None:
+                return None
+            cache.set(key, values, settings.USER_SNAPSHOT_TTL_SECONDS)
+
+        user = user_model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+        return user if self.user_can_authenticate(user) else None
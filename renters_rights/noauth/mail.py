@@ -0,0 +1,17 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from noauth.models import QueuedEmail
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Saves emails to the QueuedEmail outbox instead of sending them, so requests don't wait for the mail server.
+    The send_queued_email command delivers them using EMAIL_DELIVERY_BACKEND.
+
+    Emails are saved in the caller's transaction, if there is one, so they're only queued if it's committed. Log in codes
+    and username changes are saved in the same transaction as their email.
+    """
+
+    def send_messages(self, email_messages):
+        queued = [QueuedEmail.from_message(m) for m in email_messages if m.recipients()]
+        QueuedEmail.objects.bulk_create(queued)
+        return len(queued)
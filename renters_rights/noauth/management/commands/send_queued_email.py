@@ -0,0 +1,84 @@
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from noauth.models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers emails queued by the outbox email backend, reusing one mail server connection for each batch. "
+        "Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Deliver queued emails, then exit.")
+        parser.add_argument("--sleep", type=float, default=2, help="Seconds to wait between checks for new emails.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Number of emails to deliver in each batch.")
+
+    def handle(self, *args, **options):
+        while True:
+            if self.get_ready_emails().exists():
+                with get_connection(settings.EMAIL_DELIVERY_BACKEND) as connection:
+                    while self.send_batch(connection, options["batch_size"]):
+                        pass
+
+            if options["once"]:
+                return
+            time.sleep(options["sleep"])
+
+    @staticmethod
+    def get_ready_emails():
+        return QueuedEmail.objects.filter(status=QueuedEmail.PENDING, next_attempt_at__lte=timezone.now())
+
+    def send_batch(self, connection, batch_size):
+        """Delivers the oldest queued emails that are ready to be sent. Safe to run from several workers at once, since
+        each batch is claimed, by putting off its next attempt for EMAIL_OUTBOX_CLAIM_SECONDS, and committed before it's
+        sent. Emails claimed by a worker that stops before sending them are sent once the claim runs out.
+
+        Args:
+          connection: an email backend instance to deliver the emails with.
+          batch_size: the maximum number of emails to deliver.
+
+        Returns: the number of emails in the batch, or 0 if there is nothing to do.
+        """
+        start = time.monotonic()
+        sent = []
+        failed = 0
+
+        # Row locks are only held while claiming, not while waiting for the mail server.
+        with transaction.atomic():
+            emails = list(self.get_ready_emails().select_for_update(skip_locked=True).order_by("created_at")[:batch_size])
+            QueuedEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=timezone.now() + datetime.timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS)
+            )
+
+        for email in emails:
+            try:
+                # Reopens the connection if a previous failure closed it. Does nothing if it's already open.
+                connection.open()
+                connection.send_messages([email.to_message()])
+                sent.append(email.pk)
+            except Exception as e:
+                logger.warning(f"Failed to send email {email.pk} (attempt {email.attempts + 1}): {e}")
+                email.retry_later(str(e))
+                failed += 1
+                connection.close()
+
+        # Sent emails are deleted since they contain log in codes.
+        QueuedEmail.objects.filter(pk__in=sent).delete()
+
+        if emails:
+            logger.info(
+                f"Sent {len(sent)} of {len(emails)} queued emails in {time.monotonic() - start:.2f}s, {failed} failed, "
+                f"{self.get_ready_emails().count()} ready to send"
+            )
+        return len(emails)
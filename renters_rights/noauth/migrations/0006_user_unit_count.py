@@ -0,0 +1,20 @@
+# Generated by Django 3.0.14 on 2026-10-19 12:28
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_units(apps, schema_editor):
+    User = apps.get_model("noauth", "User")
+    for user in User.objects.annotate(units=Count("unit")).filter(units__gt=0):
+        User.objects.filter(pk=user.pk).update(unit_count=user.units)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("noauth", "0005_auto_20191026_2217"), ("units", "0014_unit_image_counts")]
+
+    operations = [
+        migrations.AddField(model_name="user", name="unit_count", field=models.PositiveIntegerField(default=0, editable=False)),
+        migrations.RunPython(count_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.14 on 2026-10-19 12:34
+
+import django.contrib.postgres.fields.jsonb
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("noauth", "0006_user_unit_count")]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedEmail",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("message", django.contrib.postgres.fields.jsonb.JSONField(editable=False)),
+                (
+                    "status",
+                    models.CharField(choices=[("pending", "Pending"), ("failed", "Failed")], default="pending", max_length=10),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ("error", models.TextField(blank=True)),
+            ],
+            options={"abstract": False},
+        )
+    ]
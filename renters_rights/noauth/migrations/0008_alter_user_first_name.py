@@ -0,0 +1,14 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("noauth", "0007_queuedemail")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user", name="first_name", field=models.CharField(blank=True, max_length=150, verbose_name="first name")
+        )
+    ]
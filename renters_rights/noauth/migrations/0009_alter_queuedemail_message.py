@@ -0,0 +1,10 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("noauth", "0008_alter_user_first_name")]
+
+    operations = [migrations.AlterField(model_name="queuedemail", name="message", field=models.JSONField(editable=False))]
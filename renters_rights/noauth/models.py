@@ -7,17 +7,27 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.mail import EmailMultiAlternatives
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.module_loading import import_string
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
+from lib.cache import invalidate_user_snapshot
 from lib.models import BaseModel
 
 DEFAULT_CODE_LENGTH = 6
 DEFAULT_CODE_TTL_MINUTES = 60
+DEFAULT_CODE_STORE = "noauth.stores.DatabaseAuthCodeStore"
+
+
+def get_code_store():
+    """Gets the auth code store set by NOAUTH_CODE_STORE, see noauth.stores."""
+    return import_string(getattr(settings, "NOAUTH_CODE_STORE", DEFAULT_CODE_STORE))()
 
 
 class User(AbstractUser, BaseModel):
@@ -26,6 +36,9 @@ class User(AbstractUser, BaseModel):
     pending_new_email = models.EmailField(blank=True, null=True)
     pending_code = models.CharField(max_length=20, editable=False, blank=True, null=True)
     pending_code_timestamp = models.DateTimeField(editable=False, blank=True, null=True)
+    unit_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ("unit_count",)
 
     def __str__(self):
         return f"{self.username}"
@@ -35,6 +48,13 @@ class User(AbstractUser, BaseModel):
         return slugify(self.username)
 
 
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Signal handler to remove the user's cached snapshot when they change, see noauth.backends.CachedModelBackend."""
+    invalidate_user_snapshot(instance.id)
+
+
 class AuthCode(BaseModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="auth_codes", editable=False, on_delete=models.CASCADE)
     code = models.CharField(max_length=20, editable=False)
@@ -45,6 +65,7 @@ class AuthCode(BaseModel):
         return f"{self.user.username} - {self.code}"
 
     @classmethod
+    @transaction.atomic
     def send_auth_code(cls, user, code_uri, next_page=None):
         """Send an auth code to a user via email.
 
@@ -98,6 +119,19 @@ class AuthCode(BaseModel):
         except ObjectDoesNotExist:
             return None
 
+    @classmethod
+    def consume_auth_code(cls, email, code):
+        """Gets an auth code for a user and makes sure it can't be used again, using the configured auth code store.
+
+        Args:
+          email: The email to use when looking up the auth code.
+          code: The code to use when looking up the auth code.
+
+        Returns:
+          An auth code if a valid, unused one matching the parameters was found, otherwise None.
+        """
+        return get_code_store().consume_code(email, code)
+
     @classmethod
     def _create_code_for_user(cls, user, next_page=None):
         """Creates an auth code for the given user.
@@ -116,17 +150,73 @@ class AuthCode(BaseModel):
         next_page = next_page or "/"
         next_page = next_page.replace("://", "")
 
-        valid_timestamp_start = timezone.now() - datetime.timedelta(
-            minutes=getattr(settings, "NOAUTH_CODE_TTL_MINUTES", DEFAULT_CODE_TTL_MINUTES)
-        )
-        if not AuthCode.objects.filter(user=user, timestamp__gte=valid_timestamp_start).exists():
-            code = cls.generate_code()
-            AuthCode.objects.filter(user=user).delete()
-            return AuthCode.objects.create(user=user, code=code, next_page=next_page)
-        else:
-            return None
+        return get_code_store().create_code(user, next_page)
 
     @classmethod
     def generate_code(cls):
         code_length = getattr(settings, "NOAUTH_CODE_LENGTH", DEFAULT_CODE_LENGTH)
         return "".join(choice(string.digits) for i in range(code_length))
+
+
+class QueuedEmail(BaseModel):
+    """An email saved by noauth.mail.OutboxEmailBackend, waiting to be delivered by the send_queued_email command."""
+
+    PENDING = "pending"
+    FAILED = "failed"
+    STATUSES = ((PENDING, "Pending"), (FAILED, "Failed"))
+
+    message = models.JSONField(editable=False)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.message.get('subject')} ({self.status})"
+
+    @classmethod
+    def from_message(cls, message):
+        """Creates an unsaved QueuedEmail for an email message.
+
+        Args:
+          message: an EmailMessage or EmailMultiAlternatives without attachments.
+
+        Returns: the QueuedEmail.
+        """
+        if message.attachments:
+            raise ValueError("Emails with attachments can't be queued")
+
+        return cls(
+            message={
+                "subject": str(message.subject),
+                "body": str(message.body),
+                "from_email": message.from_email,
+                "to": message.to,
+                "cc": message.cc,
+                "bcc": message.bcc,
+                "reply_to": message.reply_to,
+                "headers": message.extra_headers,
+                "alternatives": [list(a) for a in getattr(message, "alternatives", [])],
+            }
+        )
+
+    def to_message(self, connection=None):
+        fields = dict(self.message)
+        alternatives = fields.pop("alternatives", [])
+        return EmailMultiAlternatives(connection=connection, alternatives=[tuple(a) for a in alternatives], **fields)
+
+    def retry_later(self, error):
+        """Records a failed delivery attempt, backing off exponentially until EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+
+        Args:
+          error: a description of why delivery failed.
+        """
+        self.attempts += 1
+        self.error = error
+        if self.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            self.status = self.FAILED
+        else:
+            self.next_attempt_at = timezone.now() + datetime.timedelta(
+                seconds=settings.EMAIL_OUTBOX_RETRY_DELAY_SECONDS * 2 ** (self.attempts - 1)
+            )
+        self.save()
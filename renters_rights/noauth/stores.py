@@ -0,0 +1,119 @@
+import datetime
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from noauth.models import DEFAULT_CODE_TTL_MINUTES, AuthCode
+
+
+def get_code_ttl_minutes():
+    return getattr(settings, "NOAUTH_CODE_TTL_MINUTES", DEFAULT_CODE_TTL_MINUTES)
+
+
+class DatabaseAuthCodeStore:
+    """Keeps auth codes in the AuthCode table."""
+
+    def create_code(self, user, next_page):
+        """Creates an auth code for a user, unless they already have one that was created within the TTL window.
+
+        Args:
+          user: The user the code is for.
+          next_page: The page the user should be redirected to after authenticating.
+
+        Returns:
+          The new AuthCode, or None if the user already has a valid code.
+        """
+        valid_timestamp_start = timezone.now() - datetime.timedelta(minutes=get_code_ttl_minutes())
+        if AuthCode.objects.filter(user=user, timestamp__gte=valid_timestamp_start).exists():
+            return None
+
+        code = AuthCode.generate_code()
+        AuthCode.objects.filter(user=user).delete()
+        return AuthCode.objects.create(user=user, code=code, next_page=next_page)
+
+    def consume_code(self, email, code):
+        """Gets an auth code and deletes it, so it can only be used once.
+
+        Args:
+          email: The email address associated with the auth code.
+          code: The code associated with the auth code.
+
+        Returns:
+          The AuthCode, or None if no valid code was found or it has already been used.
+        """
+        auth_code = AuthCode.get_auth_code(email, code)
+        if not auth_code:
+            return None
+
+        # Only the request that actually deletes the code gets to use it.
+        deleted, _ = AuthCode.objects.filter(pk=auth_code.pk).delete()
+        return auth_code if deleted else None
+
+
+class CacheAuthCodeStore:
+    """Keeps auth codes in the cache, where they expire on their own, so logging in doesn't write to the database. The
+    cache must be shared by every process, e.g. memcached.
+
+    Codes are returned as unsaved AuthCode instances.
+    """
+
+    @staticmethod
+    def get_code_key(email):
+        return f"auth-code-{hashlib.md5(email.encode()).hexdigest()}"
+
+    @staticmethod
+    def get_used_key(nonce):
+        return f"auth-code-used-{nonce}"
+
+    def create_code(self, user, next_page):
+        """Creates an auth code for a user, unless they already have one that hasn't expired.
+
+        Args:
+          user: The user the code is for.
+          next_page: The page the user should be redirected to after authenticating.
+
+        Returns:
+          The new AuthCode, or None if the user already has a valid code.
+        """
+        code = AuthCode.generate_code()
+        value = (uuid.uuid4().hex, user.id, code, next_page)
+        if not cache.add(self.get_code_key(user.username), value, get_code_ttl_minutes() * 60):
+            return None
+
+        return AuthCode(user=user, code=code, next_page=next_page)
+
+    def consume_code(self, email, code):
+        """Gets an auth code and removes it from the cache, so it can only be used once.
+
+        Args:
+          email: The email address associated with the auth code.
+          code: The code associated with the auth code.
+
+        Returns:
+          The AuthCode, or None if no valid code was found or it has already been used.
+        """
+        key = self.get_code_key(email)
+        value = cache.get(key)
+        if not value:
+            return None
+
+        nonce, user_id, stored_code, next_page = value
+        if not constant_time_compare(str(code), stored_code):
+            return None
+
+        # add is atomic, so only one request can mark the code as used.
+        if not cache.add(self.get_used_key(nonce), True, get_code_ttl_minutes() * 60):
+            return None
+        cache.delete(key)
+
+        try:
+            user = get_user_model().objects.get(pk=user_id, username=email)
+        except get_user_model().DoesNotExist:
+            return None
+
+        return AuthCode(user=user, code=stored_code, next_page=next_page)
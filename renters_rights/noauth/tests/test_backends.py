@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.urls import reverse
+from hamcrest import assert_that, equal_to, none
+
+from noauth.backends import CachedModelBackend
+from noauth.models import User
+from noauth.tests import UnitBaseTestCase
+from units.models import Unit
+
+
+class CachedModelBackendTests(UnitBaseTestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+
+    def test_get_user_cached(self):
+        assert_that(self.backend.get_user(self.u.id), equal_to(self.u))
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.u.id)
+            assert_that(user.username, equal_to(self.u.username))
+            assert_that(user.first_name, equal_to("Eleanor"))
+            assert_that(user.get_session_auth_hash(), equal_to(self.u.get_session_auth_hash()))
+
+    def test_get_user_loads_other_fields(self):
+        User.objects.filter(id=self.u.id).update(previous_emails=["old@example.com"])
+
+        user = self.backend.get_user(self.u.id)
+        assert_that(user.previous_emails, equal_to(["old@example.com"]))
+
+    def test_get_user_that_does_not_exist(self):
+        assert_that(self.backend.get_user(self.u.id + 1000), none())
+
+    def test_get_user_inactive(self):
+        self.u.is_active = False
+        self.u.save()
+        assert_that(self.backend.get_user(self.u.id), none())
+
+    def test_snapshot_invalidated_when_user_saved(self):
+        self.backend.get_user(self.u.id)
+
+        self.u.first_name = "Tahani"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.u.save()
+        assert_that(self.backend.get_user(self.u.id).first_name, equal_to("Tahani"))
+
+    def test_snapshot_invalidated_when_unit_created(self):
+        assert_that(self.backend.get_user(self.u.id).unit_count, equal_to(0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Unit.objects.create(unit_address_1="u", owner=self.u)
+        assert_that(self.backend.get_user(self.u.id).unit_count, equal_to(1))
+
+    def test_snapshot_invalidated_when_profile_updated(self):
+        self.client.force_login(self.u)
+        self.backend.get_user(self.u.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("noauth:account-details"), {"first_name": "Chidi", "last_name": "Anagonye"})
+        assert_that(self.backend.get_user(self.u.id).first_name, equal_to("Chidi"))
+
+    def test_snapshot_not_invalidated_until_commit(self):
+        self.backend.get_user(self.u.id)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.u.first_name = "Tahani"
+            self.u.save()
+            assert_that(self.backend.get_user(self.u.id).first_name, equal_to("Eleanor"))
+
+        for callback in callbacks:
+            callback()
+        assert_that(self.backend.get_user(self.u.id).first_name, equal_to("Tahani"))
+
+    def test_session_started_with_model_backend_still_authenticated(self):
+        self.client.force_login(self.u, backend="django.contrib.auth.backends.ModelBackend")
+
+        response = self.client.get(reverse("noauth:log-out"))
+        assert_that(response.context["user"].id, equal_to(self.u.id))
+
+    def test_authenticated_request_does_not_query_user(self):
+        self.client.force_login(self.u)
+        self.client.get(reverse("noauth:log-out"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("noauth:log-out"))
+        assert_that(response.context["user"].id, equal_to(self.u.id))
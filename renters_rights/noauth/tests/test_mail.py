@@ -0,0 +1,94 @@
+import datetime
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from freezegun import freeze_time
+from hamcrest import assert_that, equal_to
+
+from noauth.management.commands.send_queued_email import Command
+from noauth.models import AuthCode, QueuedEmail, User
+
+
+@override_settings(EMAIL_BACKEND="noauth.mail.OutboxEmailBackend")
+class OutboxEmailBackendTests(TestCase):
+    def setUp(self):
+        self.u = User.objects.create(is_active=True, username="eleanor@shellstrop.com", email="eleanor@shellstrop.com")
+
+    def test_send_queues_email(self):
+        msg = EmailMultiAlternatives("subject", "body", None, ["a@example.com"])
+        msg.attach_alternative("<p>body</p>", "text/html")
+        msg.send()
+
+        assert_that(len(mail.outbox), equal_to(0))
+        queued = QueuedEmail.objects.get()
+        assert_that(queued.status, equal_to(QueuedEmail.PENDING))
+
+        message = queued.to_message()
+        assert_that(message.subject, equal_to("subject"))
+        assert_that(message.to, equal_to(["a@example.com"]))
+        assert_that(message.alternatives, equal_to([("<p>body</p>", "text/html")]))
+
+    def test_send_auth_code_queues_email(self):
+        AuthCode.send_auth_code(self.u, "http://site/code")
+
+        assert_that(len(mail.outbox), equal_to(0))
+        assert_that(QueuedEmail.objects.get().message["to"], equal_to([self.u.email]))
+
+    def test_auth_code_not_saved_if_email_is_not_queued(self):
+        with patch("noauth.models.QueuedEmail.objects.bulk_create", side_effect=DatabaseError("down")):
+            with self.assertRaises(DatabaseError):
+                AuthCode.send_auth_code(self.u, "http://site/code")
+
+        assert_that(AuthCode.objects.count(), equal_to(0))
+
+    def test_send_queued_email_delivers_and_deletes_emails(self):
+        AuthCode.send_auth_code(self.u, "http://site/code")
+
+        call_command("send_queued_email", "--once")
+
+        assert_that(len(mail.outbox), equal_to(1))
+        assert_that(mail.outbox[0].to, equal_to([self.u.email]))
+        assert_that(QueuedEmail.objects.count(), equal_to(0))
+
+    def test_send_queued_email_claims_emails_before_sending(self):
+        EmailMultiAlternatives("subject", "body", None, ["a@example.com"]).send()
+
+        def send_messages(messages):
+            # Another worker skips the email while it's being sent.
+            assert_that(Command.get_ready_emails().count(), equal_to(0))
+            return len(messages)
+
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=send_messages) as m_send:
+            call_command("send_queued_email", "--once")
+        m_send.assert_called_once()
+        assert_that(QueuedEmail.objects.count(), equal_to(0))
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY_SECONDS=60)
+    def test_send_queued_email_retries_with_backoff(self):
+        with freeze_time("09-17-2018 6:30PM") as frozen_datetime:
+            EmailMultiAlternatives("subject", "body", None, ["a@example.com"]).send()
+
+            with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError("down")):
+                call_command("send_queued_email", "--once")
+
+                queued = QueuedEmail.objects.get()
+                assert_that(queued.attempts, equal_to(1))
+                assert_that(queued.next_attempt_at, equal_to(timezone.now() + datetime.timedelta(seconds=60)))
+
+                frozen_datetime.tick(delta=datetime.timedelta(seconds=30))
+                call_command("send_queued_email", "--once")
+                assert_that(QueuedEmail.objects.get().attempts, equal_to(1))
+
+                frozen_datetime.tick(delta=datetime.timedelta(seconds=30))
+                call_command("send_queued_email", "--once")
+                queued = QueuedEmail.objects.get()
+                assert_that(queued.attempts, equal_to(2))
+                assert_that(queued.status, equal_to(QueuedEmail.FAILED))
+                assert_that(queued.error, equal_to("down"))
+
+        assert_that(len(mail.outbox), equal_to(0))
@@ -0,0 +1,84 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from freezegun import freeze_time
+from hamcrest import assert_that, equal_to, is_, none
+
+from noauth.models import AuthCode
+from noauth.stores import CacheAuthCodeStore, DatabaseAuthCodeStore
+from noauth.tests import UnitBaseTestCase
+
+
+class DatabaseAuthCodeStoreTests(UnitBaseTestCase):
+    def setUp(self):
+        self.store = DatabaseAuthCodeStore()
+
+    def test_create_code_returns_none_when_code_exists(self):
+        assert_that(self.store.create_code(self.u, "/"), is_(AuthCode))
+        assert_that(self.store.create_code(self.u, "/"), none())
+
+    def test_consume_code_can_only_be_used_once(self):
+        auth_code = self.store.create_code(self.u, "/next")
+
+        consumed = self.store.consume_code(self.u.username, auth_code.code)
+        assert_that(consumed.user, equal_to(self.u))
+        assert_that(consumed.next_page, equal_to("/next"))
+        assert_that(self.store.consume_code(self.u.username, auth_code.code), none())
+        assert_that(AuthCode.objects.filter(user=self.u).exists(), is_(False))
+
+
+class CacheAuthCodeStoreTests(UnitBaseTestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = CacheAuthCodeStore()
+
+    def test_create_code_does_not_write_to_database(self):
+        with self.assertNumQueries(0):
+            auth_code = self.store.create_code(self.u, "/")
+
+        assert_that(auth_code.user, equal_to(self.u))
+        assert_that(AuthCode.objects.exists(), is_(False))
+
+    def test_create_code_returns_none_when_code_exists(self):
+        assert_that(self.store.create_code(self.u, "/"), is_(AuthCode))
+        assert_that(self.store.create_code(self.u, "/"), none())
+
+    def test_consume_code(self):
+        auth_code = self.store.create_code(self.u, "/next")
+
+        with self.assertNumQueries(1):
+            consumed = self.store.consume_code(self.u.username, auth_code.code)
+        assert_that(consumed.user, equal_to(self.u))
+        assert_that(consumed.next_page, equal_to("/next"))
+
+    def test_consume_code_can_only_be_used_once(self):
+        auth_code = self.store.create_code(self.u, "/")
+
+        assert_that(self.store.consume_code(self.u.username, auth_code.code), is_(AuthCode))
+        assert_that(self.store.consume_code(self.u.username, auth_code.code), none())
+
+    def test_consume_code_with_wrong_code(self):
+        auth_code = self.store.create_code(self.u, "/")
+
+        assert_that(self.store.consume_code(self.u.username, f"{auth_code.code}0"), none())
+        assert_that(self.store.consume_code("someone@else.com", auth_code.code), none())
+        assert_that(self.store.consume_code(self.u.username, auth_code.code), is_(AuthCode))
+
+    @override_settings(NOAUTH_CODE_TTL_MINUTES=5)
+    def test_code_expires(self):
+        with freeze_time("09-17-2018 6:30PM") as frozen_datetime:
+            auth_code = self.store.create_code(self.u, "/")
+
+            frozen_datetime.tick(delta=datetime.timedelta(minutes=6))
+
+            assert_that(self.store.consume_code(self.u.username, auth_code.code), none())
+            assert_that(self.store.create_code(self.u, "/"), is_(AuthCode))
+
+    @override_settings(NOAUTH_CODE_STORE="noauth.stores.CacheAuthCodeStore")
+    def test_log_in_with_cached_code(self):
+        auth_code = AuthCode._create_code_for_user(self.u, "/")
+
+        response = self.client.post(reverse("noauth:code"), {"code": auth_code.code, "email": self.u.username})
+        self.assertRedirects(response, reverse("homepage"))
@@ -3,6 +3,7 @@ from unittest.mock import patch
 
 from django.conf import settings
 from django.core import mail
+from django.core.cache import cache
 from django.test import Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
@@ -156,6 +157,85 @@ class LoginViewTests(UnitBaseTestCase):
         # )
 
 
+@override_settings(
+    THROTTLE_ENABLED=True,
+    THROTTLE_RATES={"log-in:ip": (3, 60), "log-in:ip_email": (2, 60), "code:ip": (3, 60), "code:email": (2, 60)},
+)
+class ThrottleTests(UnitBaseTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch("noauth.models.AuthCode.send_auth_code")
+    def test_log_in_throttled_by_ip_and_email(self, m_send_auth_code):
+        m_send_auth_code.return_value = True
+        for _i in range(2):
+            self.client.post(reverse("noauth:log-in"), {"email": ThrottleTests.u.username})
+
+        response = self.client.post(reverse("noauth:log-in"), {"email": ThrottleTests.u.username})
+        assert_that(response.status_code, equal_to(429))
+        assert_that(m_send_auth_code.call_count, equal_to(2))
+
+    @patch("noauth.models.AuthCode.send_auth_code")
+    def test_log_in_not_throttled_by_email_from_another_ip(self, m_send_auth_code):
+        m_send_auth_code.return_value = True
+        for _i in range(3):
+            self.client.post(reverse("noauth:log-in"), {"email": ThrottleTests.u.username})
+
+        response = self.client.post(reverse("noauth:log-in"), {"email": ThrottleTests.u.username}, REMOTE_ADDR="1.1.1.1")
+        assert_that(response.status_code, is_not(equal_to(429)))
+        assert_that(m_send_auth_code.call_count, equal_to(3))
+
+    @patch("noauth.models.AuthCode.send_auth_code")
+    def test_rejected_log_in_does_not_use_ip_limit(self, m_send_auth_code):
+        m_send_auth_code.return_value = True
+        for _i in range(4):
+            self.client.post(reverse("noauth:log-in"), {"email": ThrottleTests.u.username})
+
+        response = self.client.post(reverse("noauth:log-in"), {"email": "another@example.com"})
+        assert_that(response.status_code, is_not(equal_to(429)))
+        assert_that(User.objects.filter(username="another@example.com").exists(), equal_to(True))
+
+    @patch("noauth.models.AuthCode.send_auth_code")
+    def test_log_in_throttled_by_ip(self, m_send_auth_code):
+        m_send_auth_code.return_value = True
+        for i in range(3):
+            self.client.post(reverse("noauth:log-in"), {"email": f"user{i}@example.com"})
+
+        response = self.client.post(reverse("noauth:log-in"), {"email": "another@example.com"})
+        assert_that(response.status_code, equal_to(429))
+        assert_that(User.objects.filter(username="another@example.com").exists(), equal_to(False))
+
+    @patch("noauth.views.CodeView._validate_and_get_auth_code")
+    def test_code_throttled_by_email(self, m_validate_and_get_auth_code):
+        m_validate_and_get_auth_code.return_value = None
+        for code in range(2):
+            self.client.post(reverse("noauth:code"), {"email": ThrottleTests.u.username, "code": code})
+
+        response = self.client.get(f"{reverse('noauth:code')}?email={ThrottleTests.u.username}&code=1")
+        assert_that(response.status_code, equal_to(429))
+        self.assertFormError(response, "form", None, _("Too many attempts. Please try again later."))
+        assert_that(m_validate_and_get_auth_code.call_count, equal_to(2))
+
+    @override_settings(THROTTLE_USE_X_FORWARDED_FOR=True)
+    @patch("noauth.views.CodeView._validate_and_get_auth_code")
+    def test_code_throttled_by_forwarded_ip(self, m_validate_and_get_auth_code):
+        m_validate_and_get_auth_code.return_value = None
+        for i in range(3):
+            self.client.post(
+                reverse("noauth:code"), {"email": f"user{i}@example.com", "code": 1}, HTTP_X_FORWARDED_FOR=f"1.1.1.{i}, 2.2.2.2"
+            )
+
+        response = self.client.post(
+            reverse("noauth:code"), {"email": "a@example.com", "code": 1}, HTTP_X_FORWARDED_FOR="2.2.2.2"
+        )
+        assert_that(response.status_code, equal_to(429))
+
+        response = self.client.post(
+            reverse("noauth:code"), {"email": "a@example.com", "code": 1}, HTTP_X_FORWARDED_FOR="3.3.3.3"
+        )
+        assert_that(response.status_code, equal_to(200))
+
+
 class LogOutViewTests(UnitBaseTestCase):
     view_url = reverse("noauth:log-out")
 
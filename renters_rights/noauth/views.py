@@ -6,6 +6,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
 from django.forms import ValidationError
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect, render
@@ -16,6 +17,8 @@ from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic.edit import FormView
 
+from lib.cache import invalidate_user_snapshot
+from lib.throttle import get_client_ip, is_throttled
 from lib.views import ProtectedView
 
 from .forms import CodeForm, ConfirmUsernameChangeForm, LoginForm, UserProfileForm
@@ -26,6 +29,10 @@ def normalize_email(email):
     return email.lower().strip() if email else None
 
 
+def add_throttled_error(form):
+    form.add_error(None, ValidationError(_("Too many attempts. Please try again later."), code="throttled"))
+
+
 class CodeView(View):
     """Handles the code form where the user enters their email address and code to authenticate.
     Accepts values either via querystring in a GET or in a form POST.
@@ -45,9 +52,13 @@ class CodeView(View):
             form = self.form_class(initial={"email": email, "code": code})
 
         if email and code and form.is_valid():
+            if is_throttled(request, "code", email=email):
+                add_throttled_error(form)
+                return render(request, self.template_name, {"form": form}, status=429)
+
             auth_code = self._validate_and_get_auth_code(email, code)
             if auth_code:
-                login(request, auth_code.user)
+                login(request, auth_code.user, backend=settings.AUTHENTICATION_BACKENDS[0])
                 messages.add_message(request, messages.SUCCESS, _("You have been logged in."))
                 return redirect(auth_code.next_page)
             form.add_error(None, ValidationError(_("Invalid e-mail address or code."), code="invalid_email_or_code"))
@@ -59,9 +70,13 @@ class CodeView(View):
         if form.is_valid():
             email = normalize_email(form.cleaned_data["email"])
             code = form.cleaned_data["code"]
+            if is_throttled(request, "code", email=email):
+                add_throttled_error(form)
+                return render(request, self.template_name, {"form": form}, status=429)
+
             auth_code = self._validate_and_get_auth_code(email, code)
             if auth_code:
-                login(request, auth_code.user)
+                login(request, auth_code.user, backend=settings.AUTHENTICATION_BACKENDS[0])
                 messages.add_message(request, messages.SUCCESS, _("You have been logged in."))
                 return redirect(self._get_next_page_from_auth_code(auth_code))
 
@@ -81,11 +96,7 @@ class CodeView(View):
           A URI to redirect to if the code is valid, otherwise None.
 
         """
-        auth_code = AuthCode.get_auth_code(email, code)
-        if not auth_code:
-            return None
-        auth_code.delete()
-        return auth_code
+        return AuthCode.consume_auth_code(email, code)
 
     @staticmethod
     def _get_next_page_from_auth_code(auth_code: AuthCode):
@@ -118,6 +129,13 @@ class LogInView(FormView):
 
     def form_valid(self, form):
         email = normalize_email(form.cleaned_data["email"])
+        # The per-address limit is kept for each client IP, so requests from other clients can't lock someone out.
+        if is_throttled(self.request, "log-in", ip_email=(get_client_ip(self.request), email)):
+            add_throttled_error(form)
+            response = self.form_invalid(form)
+            response.status_code = 429
+            return response
+
         user = self.get_user(email)
         if not user:
             user = self.create_user(email)
@@ -177,6 +195,7 @@ class UserProfileView(FormView, ProtectedView):
         initial["email"] = self.request.user.username
         return initial
 
+    @transaction.atomic
     def form_valid(self, form):
         user = self.request.user
         new_username = form.cleaned_data.get("email")
@@ -192,6 +211,7 @@ class UserProfileView(FormView, ProtectedView):
                 pending_code=code,
                 pending_code_timestamp=timezone.now(),
             )
+            invalidate_user_snapshot(user.id)
 
             email_context = {
                 "confirmation_uri": self.request.build_absolute_uri(reverse("noauth:confirm-username-change")),
@@ -217,6 +237,7 @@ class UserProfileView(FormView, ProtectedView):
             User.objects.filter(id=user.id).update(
                 first_name=form.cleaned_data["first_name"], last_name=form.cleaned_data["last_name"]
             )
+            invalidate_user_snapshot(user.id)
             messages.add_message(self.request, messages.SUCCESS, _("Your changes were saved."))
         return super().form_valid(form)
 
@@ -242,6 +263,7 @@ class ConfirmUsernameChangeView(FormView, ProtectedView):
         initial["code"] = self.request.GET.get("code")
         return initial
 
+    @transaction.atomic
     def form_valid(self, form):
         user = self.request.user
 
@@ -269,6 +291,7 @@ class ConfirmUsernameChangeView(FormView, ProtectedView):
             pending_code=None,
             pending_code_timestamp=None,
         )
+        invalidate_user_snapshot(user.id)
 
         messages.add_message(self.request, messages.SUCCESS, _("Your username was changed."))
 
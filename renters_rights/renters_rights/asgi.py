@@ -0,0 +1,23 @@
+"""
+ASGI config for renters-rights project.
+
+This module contains the ASGI application used by ASGI servers such as uvicorn or daphne. It should expose a
+module-level variable named ``application``.
+
+Under ASGI, async views like ``units.views.sign_files`` run on the server's event loop, so many requests waiting on S3
+share one thread. Sync views still work, each running in a thread of its own.
+
+"""
+import os
+from os.path import abspath, dirname
+from sys import path
+
+from django.core.asgi import get_asgi_application
+
+SITE_ROOT = dirname(dirname(abspath(__file__)))
+path.append(SITE_ROOT)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "renters_rights.settings.production")
+
+
+application = get_asgi_application()
@@ -102,9 +102,12 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "maintenance_mode.middleware.MaintenanceModeMiddleware",
     "units.middleware.TurbolinksMiddleware",
-    "django.contrib.flatpages.middleware.FlatpageFallbackMiddleware",
+    "units.middleware.FlatpageFallbackMiddleware",
 ]
 
+# Sessions are read from the cache and only written when they change.
+SESSION_ENGINE = get_env_variable("SESSION_ENGINE", "django.contrib.sessions.backends.cached_db")
+
 ROOT_URLCONF = "renters_rights.urls"
 
 TEMPLATES = [
@@ -139,6 +142,9 @@ DATABASES = {
     }
 }
 
+# Keep the primary key type existing tables were created with.
+DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -178,12 +184,43 @@ LOCALE_PATHS = [os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "l
 # User registration
 DEFAULT_FROM_EMAIL = get_env_variable("DEFAULT_FROM_EMAIL", "no-reply@renterhaven.com")
 AUTH_USER_MODEL = "noauth.User"
+# Users are logged in with the first backend. ModelBackend stays so sessions that were started with it, before the
+# cached backend was added, keep working until they expire.
+AUTHENTICATION_BACKENDS = ["noauth.backends.CachedModelBackend", "django.contrib.auth.backends.ModelBackend"]
+# How long the fields needed to authenticate a request are cached for. Snapshots are also removed when users change.
+USER_SNAPSHOT_TTL_SECONDS = str_to_int(os.getenv("USER_SNAPSHOT_TTL_SECONDS", 60 * 60))
 NOAUTH_CODE_TTL_MINUTES = 30
+# Use noauth.stores.CacheAuthCodeStore to keep log in codes in the cache instead of the database. Only do this when the
+# cache is shared between processes.
+NOAUTH_CODE_STORE = get_env_variable("NOAUTH_CODE_STORE", "noauth.stores.DatabaseAuthCodeStore")
+
+# When enabled, emails are saved to an outbox and delivered by the send_queued_email command using
+# EMAIL_DELIVERY_BACKEND, rather than during the request.
+EMAIL_OUTBOX_ENABLED = str_to_bool(os.getenv("EMAIL_OUTBOX_ENABLED", False))
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Failed deliveries are retried after EMAIL_OUTBOX_RETRY_DELAY_SECONDS, doubling after each attempt.
+EMAIL_OUTBOX_MAX_ATTEMPTS = str_to_int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_RETRY_DELAY_SECONDS = str_to_int(os.getenv("EMAIL_OUTBOX_RETRY_DELAY_SECONDS", 30))
+# Seconds before emails claimed by a mailer that stopped before sending them can be sent by another.
+EMAIL_OUTBOX_CLAIM_SECONDS = str_to_int(os.getenv("EMAIL_OUTBOX_CLAIM_SECONDS", 300))
+
+# Limits on log in, code entry and upload signing requests, as (requests, seconds) for each scope and identifier, see
+# lib.throttle.take_token. Counts are kept in the cache, so it should be shared between processes.
+THROTTLE_ENABLED = str_to_bool(os.getenv("THROTTLE_ENABLED", True))
+THROTTLE_USE_X_FORWARDED_FOR = False
+THROTTLE_RATES = {
+    "log-in:ip": (20, 60 * 60),
+    "log-in:ip_email": (5, 60 * 60),
+    "code:ip": (30, 60 * 60),
+    "code:email": (10, 15 * 60),
+    "sign-files:ip": (120, 60 * 60),
+    "sign-files:user": (60, 60 * 60),
+}
 
 # Smallest size will be used to generate a square thumbnail.
 # Largest size will be used to resize original image.
-# Sizes in-between will be used to generate thumbnails.
-UNIT_IMAGE_SIZES = [200, 500, 1000]
+# Sizes in-between will be used to generate thumbnails. The smallest of these is used by compact photo reports.
+UNIT_IMAGE_SIZES = [200, 350, 500, 1000]
 UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH = UNIT_IMAGE_SIZES[-1]
 UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH = UNIT_IMAGE_SIZES[0]
 
@@ -193,7 +230,9 @@ LOGGING = {
     "handlers": {"console": {"class": "logging.StreamHandler"}},
     "loggers": {
         "django": {"handlers": ["console"], "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"), "propagate": True},
+        "lib": {"handlers": ["console"], "level": os.getenv("LOG_LEVEL", "INFO")},
         "units": {"handlers": ["console"], "level": os.getenv("LOG_LEVEL", "INFO")},
+        "documents": {"handlers": ["console"], "level": os.getenv("LOG_LEVEL", "INFO")},
     },
 }
 
@@ -214,22 +253,62 @@ if BASIC_AUTH_USERNAME and BASIC_AUTH_PASSWORD:
 MAX_THREAD_POOL_WORKERS = (
     str_to_int(os.getenv("MAX_THREAD_POOL_WORKERS", None)) if os.getenv("MAX_THREAD_POOL_WORKERS", None) else None
 )
+# Tasks that can wait for a thread in the shared executor (lib.executor). More are rejected, so a burst of uploads
+# can't queue more work than the process can get through.
+EXECUTOR_MAX_QUEUE_SIZE = str_to_int(os.getenv("EXECUTOR_MAX_QUEUE_SIZE", 100))
+EXECUTOR_STATS_INTERVAL_SECONDS = str_to_int(os.getenv("EXECUTOR_STATS_INTERVAL_SECONDS", 60))
 
 MAX_UNITS = os.getenv("MAX_UNITS", 3)
 MAX_DOCUMENTS_PER_UNIT = os.getenv("MAX_DOCUMENTS_PER_UNIT", 5)
 MAX_MOVE_IN_PICTURES_PER_UNIT = os.getenv("MAX_MOVE_IN_PICTURES_PER_UNIT", 12)
 MAX_MOVE_OUT_PICTURES_PER_UNIT = os.getenv("MAX_MOVE_OUT_PICTURES_PER_UNIT", 12)
 
+# When enabled, letters without HTML markup are laid out directly as PDF text rather than with WeasyPrint.
+PLAIN_TEXT_LETTER_RENDERING = str_to_bool(os.getenv("PLAIN_TEXT_LETTER_RENDERING", True))
+
+# Photo reports are rendered in chunks of this many pictures to bound memory use. Set PHOTO_REPORT_WORKERS above 1 to
+# render the chunks of queued reports in parallel, in a pool of processes kept by the generate_documents command.
+PHOTO_REPORT_CHUNK_SIZE = str_to_int(os.getenv("PHOTO_REPORT_CHUNK_SIZE", 6))
+PHOTO_REPORT_WORKERS = str_to_int(os.getenv("PHOTO_REPORT_WORKERS", 1))
+
+# When enabled, photo reports are rendered by the generate_documents command rather than during the request.
+ASYNC_DOCUMENT_GENERATION = str_to_bool(os.getenv("ASYNC_DOCUMENT_GENERATION", False))
+# How long generated documents are kept so they can be downloaded again without being re-rendered.
+GENERATED_DOCUMENT_TTL_MINUTES = str_to_int(os.getenv("GENERATED_DOCUMENT_TTL_MINUTES", 60 * 24))
+GENERATED_DOCUMENT_DOWNLOAD_LINK_TTL_SECONDS = str_to_int(os.getenv("GENERATED_DOCUMENT_DOWNLOAD_LINK_TTL_SECONDS", 60 * 10))
+# Seconds a worker has to render a document it claimed. Documents still running after that are failed, since the worker
+# rendering them has stopped.
+GENERATED_DOCUMENT_CLAIM_SECONDS = str_to_int(os.getenv("GENERATED_DOCUMENT_CLAIM_SECONDS", 60 * 30))
+
 AWS_S3_ENDPOINT_URL = None
 AWS_S3_CUSTOM_DOMAIN = None
 AWS_ACCESS_KEY_ID = get_env_variable("AWS_ACCESS_KEY_ID", "INVALID")
 AWS_SECRET_ACCESS_KEY = get_env_variable("AWS_SECRET_ACCESS_KEY", "INVALID")
 AWS_UPLOAD_BUCKET_NAME = get_env_variable("AWS_UPLOAD_BUCKET_NAME", "renters-rights-uploads-test")
 AWS_STORAGE_BUCKET_NAME = get_env_variable("AWS_STORAGE_BUCKET_NAME", "renters-rights-test")
+# Dotted path to a function returning the asyncio S3 client used by the upload views. lib.s3.InMemoryS3 keeps objects
+# in memory, for tests and for running without S3.
+S3_CLIENT_FACTORY = os.getenv("S3_CLIENT_FACTORY", "lib.s3.create_aiobotocore_client")
 
 CACHE_TIMEOUT = get_env_variable("CACHE_TIMEOUT", 86400)
 CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "TIMEOUT": CACHE_TIMEOUT}}
-AWS_QUERYSTRING_EXPIRE = CACHE_TIMEOUT + 30
+# Keys read on most pages that don't change once set, that change when their value does, or that are deleted when it
+# does. Production keeps copies of them in memory for LOCAL_CACHE_TIMEOUT seconds, see lib.cache_backends.TwoTierCache.
+LOCAL_CACHE_KEY_PREFIXES = ["image-", "template.cache.", "document-catalog-", "flatpages", "anonymous-page-"]
+LOCAL_CACHE_MAX_ENTRIES = str_to_int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", 1000))
+LOCAL_CACHE_TIMEOUT = str_to_int(os.getenv("LOCAL_CACHE_TIMEOUT", 10))
+# Seconds a logged in user's unit list and detail pages are cached for, see lib.cache.UserPageCacheMixin.
+USER_PAGE_CACHE_SECONDS = str_to_int(os.getenv("USER_PAGE_CACHE_SECONDS", 60 * 60))
+# Thumbnail URLs are cached for up to CACHE_TIMEOUT, then embedded in template fragments cached for as long and in pages
+# cached for USER_PAGE_CACHE_SECONDS, so they're signed for long enough to outlast all three.
+AWS_QUERYSTRING_EXPIRE = 2 * int(CACHE_TIMEOUT) + USER_PAGE_CACHE_SECONDS + 30
+# Seconds that public pages are cached for visitors who aren't logged in, by the app and by any proxy in front of it.
+ANONYMOUS_PAGE_CACHE_SECONDS = str_to_int(os.getenv("ANONYMOUS_PAGE_CACHE_SECONDS", 300))
+# See lib.cache.get_or_compute. Values are stale for the last STAMPEDE_STALE_SECONDS of their timeout, and refreshed
+# earlier, more eagerly the higher STAMPEDE_BETA is.
+STAMPEDE_STALE_SECONDS = str_to_int(os.getenv("STAMPEDE_STALE_SECONDS", 60))
+STAMPEDE_BETA = float(os.getenv("STAMPEDE_BETA", 1.0))
+STAMPEDE_LOCK_TIMEOUT = str_to_int(os.getenv("STAMPEDE_LOCK_TIMEOUT", 5))
 
 # APP SETTINGS
 
@@ -241,6 +320,7 @@ LANGUAGES = [("es", _("Spanish")), ("en", _("English"))]
 # Format of SUPPORTED_JURISDICTIONS is {"STATE_NAME": {"JURISDICTION": [ZIP_CODES]}}
 # STATE_NAME should be in str.title() format
 # A JURISDICTION of "ALL" can be used if URLTA has been adopted statewide
+# Jurisdictions can also be added in the admin without a deploy, see units.models.Jurisdiction
 SUPPORTED_JURISDICTIONS = {
     "Kentucky": {
         "Barbourville": [40906],
@@ -378,13 +458,3 @@ SUPPORTED_JURISDICTIONS = {
         "Woodlawn": [41071],
     }
 }
-
-# next three variables shouldn't need to change even if SUPPORTED_JURISDICTIONS changes
-SUPPORTED_JURISDICTION_STATES = {s for s in SUPPORTED_JURISDICTIONS.keys()}
-SUPPORTED_JURISDICTION_NAMES_BY_STATE = {
-    state: list(jurisdictions.keys()) for state, jurisdictions in SUPPORTED_JURISDICTIONS.items()
-}
-SUPPORTED_JURISDICTION_ZIP_CODES_BY_STATE = {
-    state: [str(z) for z in [zip_list for j in list(jurisdictions.values()) for zip_list in j]]
-    for state, jurisdictions in SUPPORTED_JURISDICTIONS.items()
-}
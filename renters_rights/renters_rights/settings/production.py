@@ -15,11 +15,14 @@ DEBUG = str_to_bool(os.environ.get("DJANGO_DEBUG", False))
 ALLOWED_HOSTS = get_env_variable("ALLOWED_HOSTS").split(",")
 SECURE_SSL_REDIRECT = get_env_variable("SECURE_SSL_REDIRECT", True)
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+# The Heroku router adds the client's address to the end of X-Forwarded-For.
+THROTTLE_USE_X_FORWARDED_FOR = True
 ########## END HOST CONFIGURATION
 
 ########## EMAIL CONFIGURATION
 # See: https://docs.djangoproject.com/en/dev/ref/settings/#email-backend
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = "noauth.mail.OutboxEmailBackend" if EMAIL_OUTBOX_ENABLED else EMAIL_DELIVERY_BACKEND
 
 # See: https://docs.djangoproject.com/en/dev/ref/settings/#email-host
 EMAIL_HOST = get_env_variable("EMAIL_HOST")
@@ -45,8 +48,19 @@ SERVER_EMAIL = EMAIL_HOST_USER
 ########## END EMAIL CONFIGURATION
 
 ########## CACHE CONFIGURATION
+# Hot keys are also kept in each process's memory for a few seconds, see lib.cache_backends.TwoTierCache.
 CACHES = {
     "default": {
+        "BACKEND": "lib.cache_backends.TwoTierCache",
+        "TIMEOUT": CACHE_TIMEOUT,
+        "OPTIONS": {
+            "REMOTE": "remote",
+            "LOCAL_KEY_PREFIXES": LOCAL_CACHE_KEY_PREFIXES,
+            "LOCAL_MAX_ENTRIES": LOCAL_CACHE_MAX_ENTRIES,
+            "LOCAL_TIMEOUT": LOCAL_CACHE_TIMEOUT,
+        },
+    },
+    "remote": {
         "BACKEND": "django_bmemcached.memcached.BMemcached",
         "LOCATION": os.environ.get("MEMCACHEDCLOUD_SERVERS").split(","),
         "TIMEOUT": CACHE_TIMEOUT,
@@ -54,7 +68,7 @@ CACHES = {
             "username": os.environ.get("MEMCACHEDCLOUD_USERNAME"),
             "password": os.environ.get("MEMCACHEDCLOUD_PASSWORD"),
         },
-    }
+    },
 }
 ########## END CACHE CONFIGURATION
 
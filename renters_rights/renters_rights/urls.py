@@ -1,18 +1,23 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.contrib.flatpages import views
 from django.urls import include, path
+from django.views.decorators.csrf import csrf_exempt
+from django.views.i18n import set_language
+
+from units.flatpages import flatpage
 
 admin.site.site_header = "Renter Haven Administration"
 
 urlpatterns = [
-    path("i18n/", include("django.conf.urls.i18n")),
+    # Without a CSRF token in the language form, every page's footer is the same for all visitors, so public pages can be
+    # cached. Changing someone's language is harmless, so it doesn't need CSRF protection.
+    path("i18n/setlang/", csrf_exempt(set_language), name="set_language"),
     path("", include("units.urls")),
     path("admin/", admin.site.urls),
     path("account/", include("noauth.urls")),
     path("letters-forms/", include("documents.urls")),
-    path("<path:url>", views.flatpage),
+    path("<path:url>", flatpage),
 ]
 
 if settings.DEBUG:
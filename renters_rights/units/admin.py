@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Unit, UnitImage
+from .models import Jurisdiction, Unit, UnitImage
 
 
 class UnitAdmin(admin.ModelAdmin):
@@ -14,5 +14,11 @@ class UnitImageAdmin(admin.ModelAdmin):
     readonly_fields = ("full_size_height", "full_size_width", "thumbnail_sizes")
 
 
+class JurisdictionAdmin(admin.ModelAdmin):
+    list_display = ("name", "state", "all_zip_codes")
+    list_filter = ("state",)
+
+
+admin.site.register(Jurisdiction, JurisdictionAdmin)
 admin.site.register(Unit, UnitAdmin)
 admin.site.register(UnitImage, UnitImageAdmin)
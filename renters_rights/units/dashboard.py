@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from units.models import Unit, get_dashboard_cache_key, prefetch_gallery
+
+
+def get_dashboard_summary(user):
+    """Gets a summary of a user's units and images for the index and get started pages. The summary is cached until one
+    of the user's units or images is saved or deleted.
+
+    Args:
+      user: the user to summarize.
+
+    Returns: a dictionary with the user's units, the number of units, the total number of images and whether the user
+    can create another unit.
+    """
+    cache_key = get_dashboard_cache_key(user.id)
+    summary = cache.get(cache_key)
+    if summary is None:
+        units = list(prefetch_gallery(Unit.objects.for_user(user)))
+        summary = {"units": units, "num_units": len(units), "picture_count": sum(u.image_count for u in units)}
+        cache.set(cache_key, summary)
+
+    return {**summary, **{"allow_new_unit_creation": summary["num_units"] < settings.MAX_UNITS}}
@@ -0,0 +1,111 @@
+import csv
+import io
+import zipfile
+
+from django.core.files.storage import default_storage
+
+from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE
+
+CHUNK_SIZE = 64 * 1024
+FOLDER_NAMES = {DOCUMENT: "documents", MOVE_IN_PICTURE: "move-in-pictures", MOVE_OUT_PICTURE: "move-out-pictures"}
+
+
+class ZipStreamBuffer(io.RawIOBase):
+    """A write-only, unseekable file object that collects the bytes ZipFile writes so they can be streamed.
+    Because it isn't seekable, ZipFile writes sizes and CRCs in data descriptors after each entry instead of seeking
+    back to the entry's header.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def pop(self):
+        """Gets and clears the bytes written since the last call.
+
+        Returns: the bytes written since the last call.
+        """
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def read_storage_chunks(name, chunk_size=CHUNK_SIZE):
+    """Reads a file from storage in chunks without loading the whole file into memory.
+
+    Args:
+      name: the storage name of the file.
+      chunk_size: the maximum size of each chunk.
+
+    Returns: a generator of chunks of the file.
+    """
+    bucket = getattr(default_storage, "bucket", None)
+    if bucket is not None:
+        # S3Boto3StorageFile buffers the whole object before the first read, so read the S3 body stream directly.
+        f = bucket.Object(name).get()["Body"]
+    else:
+        f = default_storage.open(name, "rb")
+
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+def get_export_file_name(image):
+    return f"{FOLDER_NAMES[image.image_type]}/{image.created_at.strftime('%Y-%m-%d-%H%M%S')}-{image.id}.jpg"
+
+
+def stream_unit_evidence(unit, chunk_size=CHUNK_SIZE):
+    """Streams a ZIP file containing all of a unit's pictures and documents, plus a manifest with upload times.
+    Memory use is bounded by chunk_size, regardless of how many images the unit has.
+
+    Args:
+      unit: the unit whose images should be exported.
+      chunk_size: the size of the chunks read from storage.
+
+    Returns: a generator of chunks of the ZIP file.
+    """
+    buffer = ZipStreamBuffer()
+    manifest = io.StringIO()
+    manifest_writer = csv.writer(manifest)
+    manifest_writer.writerow(["file", "type", "uploaded_at", "width", "height"])
+
+    # Images are already compressed, so store them rather than deflating them again.
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as zip_file:
+        for image in unit.unitimage_set.order_by("created_at").iterator():
+            file_name = get_export_file_name(image)
+            with zip_file.open(file_name, mode="w") as entry:
+                for chunk in read_storage_chunks(image.image.name, chunk_size):
+                    entry.write(chunk)
+                    yield buffer.pop()
+            yield buffer.pop()
+
+            manifest_writer.writerow(
+                [
+                    file_name,
+                    image.get_image_type_display(),
+                    image.created_at.isoformat(),
+                    image.full_size_width,
+                    image.full_size_height,
+                ]
+            )
+
+        zip_file.writestr("manifest.csv", manifest.getvalue())
+    yield buffer.pop()
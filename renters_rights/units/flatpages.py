@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.flatpages.views import render_flatpage
+from django.contrib.sites.shortcuts import get_current_site
+from django.http import Http404, HttpResponsePermanentRedirect
+
+from lib.cache import cache_anonymous_page, get_or_compute
+from units.models import FLATPAGES_CACHE_KEY
+
+
+def get_flatpages():
+    """Gets every flatpage, by site and URL. The pages are cached until a flatpage is saved or deleted, so looking up a
+    URL that isn't a flatpage doesn't query the database.
+
+    Returns: a dict of site ID to a dict of URL to FlatPage.
+    """
+
+    def build_flatpages():
+        flatpages = {}
+        for f in FlatPage.objects.prefetch_related("sites"):
+            for site in f.sites.all():
+                flatpages.setdefault(site.id, {})[f.url] = f
+        return flatpages
+
+    return get_or_compute(FLATPAGES_CACHE_KEY, build_flatpages, int(settings.CACHE_TIMEOUT))
+
+
+@cache_anonymous_page
+def flatpage(request, url):
+    """Works like django.contrib.flatpages.views.flatpage, but looks pages up with get_flatpages.
+
+    Args:
+      request: the request.
+      url: the URL of the page.
+
+    Returns: the rendered page, or a redirect to the URL with a trailing slash if that's a page.
+
+    Raises:
+      Http404: there's no page at the URL.
+    """
+    if not url.startswith("/"):
+        url = "/" + url
+    site_flatpages = get_flatpages().get(get_current_site(request).id, {})
+
+    f = site_flatpages.get(url)
+    if f is None:
+        if not url.endswith("/") and settings.APPEND_SLASH and f"{url}/" in site_flatpages:
+            return HttpResponsePermanentRedirect(f"{request.path}/")
+        raise Http404("No FlatPage matches the given query.")
+    return render_flatpage(request, f)
@@ -1,10 +1,9 @@
 import logging
 
 from django import forms
-from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from localflavor.us.us_states import CONTIGUOUS_STATES
 
+from units.jurisdictions import STATE_NAMES, get_jurisdiction_index
 from units.models import Unit
 
 logger = logging.getLogger(__name__)
@@ -36,32 +35,29 @@ class UnitForm(forms.ModelForm):
 
     @staticmethod
     def _get_state_name(state_code):
-        try:
-            return next(s for s in CONTIGUOUS_STATES if s[0] == state_code)[1]
-        except Exception:
-            return None
+        return STATE_NAMES.get(state_code)
 
     def clean(self):
         cleaned_data = super().clean()
         state = cleaned_data.get("unit_state")
-        state_name = self._get_state_name(state)
         zip_code = cleaned_data.get("unit_zip_code")
 
         if not state or not zip_code:
             return  # unit_state nad unit_zip_code being required fields will result in a required message if this isn't set
 
-        if self._get_state_name(state) not in settings.SUPPORTED_JURISDICTION_STATES:
+        jurisdictions = get_jurisdiction_index()
+        if not jurisdictions.supports_state(state):
             raise forms.ValidationError({"unit_state": _("Sorry, but we do not support that state at this time")})
 
-        if "ALL" in settings.SUPPORTED_JURISDICTIONS[state_name]:
-            return
-
-        if zip_code not in settings.SUPPORTED_JURISDICTION_ZIP_CODES_BY_STATE[state_name]:
+        if not jurisdictions.supports(state, zip_code):
             raise forms.ValidationError(
                 _(
                     "Sorry, but we only support jurisdictions that have adopted the Uniform Residential Landlord Tenant Act. In %(state)s, those jurisdictions are: %(jurisdictions)s"
-                    % {"state": state_name, "jurisdictions": ", ".join(settings.SUPPORTED_JURISDICTIONS[state_name].keys())}
                 )
+                % {
+                    "state": self._get_state_name(state),
+                    "jurisdictions": ", ".join(jurisdictions.get_jurisdiction_names(state)),
+                }
             )
 
 
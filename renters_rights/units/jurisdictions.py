@@ -0,0 +1,102 @@
+import uuid
+from itertools import chain
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from localflavor.us.us_states import US_STATES
+
+from units.models import JURISDICTION_INDEX_VERSION_KEY, Jurisdiction
+
+STATE_NAMES = MappingProxyType(dict(US_STATES))
+STATE_CODES = MappingProxyType({name: code for code, name in US_STATES})
+
+# Jurisdiction name used in settings.SUPPORTED_JURISDICTIONS for states that have adopted URLTA statewide.
+ALL_JURISDICTIONS = "ALL"
+
+_index = None
+
+
+class JurisdictionIndex:
+    """A read-only index of supported jurisdictions, so a state and ZIP code can be checked without scanning lists.
+
+    Args:
+      jurisdictions: an iterable of (state code, jurisdiction name, ZIP codes, adopted statewide) tuples.
+      version: the jurisdiction index version the index was built from.
+    """
+
+    def __init__(self, jurisdictions, version=None):
+        names = {}
+        zip_codes = {}
+        statewide = set()
+        for state, name, jurisdiction_zip_codes, all_zip_codes in jurisdictions:
+            names.setdefault(state, {})[name] = None
+            if all_zip_codes:
+                statewide.add(state)
+            for zip_code in jurisdiction_zip_codes:
+                zip_codes.setdefault((state, str(zip_code)), name)
+
+        self.names = MappingProxyType({state: tuple(state_names) for state, state_names in names.items()})
+        self.zip_codes = MappingProxyType(zip_codes)
+        self.statewide = frozenset(statewide)
+        self.version = version
+
+    def supports_state(self, state):
+        return state in self.names
+
+    def supports(self, state, zip_code):
+        return state in self.statewide or (state, str(zip_code)) in self.zip_codes
+
+    def get_jurisdiction_names(self, state):
+        return self.names.get(state, ())
+
+
+def get_settings_jurisdictions():
+    """Gets the jurisdictions defined in settings.SUPPORTED_JURISDICTIONS, in the format JurisdictionIndex expects."""
+    for state_name, jurisdictions in settings.SUPPORTED_JURISDICTIONS.items():
+        state = STATE_CODES.get(state_name)
+        for name, zip_codes in jurisdictions.items():
+            yield state, name, zip_codes, name == ALL_JURISDICTIONS
+
+
+def build_jurisdiction_index(version=None):
+    """Builds an index of the jurisdictions in settings and in the database.
+
+    Args:
+      version: the jurisdiction index version to build the index for.
+
+    Returns: a JurisdictionIndex.
+    """
+    rows = Jurisdiction.objects.values_list("state", "name", "zip_codes", "all_zip_codes")
+    return JurisdictionIndex(chain(get_settings_jurisdictions(), rows), version)
+
+
+def get_jurisdiction_index():
+    """Gets the jurisdiction index for this process. The index is rebuilt when the version in the cache changes, so
+    changes to jurisdictions are picked up by every process without restarting them.
+
+    Returns: a JurisdictionIndex.
+    """
+    global _index
+
+    version = cache.get(JURISDICTION_INDEX_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(JURISDICTION_INDEX_VERSION_KEY, version, None):
+            version = cache.get(JURISDICTION_INDEX_VERSION_KEY, version)
+
+    index = _index
+    if index is None or index.version != version:
+        index = _index = build_jurisdiction_index(version)
+    return index
+
+
+def find_jurisdiction(point):
+    """Finds the jurisdiction whose boundary contains a point, using the boundary's spatial index.
+
+    Args:
+      point: a GEOS Point.
+
+    Returns: the Jurisdiction, or None if the point isn't in a jurisdiction with a boundary.
+    """
+    return Jurisdiction.objects.filter(boundary__contains=point).first()
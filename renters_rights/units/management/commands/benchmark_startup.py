@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Loads the WSGI application and URLconf the way a gunicorn worker does, then reports how long that took, the peak
+# memory use and which of the slow to import modules were loaded.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+get_wsgi_application()
+get_resolver().url_patterns
+seconds = time.perf_counter() - start
+
+print(json.dumps({
+    "seconds": seconds,
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy_modules": sorted(m for m in %(heavy_modules)r if m in sys.modules),
+}))
+"""
+
+HEAVY_MODULES = ("boto3", "botocore", "cairocffi", "pdfrw", "PyPDF2", "weasyprint")
+
+
+class Command(BaseCommand):
+    help = "Starts the app in fresh processes and reports the time and memory each takes to load, as a web worker would."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Number of processes to start.")
+
+    def handle(self, *args, **options):
+        script = STARTUP_SCRIPT % {"heavy_modules": HEAVY_MODULES}
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)}
+
+        results = []
+        for _ in range(options["repeat"]):
+            process = subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=os.path.dirname(settings.BASE_DIR),
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            if process.returncode:
+                raise CommandError(f"App failed to start: {process.stderr.decode()}")
+            results.append(json.loads(process.stdout.decode().splitlines()[-1]))
+
+        timings = [r["seconds"] for r in results]
+        self.stdout.write(
+            f"startup: best {min(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s, "
+            f"max RSS {max(r['max_rss_kib'] for r in results) / 1024:.1f} MiB"
+        )
+        self.stdout.write(f"heavy modules loaded at startup: {', '.join(results[-1]['heavy_modules']) or 'none'}")
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from lib.cache import bump_user_cache_version, invalidate_user_snapshot
+from units.models import IMAGE_COUNT_FIELDS, Unit, UnitImage, get_dashboard_cache_key
+
+
+def count_rows(queryset, field):
+    """Builds a subquery counting the rows of a queryset that belong to the outer row.
+
+    Args:
+      queryset: the rows to count.
+      field: the queryset's foreign key to the outer row.
+
+    Returns: an expression that evaluates to the number of rows.
+    """
+    counts = queryset.filter(**{field: OuterRef("pk")}).order_by().values(field).annotate(count=Count("pk")).values("count")
+    return Coalesce(Subquery(counts), 0)
+
+
+def get_drifted(counts):
+    return Q(*[~Q(**{field: count}) for field, count in counts.items()], _connector=Q.OR)
+
+
+class Command(BaseCommand):
+    help = "Recounts the image counts on units and the unit counts on users, fixing any that have drifted."
+
+    def handle(self, *args, **options):
+        # Counts are recomputed in the UPDATE itself, rather than read and written back, so images and units added while
+        # the command runs are counted.
+        unit_counts = {
+            field: count_rows(UnitImage.objects.filter(image_type=image_type), "unit")
+            for image_type, field in IMAGE_COUNT_FIELDS.items()
+        }
+        User = get_user_model()
+        user_counts = {"unit_count": count_rows(Unit.objects.all(), "owner")}
+
+        with transaction.atomic():
+            drifted_units = Unit.objects.filter(get_drifted(unit_counts))
+            unit_owner_ids = set(drifted_units.values_list("owner_id", flat=True))
+            repaired_units = drifted_units.update(**unit_counts)
+
+            drifted_users = User.objects.filter(get_drifted(user_counts))
+            user_ids = set(drifted_users.values_list("pk", flat=True))
+            repaired_users = drifted_users.update(**user_counts)
+
+        # The repaired counts are shown on cached pages and dashboards, and the unit count is in the user snapshot.
+        for user_id in unit_owner_ids | user_ids:
+            bump_user_cache_version(user_id)
+            cache.delete(get_dashboard_cache_key(user_id))
+        for user_id in user_ids:
+            invalidate_user_snapshot(user_id)
+
+        self.stdout.write(f"Repaired counts for {repaired_units} units and {repaired_users} users.")
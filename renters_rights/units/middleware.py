@@ -1,8 +1,22 @@
+from django.conf import settings
+from django.http import Http404
+from django.utils.deprecation import MiddlewareMixin
+
+from units.flatpages import flatpage
+
+
 class TurbolinksMiddleware(object):
     """Send the `Turbolinks-Location` header in response to a visit that was redirected,
     and Turbolinks will replace the browser's topmost history entry.
+
+    The redirect location is carried to the next request in a short-lived signed cookie rather than the session, so
+    Turbolinks visits don't need to load or save the session.
     """
 
+    cookie_name = "_turbolinks_redirect_to"
+    cookie_salt = "units.turbolinks-redirect"
+    cookie_max_age = 60
+
     def __init__(self, get_response):
         self.get_response = get_response
 
@@ -13,16 +27,44 @@ class TurbolinksMiddleware(object):
         is_response_redirect = response.has_header("Location")
 
         if is_turbolinks:
+            prev_location = request.get_signed_cookie(
+                self.cookie_name, default=None, salt=self.cookie_salt, max_age=self.cookie_max_age
+            )
             if is_response_redirect:
                 location = response["Location"]
-                prev_location = request.session.pop("_turbolinks_redirect_to", None)
                 if prev_location is not None:
                     # relative subsequent redirect
                     if location.startswith("."):
                         location = prev_location.split("?")[0] + location
-                request.session["_turbolinks_redirect_to"] = location
-            else:
-                if request.session.get("_turbolinks_redirect_to"):
-                    location = request.session.pop("_turbolinks_redirect_to")
-                    response["Turbolinks-Location"] = location
+                response.set_signed_cookie(
+                    self.cookie_name,
+                    location,
+                    salt=self.cookie_salt,
+                    max_age=self.cookie_max_age,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite="Lax",
+                )
+            elif prev_location:
+                response["Turbolinks-Location"] = prev_location
+                response.delete_cookie(self.cookie_name)
         return response
+
+
+class FlatpageFallbackMiddleware(MiddlewareMixin):
+    """Works like django.contrib.flatpages.middleware.FlatpageFallbackMiddleware, but looks pages up in memory, so 404s
+    for URLs that aren't flatpages don't query the database.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code != 404:
+            return response
+        try:
+            return flatpage(request, request.path_info)
+        except Http404:
+            return response
+        except Exception:
+            # This is a middleware, so errors won't be caught elsewhere.
+            if settings.DEBUG:
+                raise
+            return response
@@ -0,0 +1,37 @@
+# Generated by Django 3.0.14 on 2026-10-19 12:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_images(apps, schema_editor):
+    Unit = apps.get_model("units", "Unit")
+    units = Unit.objects.annotate(
+        documents=Count("unitimage", filter=Q(unitimage__image_type="D")),
+        move_in_pictures=Count("unitimage", filter=Q(unitimage__image_type="MIP")),
+        move_out_pictures=Count("unitimage", filter=Q(unitimage__image_type="MOP")),
+    )
+    for unit in units:
+        Unit.objects.filter(pk=unit.pk).update(
+            document_count=unit.documents,
+            move_in_picture_count=unit.move_in_pictures,
+            move_out_picture_count=unit.move_out_pictures,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("units", "0013_auto_20200105_2219")]
+
+    operations = [
+        migrations.AddField(
+            model_name="unit", name="document_count", field=models.PositiveIntegerField(default=0, editable=False)
+        ),
+        migrations.AddField(
+            model_name="unit", name="move_in_picture_count", field=models.PositiveIntegerField(default=0, editable=False)
+        ),
+        migrations.AddField(
+            model_name="unit", name="move_out_picture_count", field=models.PositiveIntegerField(default=0, editable=False)
+        ),
+        migrations.RunPython(count_images, migrations.RunPython.noop),
+    ]
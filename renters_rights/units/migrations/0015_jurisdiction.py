@@ -0,0 +1,38 @@
+# Generated by Django 3.0.14 on 2026-10-19 14:02
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.fields
+import localflavor.us.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("units", "0014_unit_image_counts")]
+
+    operations = [
+        migrations.CreateModel(
+            name="Jurisdiction",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("state", localflavor.us.models.USStateField(max_length=2, verbose_name="State")),
+                ("name", models.CharField(max_length=100, verbose_name="Name")),
+                (
+                    "zip_codes",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=localflavor.us.models.USZipCodeField(max_length=10), blank=True, default=list, size=None
+                    ),
+                ),
+                ("all_zip_codes", models.BooleanField(default=False, verbose_name="Adopted statewide")),
+                (
+                    "boundary",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(
+                        blank=True, null=True, srid=4326, verbose_name="Boundary"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={"unique_together": {("state", "name")}},
+        )
+    ]
@@ -1,4 +1,3 @@
-import datetime
 import logging
 import string
 import sys
@@ -7,24 +6,30 @@ from io import BytesIO
 from random import choices
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.gis.db.models import MultiPolygonField
 from django.contrib.postgres.fields import ArrayField
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.db import models
-from django.db.models import EmailField
-from django.db.models.signals import post_delete
+from django.db import models, transaction
+from django.db.models import EmailField, F, Prefetch
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from localflavor.us.models import USStateField, USZipCodeField
 from phonenumber_field.modelfields import PhoneNumberField
 from PIL import Image
 
-from lib.models import UserOwnedModel
+from lib.cache import bump_anonymous_page_cache_version, bump_user_cache_version, get_or_compute, invalidate_user_snapshot
+from lib.models import BaseModel, UserOwnedModel
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +38,28 @@ MOVE_IN_PICTURE = "MIP"
 MOVE_OUT_PICTURE = "MOP"
 
 
+# Unit fields that count each type of image.
+IMAGE_COUNT_FIELDS = {
+    DOCUMENT: "document_count",
+    MOVE_IN_PICTURE: "move_in_picture_count",
+    MOVE_OUT_PICTURE: "move_out_picture_count",
+}
+
+# Name of the attribute prefetch_gallery stores a unit's images in.
+GALLERY_ATTR = "gallery_images"
+
+
+def get_dashboard_cache_key(user_id):
+    return f"dashboard-{user_id}"
+
+
+# Cache key of every flatpage by site and URL, see units.flatpages.get_flatpages.
+FLATPAGES_CACHE_KEY = "flatpages"
+
+# Cache key of the version of the jurisdiction index, which changes whenever a Jurisdiction is saved or deleted.
+JURISDICTION_INDEX_VERSION_KEY = "jurisdiction-index-version"
+
+
 def generate_file_path(instance, filename):
     """Generates a file upload path.
 
@@ -72,23 +99,63 @@ class Unit(UserOwnedModel):
     lease_end_date = models.DateField(_("Lease Start End Date"), blank=True, null=True)
     rent_due_date = models.PositiveIntegerField(_("Day Rent Due"), blank=True, null=True)
 
+    # Image counts, maintained when images are created or deleted, so limits can be checked without counting rows.
+    document_count = models.PositiveIntegerField(default=0, editable=False)
+    move_in_picture_count = models.PositiveIntegerField(default=0, editable=False)
+    move_out_picture_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = tuple(IMAGE_COUNT_FIELDS.values())
+
     def __str__(self):
         return f"{self.unit_address_1}"
 
     def get_absolute_url(self):
         return reverse("unit-detail", args=[self.slug])
 
+    @cached_property
+    def gallery(self):
+        """Groups images loaded by prefetch_gallery by image type.
+
+        Returns: A dictionary of image type to a list of images, newest first, or None if the images weren't prefetched.
+        """
+        if not hasattr(self, GALLERY_ATTR):
+            return None
+
+        gallery = {image_type: [] for image_type, name in UnitImage.IMAGE_TYPE_CHOICES}
+        for image in getattr(self, GALLERY_ATTR):
+            gallery[image.image_type].append(image)
+        return gallery
+
+    def get_images(self, *image_types):
+        """Gets the unit's images of the given types, newest first. Uses the prefetched gallery when there is one.
+
+        Args:
+          image_types: the types of images to return.
+
+        Returns: A list or queryset of images.
+        """
+        if self.gallery is None:
+            return self.unitimage_set.filter(image_type__in=image_types).order_by("-created_at")
+
+        if len(image_types) == 1:
+            return self.gallery[image_types[0]]
+        return sorted((i for t in image_types for i in self.gallery[t]), key=lambda i: i.created_at, reverse=True)
+
+    @property
+    def image_count(self):
+        return self.document_count + self.move_in_picture_count + self.move_out_picture_count
+
     def pictures(self):
-        return self.unitimage_set.filter(image_type__in=(MOVE_IN_PICTURE, MOVE_OUT_PICTURE)).order_by("-created_at")
+        return self.get_images(MOVE_IN_PICTURE, MOVE_OUT_PICTURE)
 
     def move_in_pictures(self):
-        return self.unitimage_set.filter(image_type=MOVE_IN_PICTURE).order_by("-created_at")
+        return self.get_images(MOVE_IN_PICTURE)
 
     def move_out_pictures(self):
-        return self.unitimage_set.filter(image_type=MOVE_OUT_PICTURE).order_by("-created_at")
+        return self.get_images(MOVE_OUT_PICTURE)
 
     def documents(self):
-        return self.unitimage_set.filter(image_type=DOCUMENT).order_by("-created_at")
+        return self.get_images(DOCUMENT)
 
     def has_landlord_into(self):
         return (
@@ -123,12 +190,12 @@ class UnitImage(UserOwnedModel):
 
     @property
     def thumbnail(self):
-        cache_key = f"image-{self.id}"
-        thumb = cache.get(cache_key)
-        if not thumb:
-            thumb = default_storage.url(f"{self.image.name.split('.')[0]}-{self.thumbnail_sizes[-1]}.jpg")
-            cache.add(cache_key, thumb)
-        return thumb
+        # The URL is signed for AWS_QUERYSTRING_EXPIRE, which is longer than it's cached for.
+        return get_or_compute(
+            f"image-{self.id}",
+            lambda: default_storage.url(f"{self.image.name.split('.')[0]}-{self.thumbnail_sizes[-1]}.jpg"),
+            int(settings.CACHE_TIMEOUT),
+        )
 
     @property
     def thumbnail_internal(self):
@@ -136,7 +203,20 @@ class UnitImage(UserOwnedModel):
 
         Returns: A thumbnail URL that can be accessed from the application server.
         """
-        return default_storage.url(f"{self.image.name.split('.')[0]}-{self.thumbnail_sizes[0]}.jpg").replace("localhost", "s3")
+        return self.get_internal_thumbnail_url(self.thumbnail_sizes[0])
+
+    @property
+    def compact_thumbnail_internal(self):
+        """Gets the smallest thumbnail that keeps the image's aspect ratio, for reports where file size matters more than
+        resolution. Images uploaded before a smaller size was configured fall back to the largest thumbnail.
+
+        Returns: A thumbnail URL that can be accessed from the application server.
+        """
+        sizes = [s for s in self.thumbnail_sizes if s != settings.UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH] or self.thumbnail_sizes
+        return self.get_internal_thumbnail_url(min(sizes))
+
+    def get_internal_thumbnail_url(self, size):
+        return default_storage.url(f"{self.image.name.split('.')[0]}-{size}.jpg").replace("localhost", "s3")
 
     def __str__(self):
         return f"{self.image.name}"
@@ -169,7 +249,8 @@ class UnitImage(UserOwnedModel):
             if size == min_size:
                 im = im.crop((0, 0, size, size))
 
-            im.save(output, format="JPEG", quality=75)
+            # Optimized Huffman tables make the file smaller without losing any quality.
+            im.save(output, format="JPEG", quality=75, optimize=True)
 
             output.seek(0)
 
@@ -184,9 +265,79 @@ class UnitImage(UserOwnedModel):
                     output, "ImageField", f"{file_path}.jpg", "image/jpeg", sys.getsizeof(output), None
                 )
 
-        self.unit.modified_at = datetime.datetime.utcnow()
-        self.unit.save()
-        super().save(*args, **kwargs)
+        self.unit.modified_at = timezone.now()
+        unit_updates = {"modified_at": self.unit.modified_at}
+
+        with transaction.atomic():
+            # The saved row is locked, so a concurrent change to its type or unit can't be counted twice.
+            previous = None
+            if self.pk is not None:
+                previous = UnitImage.objects.select_for_update().filter(pk=self.pk).values("unit_id", "image_type").first()
+            super().save(*args, **kwargs)
+
+            if previous != {"unit_id": self.unit_id, "image_type": self.image_type}:
+                if previous:
+                    previous_field = IMAGE_COUNT_FIELDS[previous["image_type"]]
+                    Unit.objects.filter(pk=previous["unit_id"], **{f"{previous_field}__gt": 0}).update(
+                        **{previous_field: F(previous_field) - 1}
+                    )
+                count_field = IMAGE_COUNT_FIELDS[self.image_type]
+                unit_updates[count_field] = F(count_field) + 1
+            Unit.objects.filter(pk=self.unit_id).update(**unit_updates)
+
+
+class Jurisdiction(BaseModel):
+    """A jurisdiction that has adopted the Uniform Residential Landlord Tenant Act. These are supported in addition to
+    the ones in settings.SUPPORTED_JURISDICTIONS, and both are looked up through units.jurisdictions.
+    """
+
+    state = USStateField(_("State"))
+    name = models.CharField(_("Name"), max_length=100)
+    zip_codes = ArrayField(USZipCodeField(), blank=True, default=list)
+    all_zip_codes = models.BooleanField(_("Adopted statewide"), default=False)
+    boundary = MultiPolygonField(_("Boundary"), blank=True, null=True)
+
+    class Meta:
+        unique_together = ("state", "name")
+
+    def __str__(self):
+        return f"{self.name}, {self.state}"
+
+
+def prefetch_gallery(units):
+    """Loads the images of every unit in a queryset with one ordered query, so the image accessors on each unit don't
+    need to query the database.
+
+    Args:
+      units: a queryset of units.
+
+    Returns: The queryset, with images prefetched.
+    """
+    return units.prefetch_related(
+        Prefetch("unitimage_set", queryset=UnitImage.objects.order_by("-created_at"), to_attr=GALLERY_ATTR)
+    )
+
+
+@receiver(post_delete, sender=UnitImage)
+def decrement_image_count(sender, instance, **kwargs):
+    """Post-delete signal handler to update the unit's count of images."""
+    count_field = IMAGE_COUNT_FIELDS[instance.image_type]
+    Unit.objects.filter(pk=instance.unit_id, **{f"{count_field}__gt": 0}).update(**{count_field: F(count_field) - 1})
+
+
+@receiver(post_save, sender=Unit)
+def increment_unit_count(sender, instance, created, **kwargs):
+    """Post-save signal handler to update the owner's count of units."""
+    if created:
+        get_user_model().objects.filter(pk=instance.owner_id).update(unit_count=F("unit_count") + 1)
+        invalidate_user_snapshot(instance.owner_id)
+
+
+@receiver(post_delete, sender=Unit)
+def decrement_unit_count(sender, instance, **kwargs):
+    """Post-delete signal handler to update the owner's count of units."""
+    get_user_model().objects.filter(pk=instance.owner_id, unit_count__gt=0).update(unit_count=F("unit_count") - 1)
+    invalidate_user_snapshot(instance.owner_id)
 
 
 @receiver(post_delete, sender=UnitImage)
@@ -196,3 +347,43 @@ def delete_thumbnails(sender, instance, using, **kwargs):
 
     for size in instance.thumbnail_sizes:
         default_storage.delete(f"{instance.image.name.split('.')[0]}-{size}.jpg")
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=UnitImage)
+@receiver(post_delete, sender=UnitImage)
+def invalidate_dashboard_summary(sender, instance, **kwargs):
+    """Signal handler to clear the owner's cached dashboard summary when their units or images change."""
+    cache.delete(get_dashboard_cache_key(instance.owner_id))
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=UnitImage)
+@receiver(post_delete, sender=UnitImage)
+def invalidate_page_cache(sender, instance, **kwargs):
+    """Signal handler to invalidate the owner's cached pages when their units or images change."""
+    bump_user_cache_version(instance.owner_id)
+
+
+@receiver(post_save, sender=Jurisdiction)
+@receiver(post_delete, sender=Jurisdiction)
+def invalidate_jurisdiction_index(sender, instance, **kwargs):
+    """Signal handler to make every process rebuild its jurisdiction index when jurisdictions change."""
+    cache.set(JURISDICTION_INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+@receiver(m2m_changed, sender=FlatPage.sites.through)
+def invalidate_flatpages(sender, instance, **kwargs):
+    """Signal handler to clear the cached flatpages when one is saved or deleted, or its sites change. They're cleared
+    once the change is committed, so a concurrent request can't cache the old flatpages again.
+    """
+    transaction.on_commit(clear_flatpages)
+
+
+def clear_flatpages():
+    cache.delete(FLATPAGES_CACHE_KEY)
+    bump_anonymous_page_cache_version()
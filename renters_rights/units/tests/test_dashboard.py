@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import override_settings
+from hamcrest import assert_that, contains, equal_to
+
+from units.dashboard import get_dashboard_summary
+from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE, Unit, UnitImage
+from units.tests import UnitBaseTestCase
+
+
+@override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+@override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+@override_settings(UNIT_IMAGE_SIZES=[10, 20])
+class DashboardSummaryTests(UnitBaseTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def create_image(self, image_type, unit=None):
+        return UnitImage.objects.create(
+            image=self.get_image_file(size=(20, 20)),
+            image_type=image_type,
+            unit=unit or DashboardSummaryTests.unit,
+            owner=DashboardSummaryTests.u,
+        )
+
+    def test_summary_counts_images_by_type(self):
+        self.create_image(MOVE_IN_PICTURE)
+        self.create_image(MOVE_IN_PICTURE)
+        self.create_image(MOVE_OUT_PICTURE)
+        self.create_image(DOCUMENT)
+
+        # One query for the units and one for their images.
+        with self.assertNumQueries(2):
+            summary = get_dashboard_summary(DashboardSummaryTests.u)
+
+        assert_that(summary["num_units"], equal_to(1))
+        assert_that(summary["picture_count"], equal_to(4))
+        assert_that(summary["allow_new_unit_creation"], equal_to(True))
+        unit = summary["units"][0]
+        assert_that(unit.move_in_picture_count, equal_to(2))
+        assert_that(unit.move_out_picture_count, equal_to(1))
+        assert_that(unit.document_count, equal_to(1))
+        with self.assertNumQueries(0):
+            assert_that(len(unit.move_in_pictures()), equal_to(2))
+
+    def test_summary_cached(self):
+        get_dashboard_summary(DashboardSummaryTests.u)
+        with self.assertNumQueries(0):
+            summary = get_dashboard_summary(DashboardSummaryTests.u)
+        assert_that(summary["units"], contains(DashboardSummaryTests.unit))
+
+    @override_settings(MAX_UNITS=1)
+    def test_summary_prevents_new_units_at_limit(self):
+        assert_that(get_dashboard_summary(DashboardSummaryTests.u)["allow_new_unit_creation"], equal_to(False))
+
+    def test_summary_invalidated_when_unit_created_or_deleted(self):
+        get_dashboard_summary(DashboardSummaryTests.u)
+        unit = Unit.objects.create(unit_address_1="u2", owner=DashboardSummaryTests.u)
+        assert_that(get_dashboard_summary(DashboardSummaryTests.u)["num_units"], equal_to(2))
+
+        unit.delete()
+        assert_that(get_dashboard_summary(DashboardSummaryTests.u)["num_units"], equal_to(1))
+
+    def test_summary_invalidated_when_image_created_or_deleted(self):
+        get_dashboard_summary(DashboardSummaryTests.u)
+        image = self.create_image(MOVE_IN_PICTURE)
+        assert_that(get_dashboard_summary(DashboardSummaryTests.u)["picture_count"], equal_to(1))
+
+        image.delete()
+        assert_that(get_dashboard_summary(DashboardSummaryTests.u)["picture_count"], equal_to(0))
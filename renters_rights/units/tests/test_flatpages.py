@@ -0,0 +1,61 @@
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import TestCase
+from hamcrest import assert_that, equal_to
+
+from units.flatpages import get_flatpages
+
+
+class FlatpageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.get_current()
+        self.page = FlatPage.objects.create(url="/about/", title="About", content="<p>We help renters.</p>")
+        self.page.sites.add(self.site)
+
+    def test_flatpage_is_rendered(self):
+        response = self.client.get("/about/")
+        self.assertContains(response, "We help renters.")
+
+    def test_missing_trailing_slash_redirects(self):
+        response = self.client.get("/about")
+        self.assertRedirects(response, "/about/", status_code=301)
+
+    def test_unknown_url_returns_404_without_querying(self):
+        self.client.get("/about/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/wp-login.php")
+        assert_that(response.status_code, equal_to(404))
+
+    def test_flatpages_are_invalidated_when_saved(self):
+        get_flatpages()
+
+        self.page.content = "<p>Updated.</p>"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.save()
+        self.assertContains(self.client.get("/about/"), "Updated.")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FlatPage.objects.create(url="/privacy/", title="Privacy", content="<p>Private.</p>").sites.add(self.site)
+        self.assertContains(self.client.get("/privacy/"), "Private.")
+
+    def test_flatpages_are_invalidated_when_removed_from_site(self):
+        get_flatpages()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.sites.remove(self.site)
+        assert_that(self.client.get("/about/").status_code, equal_to(404))
+
+    def test_flatpages_are_not_invalidated_until_commit(self):
+        get_flatpages()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.page.content = "<p>Updated.</p>"
+            self.page.save()
+            self.assertContains(self.client.get("/about/"), "We help renters.")
+
+        for callback in callbacks:
+            callback()
+        self.assertContains(self.client.get("/about/"), "Updated.")
@@ -0,0 +1,71 @@
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, is_, none
+
+from units.forms import UnitForm
+from units.jurisdictions import JurisdictionIndex, find_jurisdiction, get_jurisdiction_index
+from units.models import Jurisdiction
+
+
+class JurisdictionIndexTests(TestCase):
+    def setUp(self):
+        self.index = JurisdictionIndex(
+            [("KY", "Barbourville", [40906], False), ("KY", "Bellevue", ["41073"], False), ("IN", "ALL", [], True)]
+        )
+
+    def test_supports_state(self):
+        assert_that(self.index.supports_state("KY"), is_(True))
+        assert_that(self.index.supports_state("IN"), is_(True))
+        assert_that(self.index.supports_state("CA"), is_(False))
+
+    def test_supports_zip_code(self):
+        assert_that(self.index.supports("KY", "40906"), is_(True))
+        assert_that(self.index.supports("KY", "41073"), is_(True))
+        assert_that(self.index.supports("KY", "12345"), is_(False))
+
+    def test_supports_zip_code_in_other_state(self):
+        assert_that(self.index.supports("OH", "40906"), is_(False))
+
+    def test_supports_any_zip_code_statewide(self):
+        assert_that(self.index.supports("IN", "12345"), is_(True))
+
+    def test_get_jurisdiction_names(self):
+        assert_that(self.index.get_jurisdiction_names("KY"), equal_to(("Barbourville", "Bellevue")))
+        assert_that(self.index.get_jurisdiction_names("CA"), equal_to(()))
+
+
+class JurisdictionTests(TestCase):
+    def tearDown(self):
+        # Rows are rolled back without sending signals, so make sure the next test doesn't see them in the index.
+        Jurisdiction.objects.all().delete()
+
+    def test_index_includes_settings_jurisdictions(self):
+        index = get_jurisdiction_index()
+        assert_that(index.supports("KY", "40906"), is_(True))
+        assert_that(index.supports("IN", "12345"), is_(True))
+
+    def test_index_reloaded_when_jurisdiction_saved(self):
+        assert_that(get_jurisdiction_index().supports("KY", "41073"), is_(False))
+
+        jurisdiction = Jurisdiction.objects.create(state="KY", name="Bellevue", zip_codes=["41073"])
+        assert_that(get_jurisdiction_index().supports("KY", "41073"), is_(True))
+
+        jurisdiction.delete()
+        assert_that(get_jurisdiction_index().supports("KY", "41073"), is_(False))
+
+    def test_index_not_rebuilt_when_unchanged(self):
+        index = get_jurisdiction_index()
+        with self.assertNumQueries(0):
+            assert_that(get_jurisdiction_index(), is_(index))
+
+    def test_unit_form_valid_in_database_jurisdiction(self):
+        Jurisdiction.objects.create(state="OH", name="Ohio", all_zip_codes=True)
+        form = UnitForm(data={"unit_address_1": "1", "unit_state": "OH", "unit_zip_code": "43004"})
+        assert_that(form.is_valid(), is_(True))
+
+    def test_find_jurisdiction(self):
+        boundary = MultiPolygon(Polygon(((-84, 36.8), (-83.8, 36.8), (-83.8, 37), (-84, 37), (-84, 36.8))))
+        jurisdiction = Jurisdiction.objects.create(state="KY", name="Barbourville", boundary=boundary)
+
+        assert_that(find_jurisdiction(Point(-83.9, 36.9)), equal_to(jurisdiction))
+        assert_that(find_jurisdiction(Point(-85, 36.9)), is_(none()))
@@ -2,7 +2,7 @@ from unittest.mock import Mock
 
 from django.http import HttpRequest, HttpResponse
 from django.test import TestCase
-from hamcrest import assert_that, equal_to, same_instance
+from hamcrest import assert_that, equal_to, is_not, same_instance
 
 from units.middleware import TurbolinksMiddleware
 
@@ -14,6 +14,16 @@ class TurbolinksMiddlewareTests(TestCase):
         get_response.return_value = self.original_response
         self.m = TurbolinksMiddleware(get_response)
 
+    def set_redirect_cookie(self, request, location):
+        response = HttpResponse()
+        response.set_signed_cookie(TurbolinksMiddleware.cookie_name, location, salt=TurbolinksMiddleware.cookie_salt)
+        request.COOKIES[TurbolinksMiddleware.cookie_name] = response.cookies[TurbolinksMiddleware.cookie_name].value
+
+    def get_redirect_cookie(self, response):
+        request = HttpRequest()
+        request.COOKIES[TurbolinksMiddleware.cookie_name] = response.cookies[TurbolinksMiddleware.cookie_name].value
+        return request.get_signed_cookie(TurbolinksMiddleware.cookie_name, salt=TurbolinksMiddleware.cookie_salt)
+
     def test_original_response_returned_when_turbolinks_header_missing(self):
         request = HttpRequest()
         response = self.m(request)
@@ -21,32 +31,49 @@ class TurbolinksMiddlewareTests(TestCase):
 
     def test_response_includes_turbolinks_location_if_turbolinks_referrer_and_not_redirect(self):
         request = HttpRequest()
-        request.session = {}
         request.META["HTTP_TURBOLINKS_REFERRER"] = True
-        request.session["_turbolinks_redirect_to"] = "PAGE"
+        self.set_redirect_cookie(request, "PAGE")
 
         response = self.m(request)
         assert_that(response["Turbolinks-Location"], equal_to("PAGE"))
+        assert_that(response.cookies[TurbolinksMiddleware.cookie_name]["max-age"], equal_to(0))
 
-    def test_session__turbolinks_redirect_to_set_if_turbolinks_referrer_and_redirect_and_prev_not_location_set(self):
+    def test_response_does_not_include_turbolinks_location_if_cookie_tampered(self):
+        request = HttpRequest()
+        request.META["HTTP_TURBOLINKS_REFERRER"] = True
+        request.COOKIES[TurbolinksMiddleware.cookie_name] = "PAGE"
+
+        response = self.m(request)
+        assert_that(response.has_header("Turbolinks-Location"), equal_to(False))
+
+    def test_redirect_cookie_set_if_turbolinks_referrer_and_redirect_and_prev_not_location_set(self):
         self.original_response["Location"] = ".new-page"
 
         request = HttpRequest()
-        request.session = {}
         request.META["HTTP_TURBOLINKS_REFERRER"] = True
 
         response = self.m(request)
         assert_that(response, same_instance(self.original_response))
-        assert_that(request.session["_turbolinks_redirect_to"], equal_to(".new-page"))
+        assert_that(self.get_redirect_cookie(response), equal_to(".new-page"))
 
-    def test_session__turbolinks_redirect_to_set_if_turbolinks_referrer_and_redirect_and_prev_location_set(self):
+    def test_redirect_cookie_set_if_turbolinks_referrer_and_redirect_and_prev_location_set(self):
         self.original_response["Location"] = ".new-page"
 
         request = HttpRequest()
-        request.session = {}
         request.META["HTTP_TURBOLINKS_REFERRER"] = True
-        request.session["_turbolinks_redirect_to"] = "last-page"
+        self.set_redirect_cookie(request, "last-page")
 
         response = self.m(request)
         assert_that(response, same_instance(self.original_response))
-        assert_that(request.session["_turbolinks_redirect_to"], equal_to("last-page.new-page"))
+        assert_that(self.get_redirect_cookie(response), equal_to("last-page.new-page"))
+
+    def test_session_not_used(self):
+        self.original_response["Location"] = "/new-page"
+
+        request = HttpRequest()
+        request.META["HTTP_TURBOLINKS_REFERRER"] = True
+        request.session = Mock()
+
+        self.m(request)
+        assert_that(request.session.method_calls, equal_to([]))
+        assert_that(self.original_response.cookies, is_not(equal_to({})))
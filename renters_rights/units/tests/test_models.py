@@ -1,17 +1,20 @@
 import datetime
 import os
-from io import BytesIO
+from io import BytesIO, StringIO
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files import File
 from django.core.files.storage import default_storage
+from django.core.management import call_command
 from django.test import TransactionTestCase, override_settings
-from hamcrest import assert_that, equal_to, only_contains, starts_with
+from hamcrest import assert_that, contains, equal_to, has_length, is_not, none, only_contains, starts_with
 from PIL import Image
 
+from lib.cache import get_user_cache_version_key
 from noauth.models import User
-from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE, Unit, UnitImage
+from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE, Unit, UnitImage, get_dashboard_cache_key, prefetch_gallery
 from units.tests import UnitBaseTestCase
 
 
@@ -75,6 +78,150 @@ class UnitModelTests(UnitBaseTestCase):
 
         assert_that(UnitModelTests.unit.documents(), only_contains(document))
 
+    @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+    @override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+    @override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
+    def test_prefetched_gallery_grouped_by_type(self):
+        images = {}
+        for image_type in (MOVE_IN_PICTURE, DOCUMENT, MOVE_OUT_PICTURE, MOVE_IN_PICTURE):
+            images.setdefault(image_type, []).append(
+                UnitImage.objects.create(
+                    image=self.get_image_file(size=(20, 20)),
+                    image_type=image_type,
+                    unit=UnitModelTests.unit,
+                    owner=UnitModelTests.u,
+                )
+            )
+        unit2 = Unit.objects.create(unit_address_1="u2", owner=UnitModelTests.u)
+
+        with self.assertNumQueries(2):
+            units = list(prefetch_gallery(Unit.objects.for_user(UnitModelTests.u).order_by("id")))
+
+        with self.assertNumQueries(0):
+            unit = units[0]
+            assert_that(unit.move_in_pictures(), contains(*reversed(images[MOVE_IN_PICTURE])))
+            assert_that(unit.move_out_pictures(), contains(*images[MOVE_OUT_PICTURE]))
+            assert_that(unit.documents(), contains(*images[DOCUMENT]))
+            assert_that(
+                unit.pictures(), contains(images[MOVE_IN_PICTURE][1], images[MOVE_OUT_PICTURE][0], images[MOVE_IN_PICTURE][0])
+            )
+            assert_that(units[1], equal_to(unit2))
+            assert_that(units[1].pictures(), equal_to([]))
+
+
+@override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+@override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+@override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
+class CounterTests(UnitBaseTestCase):
+    def create_image(self, image_type):
+        return UnitImage.objects.create(
+            image=self.get_image_file(size=(20, 20)), image_type=image_type, unit=CounterTests.unit, owner=CounterTests.u
+        )
+
+    def test_image_counts_maintained(self):
+        self.create_image(MOVE_IN_PICTURE)
+        self.create_image(MOVE_IN_PICTURE)
+        self.create_image(MOVE_OUT_PICTURE)
+        document = self.create_image(DOCUMENT)
+
+        unit = Unit.objects.get(pk=CounterTests.unit.pk)
+        assert_that(unit.move_in_picture_count, equal_to(2))
+        assert_that(unit.move_out_picture_count, equal_to(1))
+        assert_that(unit.document_count, equal_to(1))
+        assert_that(unit.image_count, equal_to(4))
+
+        document.delete()
+        assert_that(Unit.objects.get(pk=CounterTests.unit.pk).document_count, equal_to(0))
+
+    def test_saving_stale_unit_does_not_overwrite_counts(self):
+        unit = Unit.objects.get(pk=CounterTests.unit.pk)
+        self.create_image(DOCUMENT)
+
+        unit.unit_address_2 = "Apt 2"
+        unit.save()
+
+        unit.refresh_from_db()
+        assert_that(unit.unit_address_2, equal_to("Apt 2"))
+        assert_that(unit.document_count, equal_to(1))
+
+    def test_saving_unit_with_update_fields_none_does_not_overwrite_counts(self):
+        unit = Unit.objects.get(pk=CounterTests.unit.pk)
+        self.create_image(DOCUMENT)
+
+        unit.unit_address_2 = "Apt 2"
+        unit.save(update_fields=None)
+
+        unit.refresh_from_db()
+        assert_that(unit.unit_address_2, equal_to("Apt 2"))
+        assert_that(unit.document_count, equal_to(1))
+
+    def test_image_counts_moved_when_type_changes(self):
+        image = self.create_image(MOVE_IN_PICTURE)
+
+        image.image_type = DOCUMENT
+        image.save()
+
+        unit = Unit.objects.get(pk=CounterTests.unit.pk)
+        assert_that(unit.move_in_picture_count, equal_to(0))
+        assert_that(unit.document_count, equal_to(1))
+
+    def test_saving_deleted_unit_inserts_it(self):
+        unit = Unit.objects.create(unit_address_1="u2", owner=CounterTests.u)
+        Unit.objects.filter(pk=unit.pk).delete()
+
+        unit.unit_address_2 = "Apt 2"
+        unit.save()
+
+        assert_that(Unit.objects.get(pk=unit.pk).unit_address_2, equal_to("Apt 2"))
+
+    def test_saving_copied_unit_inserts_it(self):
+        unit = Unit.objects.get(pk=CounterTests.unit.pk)
+        unit.pk = None
+        unit.slug = None
+        unit.save()
+
+        assert_that(Unit.objects.filter(owner=CounterTests.u), has_length(2))
+
+    def test_saving_unit_with_explicit_pk_inserts_it(self):
+        unit = Unit(pk=CounterTests.unit.pk + 100, unit_address_1="u2", owner=CounterTests.u)
+        unit.save()
+
+        assert_that(Unit.objects.get(pk=unit.pk).unit_address_1, equal_to("u2"))
+
+    def test_unit_count_maintained(self):
+        user = User.objects.get(pk=CounterTests.u.pk)
+        assert_that(user.unit_count, equal_to(1))
+
+        unit = Unit.objects.create(unit_address_1="u2", owner=CounterTests.u)
+        user.refresh_from_db()
+        assert_that(user.unit_count, equal_to(2))
+
+        unit.delete()
+        user.refresh_from_db()
+        assert_that(user.unit_count, equal_to(1))
+
+    def test_repair_counters(self):
+        self.create_image(MOVE_IN_PICTURE)
+        Unit.objects.filter(pk=CounterTests.unit.pk).update(move_in_picture_count=5, document_count=2)
+        User.objects.filter(pk=CounterTests.u.pk).update(unit_count=0)
+
+        call_command("repair_counters", stdout=StringIO())
+
+        unit = Unit.objects.get(pk=CounterTests.unit.pk)
+        assert_that(unit.move_in_picture_count, equal_to(1))
+        assert_that(unit.document_count, equal_to(0))
+        assert_that(User.objects.get(pk=CounterTests.u.pk).unit_count, equal_to(1))
+
+    def test_repair_counters_invalidates_repaired_users_caches(self):
+        Unit.objects.filter(pk=CounterTests.unit.pk).update(document_count=2)
+        cache.set(get_dashboard_cache_key(CounterTests.u.pk), "summary")
+        cache.set(get_user_cache_version_key(CounterTests.u.pk), "version", None)
+
+        call_command("repair_counters", stdout=StringIO())
+
+        assert_that(cache.get(get_dashboard_cache_key(CounterTests.u.pk)), none())
+        assert_that(cache.get(get_user_cache_version_key(CounterTests.u.pk)), is_not(equal_to("version")))
+
 
 class UnitImageModelTests(UnitBaseTestCase):
     @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
@@ -136,6 +283,27 @@ class UnitImageModelTests(UnitBaseTestCase):
         assert_that(default_storage.exists(image.image.path), equal_to(True))
         assert_that(image.thumbnail_internal, equal_to(settings.MEDIA_URL + image.image.name.replace(".jpg", "-10.jpg")))
 
+    @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=5)
+    @override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+    @override_settings(UNIT_IMAGE_SIZES=[5, 8, 10, 20])
+    def test_validate_compact_thumbnail_internal_property(self):
+        image = UnitImage.objects.create(
+            image=self.get_image_file(size=(20, 20)), unit=UnitImageModelTests.unit, owner=UnitImageModelTests.u
+        )
+        assert_that(image.thumbnail_internal, equal_to(settings.MEDIA_URL + image.image.name.replace(".jpg", "-10.jpg")))
+        assert_that(image.compact_thumbnail_internal, equal_to(settings.MEDIA_URL + image.image.name.replace(".jpg", "-8.jpg")))
+
+    @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+    @override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+    @override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
+    def test_compact_thumbnail_internal_falls_back_to_largest_thumbnail(self):
+        image = UnitImage.objects.create(
+            image=self.get_image_file(size=(20, 20)), unit=UnitImageModelTests.unit, owner=UnitImageModelTests.u
+        )
+        assert_that(
+            image.compact_thumbnail_internal, equal_to(settings.MEDIA_URL + image.image.name.replace(".jpg", "-10.jpg"))
+        )
+
     @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
     @override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
     @override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
@@ -1,6 +1,8 @@
 from unittest import TestCase
 
+from django.core.cache import cache
 from django.db.models import CharField, Model
+from django.template import Context, Template
 from hamcrest import assert_that, equal_to
 
 from units.templatetags.bound_field import bound_field
@@ -17,3 +19,13 @@ class TemplateTagTests(TestCase):
             long_name = CharField(verbose_name="Long Name")
 
         assert_that(field_name(MyThing(), "long_name"), equal_to("Long Name"))
+
+    def test_fragment_cache(self):
+        cache.clear()
+        template = Template(
+            "{% load fragment_cache %}{% fragment_cache 600 name unit %}{{ unit }} {{ text }}{% endfragment_cache %}"
+        )
+
+        assert_that(template.render(Context({"unit": 1, "text": "a"})), equal_to("1 a"))
+        assert_that(template.render(Context({"unit": 1, "text": "b"})), equal_to("1 a"))
+        assert_that(template.render(Context({"unit": 2, "text": "b"})), equal_to("2 b"))
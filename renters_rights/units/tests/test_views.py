@@ -1,14 +1,25 @@
+import csv
 import json
-from io import BytesIO
+import zipfile
+from io import BytesIO, StringIO
 from unittest.mock import patch
 
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files import File
+from django.db import connection
+from django.shortcuts import render
 from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from freezegun import freeze_time
-from hamcrest import assert_that, contains, contains_inanyorder, equal_to, has_length, not_, not_none
+from hamcrest import all_of, assert_that, contains, contains_inanyorder, contains_string, equal_to, has_length, not_, not_none
 from PIL import Image
 
+from documents.models import DocumentTemplate
+from lib.executor import ExecutorBusy, SharedExecutor, get_executor
+from lib.s3 import InMemoryS3
 from noauth.models import User
 from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE, Unit, UnitImage
 from units.tests import UnitBaseTestCase
@@ -16,6 +27,7 @@ from units.tests import UnitBaseTestCase
 
 class UnitViewTests(UnitBaseTestCase):
     def test_index_view_logged_out(self):
+        cache.clear()
         response = self.client.get(reverse("homepage"))
         self.assertTemplateUsed(response, "index-logged-out.html")
 
@@ -63,6 +75,84 @@ class UnitViewTests(UnitBaseTestCase):
         self.assertContains(response, unit2.unit_address_1)
         assert_that(response.context["unit_list"], contains_inanyorder(UnitViewTests.unit, unit2))
 
+    def test_list_view_query_count_does_not_depend_on_unit_count(self):
+        c = Client()
+        c.force_login(UnitViewTests.u)
+
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = c.get(reverse("unit-list"))
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        UnitImage.objects.create(
+            image=self.get_image_file(size=(200, 200)),
+            image_type=MOVE_IN_PICTURE,
+            unit=UnitViewTests.unit,
+            owner=UnitViewTests.u,
+        )
+        one_unit_queries = count_queries()
+
+        for i in range(2):
+            unit = Unit.objects.create(unit_address_1=f"u{i}", owner=UnitViewTests.u)
+            UnitImage.objects.create(
+                image=self.get_image_file(size=(200, 200)), image_type=DOCUMENT, unit=unit, owner=UnitViewTests.u
+            )
+        assert_that(count_queries(), equal_to(one_unit_queries))
+
+    def test_list_view_cached_per_user(self):
+        c = Client()
+        c.force_login(UnitViewTests.u)
+        cache.clear()
+        # The first view sets the CSRF cookie, and the second caches the page for that cookie.
+        c.get(reverse("unit-list"))
+        c.get(reverse("unit-list"))
+
+        with CaptureQueriesContext(connection) as context:
+            response = c.get(reverse("unit-list"))
+        self.assertContains(response, UnitViewTests.unit.unit_address_1)
+        assert_that([q["sql"] for q in context.captured_queries if "units_unit" in q["sql"]], has_length(0))
+
+    @override_settings(USER_PAGE_CACHE_SECONDS=60)
+    def test_list_view_cached_for_user_page_cache_seconds(self):
+        c = Client()
+        c.force_login(UnitViewTests.u)
+        cache.clear()
+        c.get(reverse("unit-list"))
+
+        with patch("lib.cache.cache.set", wraps=cache.set) as m_set:
+            c.get(reverse("unit-list"))
+        page_sets = [call for call in m_set.call_args_list if call[0][0].startswith("user-page-")]
+        assert_that(page_sets, has_length(1))
+        assert_that(page_sets[0][0][2], equal_to(60))
+
+    def test_list_view_cache_invalidated_when_unit_created(self):
+        c = Client()
+        c.force_login(UnitViewTests.u)
+        cache.clear()
+        c.get(reverse("unit-list"))
+        c.get(reverse("unit-list"))
+
+        Unit.objects.create(unit_address_1="A brand new unit", owner=UnitViewTests.u)
+        self.assertContains(c.get(reverse("unit-list")), "A brand new unit")
+
+    def test_detail_view_cache_invalidated_when_image_added(self):
+        c = Client()
+        c.force_login(UnitViewTests.u)
+        cache.clear()
+        view_url = reverse("unit-detail", args=[UnitViewTests.unit.slug])
+        c.get(view_url)
+        self.assertNotContains(c.get(view_url), "Move-in picture uploaded")
+
+        UnitImage.objects.create(
+            image=self.get_image_file(size=(200, 200)),
+            image_type=MOVE_IN_PICTURE,
+            unit=UnitViewTests.unit,
+            owner=UnitViewTests.u,
+        )
+        self.assertContains(c.get(view_url), "Move-in picture uploaded")
+
     def test_list_view_does_not_return_another_users_units(self):
         other_user = User.objects.create(is_active=True, username="tahani@al-jamil.com")
         other_user_unit = Unit.objects.create(unit_address_1="other", owner=other_user)
@@ -185,6 +275,17 @@ class UnitViewTests(UnitBaseTestCase):
             },
         )
 
+    @override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={"sign-files:ip": (10, 60), "sign-files:user": (1, 60)})
+    def test_sign_files_throttled(self):
+        cache.clear()
+        c = Client()
+        c.force_login(UnitViewTests.u)
+        url = reverse("sign-files", args=[UnitViewTests.unit.slug])
+        body = json.dumps({"files": ["file1.jpg"]})
+
+        assert_that(c.post(url, body, content_type="application/json").status_code, equal_to(200))
+        assert_that(c.post(url, body, content_type="application/json").status_code, equal_to(429))
+
     @override_settings(AWS_S3_ENDPOINT_URL="http://url")
     @override_settings(AWS_S3_CUSTOM_DOMAIN="http://domain")
     @freeze_time("2000-01-01")
@@ -241,6 +342,46 @@ class UnitViewTests(UnitBaseTestCase):
         assert_that(response.status_code, equal_to(400))
 
 
+class UnitExportViewTests(UnitBaseTestCase):
+    def test_export_requires_login(self):
+        view_url = reverse("unit-export", args=[UnitExportViewTests.unit.slug])
+        response = self.client.get(view_url)
+        self.assertRedirects(response, f"{reverse('noauth:log-in')}?next={view_url}")
+
+    def test_export_of_another_users_unit_returns_404(self):
+        c = Client()
+        c.force_login(User.objects.create(is_active=True, username="tahani@al-jamil.com"))
+        response = c.get(reverse("unit-export", args=[UnitExportViewTests.unit.slug]))
+        assert_that(response.status_code, equal_to(404))
+
+    def test_export_contains_images_and_manifest(self):
+        i1 = UnitImage.objects.create(
+            image=self.get_image_file(size=(200, 200)), image_type=MOVE_IN_PICTURE, unit=self.unit, owner=self.u
+        )
+        i2 = UnitImage.objects.create(
+            image=self.get_image_file(size=(200, 200)), image_type=DOCUMENT, unit=self.unit, owner=self.u
+        )
+
+        c = Client()
+        c.force_login(UnitExportViewTests.u)
+        response = c.get(reverse("unit-export", args=[UnitExportViewTests.unit.slug]))
+        assert_that(response.status_code, equal_to(200))
+        assert_that(response["Content-Type"], equal_to("application/zip"))
+
+        zip_file = zipfile.ZipFile(BytesIO(b"".join(response.streaming_content)))
+        assert_that(zip_file.testzip(), equal_to(None))
+        i1.image.open("rb")
+        assert_that(
+            zip_file.read(f"move-in-pictures/{i1.created_at.strftime('%Y-%m-%d-%H%M%S')}-{i1.id}.jpg"),
+            equal_to(i1.image.read()),
+        )
+
+        manifest = list(csv.DictReader(StringIO(zip_file.read("manifest.csv").decode("utf-8"))))
+        assert_that(manifest, has_length(2))
+        assert_that(manifest[0]["uploaded_at"], equal_to(i1.created_at.isoformat()))
+        assert_that(manifest[1]["file"], equal_to(f"documents/{i2.created_at.strftime('%Y-%m-%d-%H%M%S')}-{i2.id}.jpg"))
+
+
 class UnitAddDocumentsFormViewGetTests(UnitBaseTestCase):
     def test_unit_add_documents_requires_login(self):
         view_url = reverse("unit-add-documents", args=[UnitAddDocumentsFormViewGetTests.unit.slug])
@@ -297,7 +438,28 @@ class UnitAddDocumentsFormViewGetTests(UnitBaseTestCase):
         self.assertContains(response, "You have uploaded 1 of 1 allowed images")
 
 
+@override_settings(S3_CLIENT_FACTORY="lib.s3.InMemoryS3")
 class UnitAddDocumentsFormViewPostTests(TransactionTestCase):
+    def setUp(self):
+        InMemoryS3.objects.clear()
+
+    @staticmethod
+    def put_upload(key):
+        InMemoryS3.objects[(settings.AWS_UPLOAD_BUCKET_NAME, key)] = UnitBaseTestCase.get_image_file().read()
+
+    @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+    def test_unit_add_documents_only_downloads_from_owners_folder(self):
+        u = User.objects.create(is_active=True, username="eleanor2@shellstrop.com")
+        unit = Unit.objects.create(unit_address_1="u", owner=u)
+        self.put_upload("tahani@al-jamil.com/file1.jpg")
+
+        c = Client()
+        c.force_login(u)
+
+        with self.assertRaises(ClientError):
+            c.post(reverse("unit-add-documents", args=[unit.slug]), {"s3_images": "file1.jpg"})
+        assert_that(unit.unitimage_set.all(), has_length(0))
+
     @staticmethod
     def get_image_file(name="test.png", ext="png", size=(50, 50), color=(256, 0, 0)):
         file_obj = BytesIO()
@@ -324,6 +486,52 @@ class UnitAddDocumentsFormViewPostTests(TransactionTestCase):
         unit.refresh_from_db()
         assert_that(unit.unitimage_set.all(), has_length(2))
 
+    @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+    @override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+    @override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
+    def test_unit_add_documents_uses_shared_executor(self):
+        u = User.objects.create(is_active=True, username="eleanor@shellstrop.com")
+        unit = Unit.objects.create(unit_address_1="u", owner=u)
+        completed = get_executor().stats()["completed"]
+
+        c = Client()
+        c.force_login(u)
+
+        c.post(reverse("unit-add-documents", args=[unit.slug]), {"images": [UnitBaseTestCase.get_image_file()]})
+        stats = get_executor().stats()
+        assert_that(stats["completed"], equal_to(completed + 1))
+        assert_that(stats["queued"], equal_to(0))
+        assert_that(stats["active"], equal_to(0))
+
+    @patch("lib.executor.SharedExecutor.reserve", side_effect=ExecutorBusy)
+    def test_unit_add_documents_executor_busy_returns_503(self, m_reserve):
+        u = User.objects.create(is_active=True, username="eleanor@shellstrop.com")
+        unit = Unit.objects.create(unit_address_1="u", owner=u)
+
+        c = Client()
+        c.force_login(u)
+
+        response = c.post(reverse("unit-add-documents", args=[unit.slug]), {"images": [UnitBaseTestCase.get_image_file()]})
+        assert_that(response.status_code, equal_to(503))
+        assert_that(response["Retry-After"], equal_to("60"))
+        assert_that(unit.unitimage_set.all(), has_length(0))
+
+    @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
+    @override_settings(UNIT_IMAGE_MAX_HEIGHT_AND_WIDTH=20)
+    @override_settings(UNIT_IMAGE_SIZES=[5, 10, 20])
+    def test_unit_add_documents_batch_that_only_partly_fits_saves_nothing(self):
+        u = User.objects.create(is_active=True, username="eleanor@shellstrop.com")
+        unit = Unit.objects.create(unit_address_1="u", owner=u)
+
+        c = Client()
+        c.force_login(u)
+
+        images = [UnitBaseTestCase.get_image_file(), UnitBaseTestCase.get_image_file()]
+        with patch("units.views.get_executor", return_value=SharedExecutor(max_workers=1, max_queue_size=0)):
+            response = c.post(reverse("unit-add-documents", args=[unit.slug]), {"images": images})
+        assert_that(response.status_code, equal_to(503))
+        assert_that(unit.unitimage_set.all(), has_length(0))
+
     def test_unit_add_documents_no_documents_returns_error(self):
         u = User.objects.create(is_active=True, username="eleanor2@shellstrop.com")
         unit = Unit.objects.create(unit_address_1="u", owner=u)
@@ -338,21 +546,19 @@ class UnitAddDocumentsFormViewPostTests(TransactionTestCase):
         assert_that(unit.unitimage_set.all(), has_length(0))
 
     @patch("django.forms.ModelForm.save")
-    @patch("boto3.client")
     @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
-    def test_unit_add_documents_valid_two_documents_s3(self, m_client, m_save):
+    def test_unit_add_documents_valid_two_documents_s3(self, m_save):
         u = User.objects.create(is_active=True, username="eleanor2@shellstrop.com")
         unit = Unit.objects.create(unit_address_1="u", owner=u)
         m_save.return_value = unit
 
-        i1 = UnitBaseTestCase.get_image_file()
-        i2 = UnitBaseTestCase.get_image_file()
-        m_client.return_value.get_object.side_effect = [{"Body": i1}, {"Body": i2}]
+        self.put_upload("eleanor2@shellstrop.com/file1.jpg")
+        self.put_upload("eleanor2@shellstrop.com/file2.jpg")
 
         c = Client()
         c.force_login(u)
 
-        response = c.post(reverse("unit-add-documents", args=[unit.slug]), {"s3_images": "file1.jpg, file2.jpg"})
+        response = c.post(reverse("unit-add-documents", args=[unit.slug]), {"s3_images": "file1.jpg,file2.jpg"})
         self.assertRedirects(response, reverse("unit-list"))
         unit.refresh_from_db()
         assert_that(unit.unitimage_set.all(), has_length(2))
@@ -376,21 +582,19 @@ class UnitAddDocumentsFormViewPostTests(TransactionTestCase):
         assert_that(unit.unitimage_set.all(), has_length(2))
 
     @patch("django.forms.ModelForm.save")
-    @patch("boto3.client")
     @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
-    def test_unit_add_move_in_pictures_valid_two_move_in_pictures_s3(self, m_client, m_save):
+    def test_unit_add_move_in_pictures_valid_two_move_in_pictures_s3(self, m_save):
         u = User.objects.create(is_active=True, username="eleanor2@shellstrop.com")
         unit = Unit.objects.create(unit_address_1="u", owner=u)
         m_save.return_value = unit
 
-        i1 = UnitBaseTestCase.get_image_file()
-        i2 = UnitBaseTestCase.get_image_file()
-        m_client.return_value.get_object.side_effect = [{"Body": i1}, {"Body": i2}]
+        self.put_upload("eleanor2@shellstrop.com/file1.jpg")
+        self.put_upload("eleanor2@shellstrop.com/file2.jpg")
 
         c = Client()
         c.force_login(u)
 
-        response = c.post(reverse("unit-add-move-in-pictures", args=[unit.slug]), {"s3_images": "file1.jpg, file2.jpg"})
+        response = c.post(reverse("unit-add-move-in-pictures", args=[unit.slug]), {"s3_images": "file1.jpg,file2.jpg"})
         self.assertRedirects(response, reverse("unit-list"))
         unit.refresh_from_db()
         assert_that(unit.unitimage_set.all(), has_length(2))
@@ -427,21 +631,19 @@ class UnitAddDocumentsFormViewPostTests(TransactionTestCase):
         assert_that(unit.unitimage_set.all(), has_length(2))
 
     @patch("django.forms.ModelForm.save")
-    @patch("boto3.client")
     @override_settings(UNIT_IMAGE_MIN_HEIGHT_AND_WIDTH=10)
-    def test_unit_add_move_out_pictures_valid_two_move_out_pictures_s3(self, m_client, m_save):
+    def test_unit_add_move_out_pictures_valid_two_move_out_pictures_s3(self, m_save):
         u = User.objects.create(is_active=True, username="eleanor2@shellstrop.com")
         unit = Unit.objects.create(unit_address_1="u", owner=u)
         m_save.return_value = unit
 
-        i1 = UnitBaseTestCase.get_image_file()
-        i2 = UnitBaseTestCase.get_image_file()
-        m_client.return_value.get_object.side_effect = [{"Body": i1}, {"Body": i2}]
+        self.put_upload("eleanor2@shellstrop.com/file1.jpg")
+        self.put_upload("eleanor2@shellstrop.com/file2.jpg")
 
         c = Client()
         c.force_login(u)
 
-        response = c.post(reverse("unit-add-move-out-pictures", args=[unit.slug]), {"s3_images": "file1.jpg, file2.jpg"})
+        response = c.post(reverse("unit-add-move-out-pictures", args=[unit.slug]), {"s3_images": "file1.jpg,file2.jpg"})
         self.assertRedirects(response, reverse("unit-list"))
         unit.refresh_from_db()
         assert_that(unit.unitimage_set.all(), has_length(2))
@@ -483,3 +685,41 @@ class UnitDeleteViewTests(UnitBaseTestCase):
         response = c.post(reverse("unit-delete", args=[unit.slug]))
         self.assertRedirects(response, reverse("unit-list"))
         assert_that(Unit.objects.filter(id=unit.id).count(), equal_to(0))
+
+
+class AnonymousPageCacheTests(UnitBaseTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_is_cached(self):
+        self.client.get(reverse("get-started"))
+
+        with patch("units.views.render") as m_render:
+            response = self.client.get(reverse("get-started"))
+        m_render.assert_not_called()
+        self.assertContains(response, "Get Started")
+        assert_that(response["Cache-Control"], contains_string(f"s-maxage={settings.ANONYMOUS_PAGE_CACHE_SECONDS}"))
+        assert_that(response["Vary"], all_of(contains_string("Accept-Language"), contains_string("Cookie")))
+        assert_that(response.cookies, has_length(0))
+
+    def test_page_is_not_cached_with_session_cookie(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = "not-a-session"
+        self.client.get(reverse("get-started"))
+
+        with patch("units.views.render", wraps=render) as m_render:
+            response = self.client.get(reverse("get-started"))
+        m_render.assert_called_once()
+        assert_that(response.get("Cache-Control", ""), not_(contains_string("s-maxage")))
+
+    def test_page_is_cached_per_language(self):
+        self.client.get(reverse("get-started"), HTTP_ACCEPT_LANGUAGE="en")
+
+        response = self.client.get(reverse("get-started"), HTTP_ACCEPT_LANGUAGE="es")
+        assert_that(response["Content-Language"], equal_to("es"))
+
+    def test_page_is_invalidated_when_document_template_saved(self):
+        self.client.get(reverse("documents:document-list"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentTemplate.objects.create(name_en="A brand new letter", slug="new-letter", body="body")
+        self.assertContains(self.client.get(reverse("documents:document-list")), "A brand new letter")
@@ -9,6 +9,7 @@ from .views import (
     UnitCreate,
     UnitDeleteView,
     UnitDetailView,
+    UnitExportView,
     UnitListView,
     UnitUpdate,
     sign_files,
@@ -25,5 +26,6 @@ urlpatterns = [
     path("units/<slug:slug>/add-move-in-pics/", UnitAddMoveInPicturesFormView.as_view(), name="unit-add-move-in-pictures"),
     path("units/<slug:slug>/add-move-out-pics/", UnitAddMoveOutPicturesFormView.as_view(), name="unit-add-move-out-pictures"),
     path("units/<slug:slug>/sign-files/", sign_files, name="sign-files"),
+    path("units/<slug:slug>/export/", UnitExportView.as_view(), name="unit-export"),
     path("units/<slug:slug>/", UnitDetailView.as_view(), name="unit-detail"),
 ]
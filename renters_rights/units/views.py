@@ -1,66 +1,63 @@
+import asyncio
 import json
-from concurrent.futures import FIRST_EXCEPTION, wait
-from concurrent.futures.thread import ThreadPoolExecutor
 
-import boto3
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, DetailView, FormView, ListView, UpdateView, View
 
-from documents.models import DocumentTemplate
+from documents.catalog import get_document_catalog
+from lib.cache import UserPageCacheMixin, cache_anonymous_page
+from lib.executor import ExecutorBusy, get_executor
+from lib.s3 import get_s3_client
+from lib.throttle import throttle
 from lib.views import ProtectedView, get_next_page_from_request
+from units.dashboard import get_dashboard_summary
+from units.export import stream_unit_evidence
 from units.forms import UnitAddImageForm, UnitForm
-from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE, Unit, UnitImage
+from units.models import DOCUMENT, MOVE_IN_PICTURE, MOVE_OUT_PICTURE, Unit, UnitImage, prefetch_gallery
 
 
+@method_decorator(cache_anonymous_page, name="dispatch")
 class IndexView(View):
     def get(self, request):
         if not request.user.is_authenticated:
             return render(request, "index-logged-out.html")
 
-        units = Unit.objects.for_user(self.request.user)
         context = {
-            "units": units,
-            "num_units": len(units),
-            "allow_new_unit_creation": len(units) < settings.MAX_UNITS,
-            "picture_count": sum([u.unitimage_set.count() for u in units]),
-            "document_list": DocumentTemplate.objects.filter(include_on_get_started=True),
+            **get_dashboard_summary(self.request.user),
+            **{"document_list": [d for d in get_document_catalog() if d.include_on_get_started]},
         }
 
         return render(request, "index.html", context=context)
 
 
+@method_decorator(cache_anonymous_page, name="dispatch")
 class GetStartedView(View):
     def get(self, request):
         context = {}
         if self.request.user.is_authenticated:
-            units = Unit.objects.for_user(self.request.user)
-            context = {
-                "units": units,
-                "num_units": len(units),
-                "allow_new_unit_creation": len(units) < settings.MAX_UNITS,
-                "picture_count": sum([u.unitimage_set.count() for u in units]),
-                "document_list": DocumentTemplate.objects.all(),  # .filter(include_on_get_started=True),
-            }
+            context = {**get_dashboard_summary(self.request.user), **{"document_list": get_document_catalog()}}
 
         return render(request, "get-started.html", context=context)
 
 
-class UnitListView(ListView):
+class UnitListView(UserPageCacheMixin, ListView):
     model = Unit
     context_object_name = "unit_list"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["model"] = self.model
-        num_units = self.get_queryset().count()
+        num_units = self.request.user.unit_count if self.request.user.is_authenticated else 0
         context["num_units"] = num_units
         context["allow_new_unit_creation"] = num_units < settings.MAX_UNITS
         context["CACHE_TIMEOUT"] = settings.CACHE_TIMEOUT
@@ -68,12 +65,12 @@ class UnitListView(ListView):
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Unit.objects.for_user(self.request.user)
+            return prefetch_gallery(Unit.objects.for_user(self.request.user))
         else:
             return Unit.objects.none()
 
 
-class UnitDetailView(DetailView, ProtectedView):
+class UnitDetailView(UserPageCacheMixin, DetailView, ProtectedView):
     model = Unit
 
     def get_context_data(self, **kwargs):
@@ -82,7 +79,7 @@ class UnitDetailView(DetailView, ProtectedView):
         return context
 
     def get_queryset(self):
-        return Unit.objects.for_user(self.request.user)
+        return prefetch_gallery(Unit.objects.for_user(self.request.user))
 
 
 class UnitCreate(CreateView, ProtectedView):
@@ -92,7 +89,7 @@ class UnitCreate(CreateView, ProtectedView):
     initial = {"unit_state": "KY"}
 
     def check_unit_limit(self):
-        if self.request.user.is_authenticated and Unit.objects.for_user(self.request.user).count() >= settings.MAX_UNITS:
+        if self.request.user.is_authenticated and self.request.user.unit_count >= settings.MAX_UNITS:
             messages.add_message(
                 self.request, messages.ERROR, _("You have added the maximum number of units. Please delete a unit to continue.")
             )
@@ -132,6 +129,16 @@ class UnitDeleteView(ProtectedView):
         return HttpResponseRedirect(reverse("unit-list"))
 
 
+class UnitExportView(ProtectedView):
+    """Streams a ZIP file of all of a unit's pictures and documents, e.g. for use as evidence in court."""
+
+    def get(self, request, *args, **kwargs):
+        unit = Unit.objects.get_for_user(self.request.user, slug=self.kwargs["slug"])
+        response = StreamingHttpResponse(stream_unit_evidence(unit), content_type="application/zip")
+        response["Content-Disposition"] = f"attachment; filename={unit.slug}.zip"
+        return response
+
+
 class UnitAddImagesFormViewBase(FormView, ProtectedView):
     template_name = "units/unit_add_image.html"
     form_class = UnitAddImageForm
@@ -143,41 +150,58 @@ class UnitAddImagesFormViewBase(FormView, ProtectedView):
         form_kwargs["unit"] = unit
         return form_kwargs
 
-    def download_image(self, path, unit):
+    async def download_image(self, s3, path, username):
         # Make sure we only get images from the user's folder
-        path = f"{unit.owner.username}/{path}"
+        path = f"{username}/{path}"
 
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-        )
-        s3_response_object = s3.get_object(Bucket=settings.AWS_UPLOAD_BUCKET_NAME, Key=path)
-        file = s3_response_object["Body"].read()
+        s3_response_object = await s3.get_object(Bucket=settings.AWS_UPLOAD_BUCKET_NAME, Key=path)
+        file = await s3_response_object["Body"].read()
         return InMemoryUploadedFile(ContentFile(file), None, path, "image/png", len(file), None)
 
-    def create_image(self, img, image_type, unit, download=False):
-        if not img:
-            return
-        if download:
-            img = self.download_image(img, unit)
+    def create_image(self, img, image_type, unit):
         UnitImage.objects.create(image=img, image_type=image_type, owner=unit.owner, unit=unit)
 
-    def form_valid(self, form):
+    async def create_images(self, images, paths, unit, username):
+        """Creates a unit's images from uploaded files and from files the browser uploaded to S3. The S3 downloads all
+        wait on one event loop, while creating the images, which resizes them, runs in the shared executor.
+
+        Args:
+          images: the uploaded files.
+          paths: the paths of the files in the user's S3 upload folder.
+          unit: the unit.
+          username: the username of the unit's owner, whose upload folder the files are in.
+        """
         # Multithreading image creation can really speed up this request, but uses o(n) memory, which can be
-        # problematic on Heroku)
-        with ThreadPoolExecutor(max_workers=settings.MAX_THREAD_POOL_WORKERS) as executor:
-            futures = []
-            if form.files:
-                for image in form.files.getlist("images"):
-                    futures.append(executor.submit(self.create_image, image, self.image_type, form.unit))
-            for path in form.data.get("s3_images", "").split(","):
-                futures.append(executor.submit(self.create_image, path, self.image_type, form.unit, True))
-            wait(futures, return_when=FIRST_EXCEPTION)
-            for f in futures:
-                if f.exception():
-                    raise f.exception()
+        # problematic on Heroku). Room for the whole batch is reserved up front, so a busy executor rejects the upload
+        # before any image is saved.
+        with get_executor().reserve(len(images) + len(paths)) as reservation:
+
+            async def create_image(image):
+                await asyncio.wrap_future(reservation.submit(self.create_image, image, self.image_type, unit))
+
+            async def download_and_create_image(s3, path):
+                await create_image(await self.download_image(s3, path, username))
+
+            async with get_s3_client() as s3:
+                results = await asyncio.gather(
+                    *[create_image(image) for image in images],
+                    *[download_and_create_image(s3, path) for path in paths],
+                    return_exceptions=True,
+                )
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    def form_valid(self, form):
+        images = form.files.getlist("images") if form.files else []
+        paths = [path for path in form.data.get("s3_images", "").split(",") if path]
+        try:
+            async_to_sync(self.create_images)(images, paths, form.unit, form.unit.owner.username)
+        except ExecutorBusy:
+            response = HttpResponse("Too many uploads. Please try again later.", status=503)
+            response["Retry-After"] = 60
+            return response
         return redirect(get_next_page_from_request(self.request, reverse_lazy("unit-list")))
 
 
@@ -190,9 +214,7 @@ class UnitAddDocumentsFormView(UnitAddImagesFormViewBase):
         form_kwargs["upload_instructions"] = _("Take pictures of important documents to save for later. For example:")
         form_kwargs["upload_ideas"] = [_("Your lease"), _("An important letter from your landlord")]
         form_kwargs["max_images"] = settings.MAX_DOCUMENTS_PER_UNIT
-        form_kwargs["current_image_count"] = UnitImage.objects.for_user(
-            self.request.user, unit=form_kwargs["unit"], image_type=DOCUMENT
-        ).count()
+        form_kwargs["current_image_count"] = form_kwargs["unit"].document_count
         return form_kwargs
 
 
@@ -213,9 +235,7 @@ class UnitAddMoveInPicturesFormView(UnitAddImagesFormViewBase):
             _("Anything that's damaged"),
         ]
         form_kwargs["max_images"] = settings.MAX_MOVE_IN_PICTURES_PER_UNIT
-        form_kwargs["current_image_count"] = UnitImage.objects.for_user(
-            self.request.user, unit=form_kwargs["unit"], image_type=MOVE_IN_PICTURE
-        ).count()
+        form_kwargs["current_image_count"] = form_kwargs["unit"].move_in_picture_count
         return form_kwargs
 
 
@@ -238,40 +258,54 @@ class UnitAddMoveOutPicturesFormView(UnitAddImagesFormViewBase):
             "Make sure you have good overall coverage of your unit in case your landlord claims damage."
         )
         form_kwargs["max_images"] = settings.MAX_MOVE_OUT_PICTURES_PER_UNIT
-        form_kwargs["current_image_count"] = UnitImage.objects.for_user(
-            self.request.user, unit=form_kwargs["unit"], image_type=MOVE_OUT_PICTURE
-        ).count()
+        form_kwargs["current_image_count"] = form_kwargs["unit"].move_out_picture_count
         return form_kwargs
 
 
 @login_required
-def sign_files(request, slug):
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-    )
+@throttle("sign-files")
+def get_files_to_sign(request, slug):
+    """Does the checks for sign_files that use the session and database, which can't be used from the event loop.
+
+    Args:
+      request: the request.
+      slug: the slug of the unit the files are for.
 
+    Returns: the names of the files to sign, or a response to send instead.
+    """
     files = json.loads(request.body)["files"]
 
-    existing_image_count = Unit.objects.get_for_user(request.user, slug=slug).unitimage_set.count()
+    existing_image_count = Unit.objects.get_for_user(request.user, slug=slug).image_count
     if (existing_image_count + len(files)) > (
         settings.MAX_DOCUMENTS_PER_UNIT + settings.MAX_MOVE_IN_PICTURES_PER_UNIT + settings.MAX_MOVE_OUT_PICTURES_PER_UNIT
     ):
         return HttpResponseBadRequest("Too many files.")
-
-    resp = {}
-    for f in files:
-        resp[f] = s3.generate_presigned_post(
-            Bucket=settings.AWS_UPLOAD_BUCKET_NAME,
-            Key=f"{request.user.username}/{f}",
-            Fields={"acl": "private", "Content-Type": "image/png"},
-            Conditions=[{"acl": "private"}, {"Content-Type": "image/png"}, ["content-length-range", 5000, 15000000]],
-            ExpiresIn=3600,
+    return files
+
+
+async def sign_files(request, slug):
+    files = await sync_to_async(get_files_to_sign)(request, slug)
+    if isinstance(files, HttpResponse):
+        return files
+
+    async with get_s3_client() as s3:
+        posts = await asyncio.gather(
+            *[
+                s3.generate_presigned_post(
+                    Bucket=settings.AWS_UPLOAD_BUCKET_NAME,
+                    Key=f"{request.user.username}/{f}",
+                    Fields={"acl": "private", "Content-Type": "image/png"},
+                    Conditions=[{"acl": "private"}, {"Content-Type": "image/png"}, ["content-length-range", 5000, 15000000]],
+                    ExpiresIn=3600,
+                )
+                for f in files
+            ]
         )
-        # If we're running locally, make sure to return URLs that can be access from the front-end
-        if settings.AWS_S3_ENDPOINT_URL and settings.AWS_S3_CUSTOM_DOMAIN:
-            resp[f]["url"] = resp[f]["url"].replace("http://s3", "http://localhost")
+
+    resp = dict(zip(files, posts))
+    # If we're running locally, make sure to return URLs that can be access from the front-end
+    if settings.AWS_S3_ENDPOINT_URL and settings.AWS_S3_CUSTOM_DOMAIN:
+        for post in resp.values():
+            post["url"] = post["url"].replace("http://s3", "http://localhost")
 
     return JsonResponse(resp)